@@ -0,0 +1,424 @@
+import functools
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import dados
+import fornecedores
+
+
+MEMOIZADAS = []
+
+# Campos do filtro de que cada etapa depende, na ordem categoria → produto →
+# loja → período. O estoque não depende de loja nem de período, e compras
+# não têm loja; com `memoizar(depende=...)`, mexer só nesses filtros
+# reaproveita o que já foi calculado.
+SELECAO = ('categorias', 'produtos')
+SELECAO_PERIODO = SELECAO + ('data_inicio', 'data_fim')
+
+# Dias de vendas, até o fim do período, usados na velocidade de cada produto × localização.
+JANELA_VELOCIDADE = 30
+# Coberturas acima disso (em dias) não têm data de ruptura prevista.
+HORIZONTE_RUPTURA = 365 * 100
+
+
+def memoizar(maximo=128, validade=600, depende=None):
+    """Memoiza uma análise pela base e pelos demais argumentos.
+
+    A função decorada recebe uma `dados.BaseDados` como primeiro argumento; a
+    chave usa `base.chave_memo` (configuração da base e versão dos dados) no
+    lugar da base, então uma nova versão dos CSVs invalida tudo e bases com
+    outro recorte ou orçamento não se misturam. Com `depende`, o
+    `filtros.EstadoFiltro` do segundo argumento é reduzido a esses campos, na
+    chave e na chamada. Guarda no máximo `maximo` resultados (LRU), cada um
+    válido por `validade` segundos. Os resultados são compartilhados entre
+    sessões e não devem ser alterados por quem chama. `.chave(base, ...)` dá
+    a chave de uma chamada sem calculá-la, para guardar o que é derivado do
+    resultado (ver `graficos.CacheFiguras`).
+    """
+    def decorador(funcao):
+        resultados = OrderedDict()
+        trava = threading.Lock()
+
+        def chavear(base, args, kwargs):
+            if depende is not None:
+                args = (args[0].projetar(depende),) + args[1:]
+            return args, (base.chave_memo, args, tuple(sorted(kwargs.items())))
+
+        @functools.wraps(funcao)
+        def memoizada(base, *args, **kwargs):
+            args, chave = chavear(base, args, kwargs)
+            agora = time.monotonic()
+            with trava:
+                if chave in resultados:
+                    criado, valor = resultados[chave]
+                    if agora - criado < validade:
+                        resultados.move_to_end(chave)
+                        return valor
+                    del resultados[chave]
+            valor = funcao(base, *args, **kwargs)
+            with trava:
+                resultados[chave] = (agora, valor)
+                resultados.move_to_end(chave)
+                while len(resultados) > maximo:
+                    resultados.popitem(last=False)
+            return valor
+
+        memoizada.limpar = resultados.clear
+        memoizada.chave = lambda base, *args, **kwargs: (funcao.__module__, funcao.__name__, chavear(base, args, kwargs)[1])
+        MEMOIZADAS.append(memoizada)
+        return memoizada
+    return decorador
+
+
+def limpar_memos():
+    for funcao in MEMOIZADAS:
+        funcao.limpar()
+
+
+def _selecao(estado):
+    return dict(produtos=estado.produtos, categorias=estado.categorias)
+
+
+@memoizar(depende=SELECAO)
+def produtos_selecionados(base, estado):
+    """Ids dos produtos que atendem às categorias e produtos do filtro; None se não há filtro."""
+    if not estado.categorias and not estado.produtos:
+        return None
+    df_produtos = base.produtos
+    mascara = np.ones(len(df_produtos), dtype=bool)
+    if estado.categorias:
+        mascara &= df_produtos['categoria'].isin(estado.categorias).to_numpy()
+    if estado.produtos:
+        mascara &= df_produtos['produto_id'].isin(estado.produtos).to_numpy()
+    return df_produtos['produto_id'].to_numpy()[mascara]
+
+
+def _filtrar(indice, produtos, **kwargs):
+    if produtos is not None and len(produtos) == 0:
+        return indice.df.iloc[:0]
+    return indice.filtrar(produto_id=produtos, **kwargs)
+
+
+# Tabelas filtradas: só as dos filtros mais recentes ficam guardadas.
+@memoizar(maximo=4, depende=SELECAO)
+def estoque_filtrado(base, estado):
+    return _filtrar(base.filtros['estoque'], produtos_selecionados(base, estado))
+
+
+@memoizar(maximo=4, depende=SELECAO_PERIODO)
+def compras_filtradas(base, estado):
+    return _filtrar(base.filtros['compras'], produtos_selecionados(base, estado),
+                    data_inicio=estado.data_inicio, data_fim=estado.data_fim)
+
+
+def _maiores(valores, n):
+    """Posições dos `n` maiores `valores`, do maior para o menor; no empate, a menor posição primeiro.
+
+    `np.partition` acha o n-ésimo maior valor sem ordenar tudo, e só as
+    posições que o alcançam (empates incluídos) são ordenadas.
+    """
+    valores = np.asarray(valores)
+    if n is None or n >= len(valores):
+        candidatas = np.arange(len(valores))
+    else:
+        corte = np.partition(valores, len(valores) - n)[len(valores) - n]
+        candidatas = np.flatnonzero(valores >= corte)
+    ordem = np.lexsort((candidatas, -valores[candidatas]))
+    return candidatas[ordem[:n]]
+
+
+def _ranking(df, coluna, n, produtos, colunas_produto=None):
+    """As `n` linhas de `df` (indexado por `produto_id`) com maior `coluna`, já com os dados de `produtos`.
+
+    O agrupamento fica só nos ids; nome, categoria etc. entram depois,
+    apenas nas linhas escolhidas.
+    """
+    top = df.iloc[_maiores(df[coluna].to_numpy(), n)].reset_index()
+    if colunas_produto is not None:
+        produtos = produtos[['produto_id'] + colunas_produto]
+    return top.merge(produtos, on='produto_id', how='left')
+
+
+@memoizar()
+def totais_vendas(base, estado):
+    return base.cubos['vendas'].somar(estado.data_inicio, estado.data_fim, chaves=estado.lojas, **_selecao(estado))
+
+
+@memoizar()
+def vendas_por_produto(base, estado):
+    return base.cubos['vendas'].somar(
+        estado.data_inicio, estado.data_fim, chaves=estado.lojas, por='produto_id', **_selecao(estado)
+    )
+
+
+@memoizar(depende=SELECAO_PERIODO)
+def compras_entregues_por_produto(base, estado):
+    return base.cubos['compras'].somar(
+        estado.data_inicio, estado.data_fim, chaves=['Entregue'], por='produto_id', **_selecao(estado)
+    )
+
+
+@memoizar(depende=SELECAO)
+def estoque_por_produto(base, estado):
+    """Quantidade e mínimo somados de todas as localizações, por produto."""
+    return estoque_filtrado(base, estado).groupby('produto_id')[['quantidade_estoque', 'estoque_minimo']].sum()
+
+
+@memoizar(depende=SELECAO)
+def indicadores_estoque(base, estado):
+    df_estoque = estoque_filtrado(base, estado)
+    por_produto = estoque_por_produto(base, estado)
+    return {
+        'valor_estoque': df_estoque['valor_total_estoque'].sum(),
+        'quantidade_estoque': df_estoque['quantidade_estoque'].sum(),
+        'estoque_minimo_medio': df_estoque['estoque_minimo'].mean(),
+        'produtos_criticos': int((por_produto['quantidade_estoque'] < por_produto['estoque_minimo']).sum()),
+        'posicoes_abaixo_minimo': int((df_estoque['quantidade_estoque'] < df_estoque['estoque_minimo']).sum()),
+    }
+
+
+@memoizar(depende=SELECAO_PERIODO)
+def somas_fornecedores(base, estado):
+    """Somas das compras entregues por fornecedor × mês, dos baldes de `base.fornecedores`."""
+    return base.fornecedores.somar(estado.data_inicio, estado.data_fim, produtos_selecionados(base, estado),
+                                   por=('fornecedor', 'mes'))
+
+
+@memoizar(depende=SELECAO_PERIODO)
+def prazos_fornecedores(base, estado):
+    """Prazo médio de entrega por fornecedor (compras entregues)."""
+    somas = somas_fornecedores(base, estado).groupby(level='fornecedor').sum()
+    return somas['prazo_entrega_dias'] / somas['linhas']
+
+
+@memoizar(depende=SELECAO_PERIODO)
+def indicadores_compras(base, estado):
+    somas = somas_fornecedores(base, estado).sum()
+    return {
+        'gasto_compras': base.cubos['compras'].somar(estado.data_inicio, estado.data_fim, **_selecao(estado))['valor_total'],
+        'prazo_medio': somas['prazo_entrega_dias'] / somas['linhas'] if somas['linhas'] > 0 else None,
+    }
+
+
+@memoizar()
+def indicadores(base, estado):
+    estoque = indicadores_estoque(base, estado)
+    compras = indicadores_compras(base, estado)
+    return {
+        'receita_total': totais_vendas(base, estado)['valor_total'],
+        'valor_estoque': estoque['valor_estoque'],
+        'gasto_compras': compras['gasto_compras'],
+        'produtos_criticos': estoque['produtos_criticos'],
+        'prazo_medio': compras['prazo_medio'],
+    }
+
+
+@memoizar()
+def visao_produto(base, estado):
+    estoque = indicadores_estoque(base, estado)
+    df_compras = compras_filtradas(base, estado)
+    vendas = totais_vendas(base, estado)
+    compras = compras_entregues_por_produto(base, estado)
+
+    fornecedor_principal = None
+    if len(df_compras) > 0:
+        fornecedor_principal = df_compras.groupby('fornecedor', observed=True)['valor_total'].sum().idxmax()
+
+    return {
+        'estoque_atual': estoque['quantidade_estoque'],
+        'estoque_minimo': estoque['estoque_minimo_medio'],
+        'vendas_quantidade': vendas['quantidade_vendida'],
+        'vendas_valor': vendas['valor_total'],
+        'compras_quantidade': compras['quantidade_comprada'].sum(),
+        'compras_valor': compras['valor_total'].sum(),
+        'fornecedor_principal': fornecedor_principal,
+    }
+
+
+@memoizar(depende=SELECAO)
+def produtos_criticos(base, estado, n=None):
+    """Produtos com estoque total abaixo do mínimo total, do maior déficit para o menor (os `n` primeiros, se dado)."""
+    estoque_agrupado = estoque_por_produto(base, estado)
+
+    df_criticos = estoque_agrupado[estoque_agrupado['quantidade_estoque'] < estoque_agrupado['estoque_minimo']].copy()
+    df_criticos['deficit'] = df_criticos['estoque_minimo'] - df_criticos['quantidade_estoque']
+    df_criticos = _ranking(df_criticos, 'deficit', n, base.produtos, ['nome_produto', 'categoria'])
+    return df_criticos[['produto_id', 'nome_produto', 'categoria', 'quantidade_estoque', 'estoque_minimo', 'deficit']]
+
+
+@memoizar()
+def top_vendas(base, estado, n=10):
+    return _ranking(vendas_por_produto(base, estado), 'quantidade_vendida', n, base.produtos)
+
+
+@memoizar(depende=SELECAO_PERIODO)
+def maiores_gastos(base, estado, n=10):
+    return _ranking(compras_entregues_por_produto(base, estado), 'valor_total', n, base.produtos)
+
+
+@memoizar(depende=SELECAO_PERIODO)
+def analise_fornecedores(base, estado):
+    """Scorecard por fornecedor (compras entregues, ver `fornecedores.indicadores`); None se não houver compras no filtro."""
+    if base.cubos['compras'].somar(estado.data_inicio, estado.data_fim, **_selecao(estado))['linhas'] == 0:
+        return None
+    return fornecedores.indicadores(somas_fornecedores(base, estado))
+
+
+@memoizar()
+def serie_temporal(base, estado, freq='M'):
+    """Quantidade vendida e comprada (entregue) por dia ('D'), semana ('W', a partir da segunda) ou mês ('M')."""
+    vendas = base.cubos['vendas'].serie(
+        estado.data_inicio, estado.data_fim, chaves=estado.lojas, freq=freq, **_selecao(estado)
+    )['quantidade_vendida'].reset_index()
+    vendas.columns = ['periodo', 'quantidade']
+
+    compras = base.cubos['compras'].serie(
+        estado.data_inicio, estado.data_fim, chaves=['Entregue'], freq=freq, **_selecao(estado)
+    )['quantidade_comprada'].reset_index()
+    compras.columns = ['periodo', 'quantidade']
+    return vendas, compras
+
+
+@memoizar()
+def analise_consolidada(base, estado, n=20):
+    analise = estoque_por_produto(base, estado)[['quantidade_estoque']].copy()
+    analise['quantidade_vendida'] = vendas_por_produto(base, estado)['quantidade_vendida']
+    analise['quantidade_comprada'] = compras_entregues_por_produto(base, estado)['quantidade_comprada']
+    analise = _ranking(analise.fillna(0), 'quantidade_vendida', n, base.produtos, ['nome_produto'])
+    return analise[['produto_id', 'nome_produto', 'quantidade_estoque', 'quantidade_vendida', 'quantidade_comprada']]
+
+
+@memoizar()
+def vendas_por_loja(base, estado):
+    vendas_loja = base.cubos['vendas'].somar(
+        estado.data_inicio, estado.data_fim, chaves=estado.lojas, por='loja_id', **_selecao(estado)
+    )
+    vendas_loja = vendas_loja[['valor_total', 'quantidade_vendida', 'linhas']].reset_index()
+    vendas_loja.columns = ['Loja', 'Receita Total', 'Quantidade Vendida', 'Número de Vendas']
+    return vendas_loja
+
+
+@memoizar()
+def produtos_parados(base, estado):
+    """Posições com estoque acima de 2× o mínimo e vendas no período abaixo de 10% do estoque.
+
+    O excesso é o que passa de 2× o mínimo, e o capital imobilizado é esse
+    excesso valorizado pelo preço unitário do produto.
+    """
+    df_estoque = estoque_filtrado(base, estado)
+    estoque_alto = df_estoque[df_estoque['quantidade_estoque'] > df_estoque['estoque_minimo'] * 2]
+
+    vendido = estoque_alto['produto_id'].map(vendas_por_produto(base, estado)['quantidade_vendida']).fillna(0)
+    parados = estoque_alto[vendido < estoque_alto['quantidade_estoque'] * 0.1]
+
+    parados = parados[['produto_id', 'nome_produto', 'categoria', 'localizacao',
+                       'quantidade_estoque', 'estoque_minimo', 'valor_unitario_estoque']].copy()
+    parados['quantidade_vendida'] = vendido[parados.index].astype(int)
+    parados['excesso_unidades'] = parados['quantidade_estoque'] - parados['estoque_minimo'] * 2
+    parados['capital_imobilizado'] = parados['excesso_unidades'] * parados['valor_unitario_estoque']
+    return parados.sort_values(['capital_imobilizado', 'produto_id'], ascending=[False, True], kind='stable',
+                               ignore_index=True)
+
+
+def projetar_estoque(posicoes, vendido, dias, prazos, fim):
+    """Velocidade, cobertura, ruptura prevista e ponto de pedido de cada posição, coluna a coluna.
+
+    `vendido` é o total vendido nos `dias` da janela pela loja de cada
+    posição e `prazos` o prazo de entrega de cada uma. A reposição é urgente
+    quando o estoque não passa do ponto de pedido (a venda esperada durante
+    a entrega mais o estoque mínimo); a sugestão repõe até o ponto de
+    pedido mais uma janela de vendas.
+    """
+    projecao = posicoes[['produto_id', 'nome_produto', 'categoria', 'localizacao',
+                         'quantidade_estoque', 'estoque_minimo']].reset_index(drop=True)
+    estoque = projecao['quantidade_estoque'].to_numpy(dtype=float)
+    velocidade = np.asarray(vendido, dtype=float) / dias
+    prazos = np.asarray(prazos, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cobertura = np.where(velocidade > 0, estoque / velocidade, np.inf)
+    ponto_pedido = velocidade * prazos + projecao['estoque_minimo'].to_numpy(dtype=float)
+
+    projecao['velocidade_diaria'] = velocidade
+    projecao['cobertura_dias'] = cobertura
+    projecao['data_ruptura'] = pd.Timestamp(fim) + pd.to_timedelta(
+        np.where(cobertura <= HORIZONTE_RUPTURA, cobertura, np.nan), unit='D')
+    projecao['prazo_entrega_dias'] = prazos
+    projecao['ponto_pedido'] = ponto_pedido
+    projecao['repor_agora'] = estoque <= ponto_pedido
+    projecao['quantidade_sugerida'] = np.ceil(np.maximum(ponto_pedido + velocidade * dias - estoque, 0))
+    return projecao
+
+
+def ordenar_reposicao(projecao, n):
+    """As `n` posições a repor com a ruptura mais próxima (no empate, por produto e localização) e o total delas."""
+    repor = projecao[projecao['repor_agora']]
+    repor = repor.iloc[np.lexsort((repor['localizacao'].astype(str).to_numpy(), repor['produto_id'].to_numpy()))]
+    return repor.iloc[_maiores(-repor['cobertura_dias'].to_numpy(), n)].reset_index(drop=True), len(repor)
+
+
+@memoizar(maximo=2, validade=math.inf)
+def prazo_por_produto(base):
+    """Prazo médio de entrega de cada produto em todo o histórico de compras entregues, e o de todos juntos."""
+    somas = base.fornecedores.somar(por=('produto_id',))
+    if len(somas) == 0:
+        return pd.Series(dtype=float), np.nan
+    return somas['prazo_entrega_dias'] / somas['linhas'], somas['prazo_entrega_dias'].sum() / somas['linhas'].sum()
+
+
+@memoizar(depende=SELECAO + ('data_fim',))
+def projecao_estoque(base, estado, janela=JANELA_VELOCIDADE):
+    """`projetar_estoque` para todas as posições do filtro, numa passada só.
+
+    A velocidade é a média diária vendida pela loja da localização nos
+    `janela` dias até o fim do período (ou a última venda), lida do cubo de
+    vendas para todos os pares de uma vez; produtos sem compras entregues
+    usam o prazo médio de todos.
+    """
+    posicoes = estoque_filtrado(base, estado)
+    cubo = base.cubos['vendas']
+    fim = cubo.ultimo_dia if estado.data_fim is None else pd.Timestamp(estado.data_fim)
+    inicio = fim - pd.Timedelta(days=janela - 1)
+    dias = max((fim - max(inicio, pd.Timestamp(cubo.inicio))).days + 1, 1)
+
+    vendido = cubo.valores('quantidade_vendida', posicoes['produto_id'].to_numpy(),
+                           dados.lojas_das_localizacoes(posicoes['localizacao']), inicio, fim)
+    prazos, prazo_geral = prazo_por_produto(base)
+    return projetar_estoque(posicoes, vendido, dias, posicoes['produto_id'].map(prazos).fillna(prazo_geral), fim)
+
+
+@memoizar(depende=SELECAO + ('data_fim',))
+def reposicao_urgente(base, estado, n=100):
+    return ordenar_reposicao(projecao_estoque(base, estado), n)
+
+
+@memoizar()
+def recomendacoes(base, estado):
+    tem_vendas = totais_vendas(base, estado)['linhas'] > 0
+
+    parados = produtos_parados(base, estado) if tem_vendas else None
+
+    fornecedor_recomendado = None
+    if tem_vendas:
+        prazos = prazos_fornecedores(base, estado)
+        if len(prazos) > 0:
+            fornecedor_recomendado = prazos.idxmin()
+
+    return {
+        'produtos_ruptura': indicadores_estoque(base, estado)['posicoes_abaixo_minimo'],
+        'produtos_parados': None if parados is None else len(parados),
+        'tem_vendas': tem_vendas,
+        'fornecedor_recomendado': fornecedor_recomendado,
+    }
+
+
+@memoizar()
+def vendas_por_categoria(base, estado):
+    vendas_categoria = base.cubos['vendas'].somar(
+        estado.data_inicio, estado.data_fim, chaves=estado.lojas, por='categoria', **_selecao(estado)
+    )
+    return vendas_categoria[['valor_total', 'quantidade_vendida']].sort_values('valor_total', ascending=False)
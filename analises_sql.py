@@ -0,0 +1,372 @@
+"""As análises de `analises.py` como consultas ao backend SQLite (`banco.BancoDados`).
+
+Cada função tem a mesma assinatura e devolve o mesmo formato da versão em
+pandas; filtro e agrupamento rodam no banco e só o resultado vem para o
+Python.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+import dados
+import fornecedores
+from analises import JANELA_VELOCIDADE, SELECAO, SELECAO_PERIODO, memoizar, ordenar_reposicao, projetar_estoque
+from banco import para_dia
+
+
+# Início do período de cada data (dias desde 1970) em SQLite; a semana começa na segunda.
+INICIO_PERIODO = {
+    'D': "date({coluna} * 86400, 'unixepoch')",
+    'W': "date({coluna} * 86400, 'unixepoch', 'weekday 0', '-6 days')",
+    'M': "strftime('%Y-%m-01', {coluna} * 86400, 'unixepoch')",
+}
+
+
+def _em(coluna):
+    return f"{coluna} IN (SELECT value FROM json_each(?))"
+
+
+def _onde(estado, coluna_data=None, lojas=False, condicoes=()):
+    """Cláusula WHERE e parâmetros do filtro; seleções vazias não filtram."""
+    condicoes, parametros = list(condicoes), []
+    if estado.categorias:
+        condicoes.append(f"produto_id IN (SELECT produto_id FROM produtos WHERE {_em('categoria')})")
+        parametros.append(json.dumps(list(estado.categorias)))
+    if estado.produtos:
+        condicoes.append(_em('produto_id'))
+        parametros.append(json.dumps(list(estado.produtos)))
+    if lojas and estado.lojas:
+        condicoes.append(_em('loja_id'))
+        parametros.append(json.dumps(list(estado.lojas)))
+    if coluna_data is not None and estado.data_inicio is not None:
+        condicoes.append(f"{coluna_data} >= ?")
+        parametros.append(para_dia(estado.data_inicio))
+    if coluna_data is not None and estado.data_fim is not None:
+        condicoes.append(f"{coluna_data} <= ?")
+        parametros.append(para_dia(estado.data_fim))
+    return ('WHERE ' + ' AND '.join(condicoes)) if condicoes else '', parametros
+
+
+def _onde_vendas(estado):
+    return _onde(estado, 'data_venda', lojas=True)
+
+
+def _onde_compras(estado, entregues=False):
+    return _onde(estado, 'data_compra', condicoes=["status_compra = 'Entregue'"] if entregues else ())
+
+
+def _primeira_linha(base, sql, parametros):
+    return base.consultar(sql, parametros).iloc[0]
+
+
+@memoizar()
+def totais_vendas(base, estado):
+    onde, parametros = _onde_vendas(estado)
+    total = _primeira_linha(base, f"""
+        SELECT COUNT(*) AS linhas, COALESCE(SUM(quantidade_vendida), 0) AS quantidade_vendida,
+               COALESCE(SUM(valor_total), 0.0) AS valor_total
+        FROM vendas {onde}
+    """, parametros)
+    return total.round(6)
+
+
+@memoizar()
+def vendas_por_produto(base, estado):
+    onde, parametros = _onde_vendas(estado)
+    return base.consultar(f"""
+        SELECT produto_id, COUNT(*) AS linhas, SUM(quantidade_vendida) AS quantidade_vendida, SUM(valor_total) AS valor_total
+        FROM vendas {onde}
+        GROUP BY produto_id
+    """, parametros).set_index('produto_id').round(6)
+
+
+@memoizar(depende=SELECAO_PERIODO)
+def compras_entregues_por_produto(base, estado):
+    onde, parametros = _onde_compras(estado, entregues=True)
+    return base.consultar(f"""
+        SELECT produto_id, COUNT(*) AS linhas, SUM(quantidade_comprada) AS quantidade_comprada, SUM(valor_total) AS valor_total
+        FROM compras {onde}
+        GROUP BY produto_id
+    """, parametros).set_index('produto_id').round(6)
+
+
+@memoizar()
+def indicadores(base, estado):
+    onde_estoque, parametros_estoque = _onde(estado)
+    estoque = _primeira_linha(base, f"""
+        SELECT COALESCE(SUM(valor_total_estoque), 0.0) AS valor_estoque,
+               COALESCE(SUM(quantidade_estoque < estoque_minimo), 0) AS produtos_criticos
+        FROM (
+            SELECT produto_id, SUM(valor_total_estoque) AS valor_total_estoque,
+                   SUM(quantidade_estoque) AS quantidade_estoque, SUM(estoque_minimo) AS estoque_minimo
+            FROM estoque_atual {onde_estoque}
+            GROUP BY produto_id
+        )
+    """, parametros_estoque)
+
+    onde_compras, parametros_compras = _onde_compras(estado)
+    compras = _primeira_linha(base, f"""
+        SELECT COALESCE(SUM(valor_total), 0.0) AS gasto_compras,
+               AVG(CASE WHEN status_compra = 'Entregue' THEN prazo_entrega_dias END) AS prazo_medio
+        FROM compras {onde_compras}
+    """, parametros_compras)
+
+    return {
+        'receita_total': totais_vendas(base, estado)['valor_total'],
+        'valor_estoque': estoque['valor_estoque'],
+        'gasto_compras': round(compras['gasto_compras'], 6),
+        'produtos_criticos': int(estoque['produtos_criticos']),
+        'prazo_medio': None if pd.isna(compras['prazo_medio']) else compras['prazo_medio'],
+    }
+
+
+@memoizar()
+def visao_produto(base, estado):
+    onde_estoque, parametros_estoque = _onde(estado)
+    estoque = _primeira_linha(base, f"""
+        SELECT COALESCE(SUM(quantidade_estoque), 0) AS estoque_atual, AVG(estoque_minimo) AS estoque_minimo
+        FROM estoque_atual {onde_estoque}
+    """, parametros_estoque)
+
+    onde_compras, parametros_compras = _onde_compras(estado)
+    fornecedor = base.consultar(f"""
+        SELECT fornecedor FROM compras {onde_compras}
+        GROUP BY fornecedor
+        ORDER BY SUM(valor_total) DESC, fornecedor
+        LIMIT 1
+    """, parametros_compras)
+
+    vendas = totais_vendas(base, estado)
+    compras = compras_entregues_por_produto(base, estado)
+    return {
+        'estoque_atual': estoque['estoque_atual'],
+        'estoque_minimo': np.nan if pd.isna(estoque['estoque_minimo']) else estoque['estoque_minimo'],
+        'vendas_quantidade': vendas['quantidade_vendida'],
+        'vendas_valor': vendas['valor_total'],
+        'compras_quantidade': compras['quantidade_comprada'].sum(),
+        'compras_valor': compras['valor_total'].sum(),
+        'fornecedor_principal': fornecedor['fornecedor'].iloc[0] if len(fornecedor) > 0 else None,
+    }
+
+
+@memoizar(depende=SELECAO)
+def produtos_criticos(base, estado, n=None):
+    onde, parametros = _onde(estado)
+    return base.consultar(f"""
+        SELECT produto_id, nome_produto, categoria,
+               SUM(quantidade_estoque) AS quantidade_estoque, SUM(estoque_minimo) AS estoque_minimo,
+               SUM(estoque_minimo) - SUM(quantidade_estoque) AS deficit
+        FROM estoque_atual {onde}
+        GROUP BY produto_id, nome_produto, categoria
+        HAVING SUM(quantidade_estoque) < SUM(estoque_minimo)
+        ORDER BY deficit DESC, produto_id
+        LIMIT ?
+    """, parametros + [-1 if n is None else n])
+
+
+@memoizar()
+def top_vendas(base, estado, n=10):
+    onde, parametros = _onde_vendas(estado)
+    top = base.consultar(f"""
+        SELECT produto_id, COUNT(*) AS linhas, SUM(quantidade_vendida) AS quantidade_vendida, SUM(valor_total) AS valor_total
+        FROM vendas {onde}
+        GROUP BY produto_id
+        ORDER BY quantidade_vendida DESC, produto_id
+        LIMIT ?
+    """, parametros + [n]).round(6)
+    return top.merge(base.produtos, on='produto_id', how='left')
+
+
+@memoizar(depende=SELECAO_PERIODO)
+def maiores_gastos(base, estado, n=10):
+    onde, parametros = _onde_compras(estado, entregues=True)
+    top = base.consultar(f"""
+        SELECT produto_id, COUNT(*) AS linhas, SUM(quantidade_comprada) AS quantidade_comprada, SUM(valor_total) AS valor_total
+        FROM compras {onde}
+        GROUP BY produto_id
+        ORDER BY valor_total DESC, produto_id
+        LIMIT ?
+    """, parametros + [n]).round(6)
+    return top.merge(base.produtos, on='produto_id', how='left')
+
+
+def _ha_compras(base, estado):
+    onde, parametros = _onde_compras(estado)
+    return len(base.consultar(f"SELECT 1 FROM compras {onde} LIMIT 1", parametros)) > 0
+
+
+@memoizar(depende=SELECAO_PERIODO)
+def analise_fornecedores(base, estado):
+    """Scorecard por fornecedor: as somas por fornecedor × mês saem do banco e `fornecedores.indicadores` faz o resto."""
+    if not _ha_compras(base, estado):
+        return None
+    onde, parametros = _onde_compras(estado, entregues=True)
+    somas = base.consultar(f"""
+        SELECT fornecedor, {INICIO_PERIODO['M'].format(coluna='data_compra')} AS mes,
+               COUNT(*) AS linhas, SUM(quantidade_comprada) AS quantidade_comprada, SUM(valor_total) AS valor_total,
+               SUM(valor_unitario) AS valor_unitario, SUM(valor_unitario * valor_unitario) AS valor_unitario_quadrado,
+               SUM(prazo_entrega_dias) AS prazo_entrega_dias,
+               SUM(prazo_entrega_dias * prazo_entrega_dias) AS prazo_entrega_dias_quadrado,
+               SUM(prazo_entrega_dias <= ?) AS no_prazo
+        FROM compras {onde}
+        GROUP BY fornecedor, mes
+    """, [fornecedores.PRAZO_COMBINADO] + parametros)
+    return fornecedores.indicadores(somas.assign(mes=pd.to_datetime(somas['mes'])))
+
+
+def _serie(base, tabela, coluna_data, medida, freq, onde, parametros):
+    periodo = INICIO_PERIODO[freq].format(coluna=coluna_data)
+    serie = base.consultar(f"""
+        SELECT {periodo} AS periodo, SUM({medida}) AS quantidade
+        FROM {tabela} {onde}
+        GROUP BY periodo
+        ORDER BY periodo
+    """, parametros)
+    serie['periodo'] = pd.to_datetime(serie['periodo'], format='%Y-%m-%d')
+    return serie
+
+
+@memoizar()
+def serie_temporal(base, estado, freq='M'):
+    vendas = _serie(base, 'vendas', 'data_venda', 'quantidade_vendida', freq, *_onde_vendas(estado))
+    compras = _serie(base, 'compras', 'data_compra', 'quantidade_comprada', freq, *_onde_compras(estado, entregues=True))
+    return vendas, compras
+
+
+@memoizar()
+def analise_consolidada(base, estado, n=20):
+    onde_estoque, parametros_estoque = _onde(estado)
+    onde_vendas, parametros_vendas = _onde_vendas(estado)
+    onde_compras, parametros_compras = _onde_compras(estado, entregues=True)
+    return base.consultar(f"""
+        WITH estoque AS (
+            SELECT produto_id, nome_produto, SUM(quantidade_estoque) AS quantidade_estoque
+            FROM estoque_atual {onde_estoque}
+            GROUP BY produto_id, nome_produto
+        ),
+        vendido AS (
+            SELECT produto_id, SUM(quantidade_vendida) AS quantidade_vendida FROM vendas {onde_vendas} GROUP BY produto_id
+        ),
+        comprado AS (
+            SELECT produto_id, SUM(quantidade_comprada) AS quantidade_comprada FROM compras {onde_compras} GROUP BY produto_id
+        )
+        SELECT e.produto_id, e.nome_produto, e.quantidade_estoque,
+               COALESCE(v.quantidade_vendida, 0) AS quantidade_vendida,
+               COALESCE(c.quantidade_comprada, 0) AS quantidade_comprada
+        FROM estoque e
+        LEFT JOIN vendido v USING (produto_id)
+        LEFT JOIN comprado c USING (produto_id)
+        ORDER BY quantidade_vendida DESC, e.produto_id
+        LIMIT ?
+    """, parametros_estoque + parametros_vendas + parametros_compras + [n])
+
+
+@memoizar()
+def vendas_por_loja(base, estado):
+    onde, parametros = _onde_vendas(estado)
+    vendas_loja = base.consultar(f"""
+        SELECT loja_id, SUM(valor_total) AS valor_total, SUM(quantidade_vendida) AS quantidade_vendida, COUNT(*) AS linhas
+        FROM vendas {onde}
+        GROUP BY loja_id
+        ORDER BY loja_id
+    """, parametros).round(6)
+    vendas_loja.columns = ['Loja', 'Receita Total', 'Quantidade Vendida', 'Número de Vendas']
+    return vendas_loja
+
+
+@memoizar()
+def produtos_parados(base, estado):
+    """Posições com estoque acima de 2× o mínimo e vendas no período abaixo de 10% do estoque."""
+    onde_estoque, parametros_estoque = _onde(estado, condicoes=['quantidade_estoque > estoque_minimo * 2'])
+    onde_vendas, parametros_vendas = _onde_vendas(estado)
+    return base.consultar(f"""
+        WITH vendido AS (
+            SELECT produto_id, SUM(quantidade_vendida) AS quantidade_vendida FROM vendas {onde_vendas} GROUP BY produto_id
+        )
+        SELECT e.produto_id, e.nome_produto, e.categoria, e.localizacao, e.quantidade_estoque, e.estoque_minimo,
+               e.valor_unitario_estoque, COALESCE(v.quantidade_vendida, 0) AS quantidade_vendida,
+               e.quantidade_estoque - e.estoque_minimo * 2 AS excesso_unidades,
+               (e.quantidade_estoque - e.estoque_minimo * 2) * e.valor_unitario_estoque AS capital_imobilizado
+        FROM (SELECT * FROM estoque_atual {onde_estoque}) e
+        LEFT JOIN vendido v USING (produto_id)
+        WHERE COALESCE(v.quantidade_vendida, 0) < e.quantidade_estoque * 0.1
+        ORDER BY capital_imobilizado DESC, e.produto_id
+    """, parametros_vendas + parametros_estoque)
+
+
+@memoizar(depende=SELECAO + ('data_fim',))
+def projecao_estoque(base, estado, janela=JANELA_VELOCIDADE):
+    """Mesma projeção de `analises.projecao_estoque`: vendas da janela e prazos por produto somados no banco."""
+    inicio_dados, fim_dados = base.periodo()
+    fim = fim_dados if estado.data_fim is None else pd.Timestamp(estado.data_fim)
+    inicio = fim - pd.Timedelta(days=janela - 1)
+    dias = max((fim - max(inicio, inicio_dados)).days + 1, 1)
+
+    lojas = ' '.join(f"WHEN ? THEN {int(loja)}" for loja in dados.NOMES_LOJAS)
+    onde, parametros = _onde(estado)
+    posicoes = base.consultar(f"""
+        WITH posicoes AS (
+            SELECT *, CASE localizacao {lojas} ELSE -1 END AS loja_id FROM estoque_atual {onde}
+        ),
+        vendido AS (
+            SELECT produto_id, loja_id, SUM(quantidade_vendida) AS vendido
+            FROM vendas WHERE data_venda BETWEEN ? AND ?
+            GROUP BY produto_id, loja_id
+        ),
+        prazos AS (
+            SELECT produto_id, AVG(prazo_entrega_dias) AS prazo FROM compras WHERE status_compra = 'Entregue' GROUP BY produto_id
+        )
+        SELECT p.produto_id, p.nome_produto, p.categoria, p.localizacao, p.quantidade_estoque, p.estoque_minimo,
+               COALESCE(v.vendido, 0) AS vendido,
+               COALESCE(pr.prazo, (SELECT AVG(prazo_entrega_dias) FROM compras WHERE status_compra = 'Entregue')) AS prazo
+        FROM posicoes p
+        LEFT JOIN vendido v USING (produto_id, loja_id)
+        LEFT JOIN prazos pr USING (produto_id)
+    """, list(dados.NOMES_LOJAS.values()) + parametros + [para_dia(inicio), para_dia(fim)])
+    return projetar_estoque(posicoes, posicoes['vendido'], dias, posicoes['prazo'], fim)
+
+
+@memoizar(depende=SELECAO + ('data_fim',))
+def reposicao_urgente(base, estado, n=100):
+    return ordenar_reposicao(projecao_estoque(base, estado), n)
+
+
+@memoizar()
+def recomendacoes(base, estado):
+    onde_estoque, parametros_estoque = _onde(estado, condicoes=['quantidade_estoque < estoque_minimo'])
+    ruptura = _primeira_linha(base, f"SELECT COUNT(*) AS n FROM estoque_atual {onde_estoque}", parametros_estoque)
+    tem_vendas = totais_vendas(base, estado)['linhas'] > 0
+
+    parados = produtos_parados(base, estado) if tem_vendas else None
+
+    fornecedor_recomendado = None
+    if tem_vendas and _ha_compras(base, estado):
+        onde, parametros = _onde_compras(estado, entregues=True)
+        fornecedor = base.consultar(f"""
+            SELECT fornecedor FROM compras {onde}
+            GROUP BY fornecedor
+            ORDER BY AVG(prazo_entrega_dias), fornecedor
+            LIMIT 1
+        """, parametros)
+        if len(fornecedor) > 0:
+            fornecedor_recomendado = fornecedor['fornecedor'].iloc[0]
+
+    return {
+        'produtos_ruptura': int(ruptura['n']),
+        'produtos_parados': None if parados is None else len(parados),
+        'tem_vendas': tem_vendas,
+        'fornecedor_recomendado': fornecedor_recomendado,
+    }
+
+
+@memoizar()
+def vendas_por_categoria(base, estado):
+    onde, parametros = _onde_vendas(estado)
+    return base.consultar(f"""
+        SELECT p.categoria, SUM(v.valor_total) AS valor_total, SUM(v.quantidade_vendida) AS quantidade_vendida
+        FROM vendas v JOIN produtos p USING (produto_id)
+        {onde}
+        GROUP BY p.categoria
+        ORDER BY valor_total DESC
+    """, parametros).set_index('categoria').round(6)
@@ -0,0 +1,76 @@
+"""Renovação dos dados em segundo plano, com troca atômica da versão em uso."""
+import os
+import threading
+from datetime import datetime
+
+import dados
+
+
+# Segundos entre verificações dos CSVs; 0 desliga a thread e a verificação
+# passa a ser feita a cada execução do dashboard.
+INTERVALO = float(os.environ.get('DASHBOARD_INTERVALO_ATUALIZACAO', '10'))
+
+
+def descrever(base, no_ar_desde):
+    """Identificador da versão, quando os CSVs dela foram alterados e quando entrou no ar."""
+    identificador, alterado_em = dados.descrever_versao(base.versao)
+    return {'versao': identificador, 'alterado_em': alterado_em, 'no_ar_desde': no_ar_desde}
+
+
+class Atualizador:
+    """Guarda a versão corrente de uma base e monta a próxima fora das execuções do dashboard.
+
+    A thread compara a assinatura dos `FCD_*.csv` a cada `intervalo`
+    segundos; quando mudam, `base.proxima()` carrega a nova versão com seus
+    índices e cubos sem tocar na atual, e a referência é trocada numa
+    atribuição só. Uma execução que já pegou `atual()` segue até o fim com
+    a versão que pegou.
+    """
+
+    def __init__(self, base, intervalo=INTERVALO):
+        self.intervalo = intervalo
+        self.erro = None
+        self._atual = (base, datetime.now())
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def atual(self):
+        """A base em uso e o momento em que ela entrou no ar."""
+        return self._atual
+
+    def verificar(self):
+        """Monta e publica a próxima versão se os CSVs mudaram; devolve se houve troca."""
+        with self._trava:
+            proxima = self._atual[0].proxima()
+            if proxima is None:
+                return False
+            self._atual = (proxima, datetime.now())
+            return True
+
+    def tentar_verificar(self):
+        """Como `verificar`, mas uma falha fica em `erro` e a versão atual continua no ar."""
+        try:
+            trocou = self.verificar()
+        except Exception as erro:  # CSV no meio de uma gravação, por exemplo
+            self.erro = erro
+            return False
+        self.erro = None
+        return trocou
+
+    @property
+    def em_segundo_plano(self):
+        return self._thread is not None
+
+    def iniciar(self):
+        if self._thread is None and self.intervalo > 0:
+            self._thread = threading.Thread(target=self._executar, name='atualizador-dados', daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            self.tentar_verificar()
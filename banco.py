@@ -0,0 +1,222 @@
+"""Backend opcional em SQLite: as quatro tabelas num arquivo local, consultadas por `analises_sql`."""
+import contextlib
+import copy
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+import dados
+
+
+ARQUIVO_BANCO = 'dados.sqlite'
+
+# Incrementar sempre que o esquema abaixo mudar, para reconstruir bancos antigos.
+VERSAO_BANCO = 2
+
+# Datas são guardadas como dias desde 1970-01-01 (inteiros), para comparar e
+# indexar sem conversão de texto.
+ESQUEMA = {
+    'produtos': [('produto_id', 'INTEGER PRIMARY KEY'), ('sku', 'TEXT'), ('nome_produto', 'TEXT'), ('categoria', 'TEXT'),
+                 ('valor_unitario_estoque', 'REAL')],
+    'estoque': [('estoque_id', 'INTEGER'), ('data_referencia', 'INTEGER'), ('produto_id', 'INTEGER'),
+                ('quantidade_estoque', 'INTEGER'), ('estoque_minimo', 'INTEGER'), ('localizacao', 'TEXT')],
+    'vendas': [('venda_id', 'INTEGER'), ('data_venda', 'INTEGER'), ('produto_id', 'INTEGER'), ('loja_id', 'INTEGER'),
+               ('quantidade_vendida', 'INTEGER'), ('valor_unitario', 'REAL'), ('valor_total', 'REAL')],
+    'compras': [('compra_id', 'INTEGER'), ('data_compra', 'INTEGER'), ('produto_id', 'INTEGER'), ('fornecedor', 'TEXT'),
+                ('quantidade_comprada', 'INTEGER'), ('valor_unitario', 'REAL'), ('valor_total', 'REAL'),
+                ('prazo_entrega_dias', 'INTEGER'), ('status_compra', 'TEXT')],
+}
+
+INDICES = [
+    'CREATE INDEX idx_produtos_categoria ON produtos (categoria)',
+    'CREATE INDEX idx_vendas_data ON vendas (data_venda)',
+    'CREATE INDEX idx_vendas_produto ON vendas (produto_id, data_venda)',
+    'CREATE INDEX idx_vendas_loja ON vendas (loja_id, data_venda)',
+    'CREATE INDEX idx_compras_data ON compras (data_compra)',
+    'CREATE INDEX idx_compras_produto ON compras (produto_id, data_compra)',
+    'CREATE INDEX idx_estoque_atual_produto ON estoque_atual (produto_id)',
+]
+
+# Mesma regra de dados.estoque_atual: a posição mais recente de cada
+# produto × localização (no empate, a primeira linha do arquivo), valorizada.
+ESTOQUE_ATUAL = """
+    CREATE TABLE estoque_atual AS
+    SELECT e.estoque_id, e.data_referencia, e.produto_id, e.quantidade_estoque, e.estoque_minimo, e.localizacao,
+           p.sku, p.nome_produto, p.categoria, p.valor_unitario_estoque,
+           e.quantidade_estoque * p.valor_unitario_estoque AS valor_total_estoque
+    FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY produto_id, localizacao ORDER BY data_referencia DESC, rowid) AS ordem
+        FROM estoque
+        WHERE produto_id IS NOT NULL AND localizacao IS NOT NULL AND data_referencia IS NOT NULL
+    ) e
+    LEFT JOIN produtos p USING (produto_id)
+    WHERE e.ordem = 1
+"""
+
+LINHAS_POR_LOTE = 100_000
+
+
+def para_dia(data):
+    return int((np.datetime64(pd.Timestamp(data).date(), 'D') - np.datetime64('1970-01-01', 'D')).astype(np.int64))
+
+
+def de_dia(dia):
+    return pd.Timestamp(np.datetime64(int(dia), 'D'))
+
+
+def conectar(caminho):
+    """Conexão somente leitura; cada consulta abre a sua, então não há estado entre threads."""
+    return contextlib.closing(sqlite3.connect(f'file:{caminho}?mode=ro', uri=True))
+
+
+def versao_gravada(caminho):
+    if not os.path.exists(caminho):
+        return None
+    try:
+        with conectar(caminho) as conexao:
+            linhas = dict(conexao.execute('SELECT chave, valor FROM manifesto').fetchall())
+    except sqlite3.DatabaseError:
+        return None
+    if linhas.get('formato') != str(VERSAO_BANCO):
+        return None
+    return tuple(tuple(item) for item in json.loads(linhas['versao']))
+
+
+def _linhas(df, colunas):
+    valores = []
+    for coluna in colunas:
+        serie = df[coluna]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            dias = serie.to_numpy().astype('datetime64[D]').astype(np.int64)
+            valores.append(np.where(serie.isna().to_numpy(), None, dias).tolist())
+        else:
+            valores.append(serie.astype(object).where(serie.notna(), None).tolist())
+    return zip(*valores)
+
+
+def _inserir(conexao, nome, df):
+    colunas = [coluna for coluna, _ in ESQUEMA[nome]]
+    definicao = ', '.join(f'{coluna} {tipo}' for coluna, tipo in ESQUEMA[nome])
+    conexao.execute(f'CREATE TABLE {nome} ({definicao})')
+    comando = f'INSERT INTO {nome} VALUES ({", ".join("?" * len(colunas))})'
+    for inicio in range(0, len(df), LINHAS_POR_LOTE):
+        conexao.executemany(comando, _linhas(df.iloc[inicio:inicio + LINHAS_POR_LOTE], colunas))
+
+
+def construir_banco(caminho, diretorio=dados.DIRETORIO_CACHE):
+    """Grava as quatro tabelas (lidas pelos snapshots de `dados`) num banco novo e o troca atomicamente."""
+    versao = dados.versao_arquivos()
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    temporario = f'{caminho}.{os.getpid()}.{threading.get_ident()}.tmp'
+    if os.path.exists(temporario):
+        os.remove(temporario)
+
+    with contextlib.closing(sqlite3.connect(temporario)) as conexao:
+        conexao.execute('PRAGMA journal_mode = OFF')
+        conexao.execute('PRAGMA synchronous = OFF')
+        for nome in ESQUEMA:
+            _inserir(conexao, nome, dados.carregar_tabela(nome, diretorio=diretorio))
+        conexao.execute(ESTOQUE_ATUAL)
+        for comando in INDICES:
+            conexao.execute(comando)
+        conexao.execute('CREATE TABLE manifesto (chave TEXT PRIMARY KEY, valor TEXT)')
+        conexao.executemany('INSERT INTO manifesto VALUES (?, ?)',
+                            [('formato', str(VERSAO_BANCO)), ('versao', json.dumps(versao))])
+        conexao.execute('ANALYZE')
+        conexao.commit()
+    os.replace(temporario, caminho)
+    return versao
+
+
+class BancoDados:
+    """Contraparte de `dados.BaseDados` para o backend SQLite.
+
+    Só `produtos` fica em memória; os painéis consultam o banco com
+    `consultar` e recebem apenas o resultado agregado. O banco é reconstruído
+    quando algum CSV muda. Por padrão o arquivo fica no diretório dos
+    snapshots, ou no caminho de `DASHBOARD_BANCO`.
+    """
+
+    def __init__(self, diretorio=dados.DIRETORIO_CACHE, caminho=None):
+        self.caminho = caminho or os.environ.get('DASHBOARD_BANCO') or os.path.join(diretorio, ARQUIVO_BANCO)
+        self.diretorio = diretorio
+        self.versao = None
+        self.produtos = None
+        self._lojas = []
+        self._periodo = (None, None)
+        self._contagem = {}
+        self._trava = threading.Lock()
+
+    def atualizar(self):
+        with self._trava:
+            versao = dados.versao_arquivos()
+            if versao == self.versao:
+                return False
+            if versao_gravada(self.caminho) != versao:
+                versao = construir_banco(self.caminho, self.diretorio)
+
+            produtos = self.consultar('SELECT produto_id, sku, nome_produto, categoria, valor_unitario_estoque FROM produtos')
+            self.produtos = dados.compactar_tipos(produtos)
+            lojas = self.consultar('SELECT DISTINCT loja_id FROM vendas WHERE loja_id IS NOT NULL ORDER BY loja_id')
+            self._lojas = lojas['loja_id'].tolist()
+            inicio, fim = self.consultar('SELECT MIN(data_venda), MAX(data_venda) FROM vendas').iloc[0]
+            self._periodo = (None, None) if pd.isna(inicio) else (de_dia(inicio), de_dia(fim))
+            self._contagem = {nome: int(self.consultar(f'SELECT COUNT(*) AS n FROM {nome}')['n'].iloc[0]) for nome in ESQUEMA}
+            self.versao = versao
+            return True
+
+    def proxima(self):
+        """A versão seguinte como uma nova instância, ou None se os CSVs não mudaram (ver `dados.BaseDados.proxima`).
+
+        O arquivo do banco é trocado no lugar, então consultas desta instância
+        feitas depois da troca já leem a versão nova.
+        """
+        with self._trava:
+            if dados.versao_arquivos() == self.versao:
+                return None
+            nova = copy.copy(self)
+            nova._trava = threading.Lock()
+        nova.atualizar()
+        return nova
+
+    def consultar(self, sql, parametros=()):
+        with conectar(self.caminho) as conexao:
+            return pd.read_sql_query(sql, conexao, params=list(parametros))
+
+    @property
+    def chave_memo(self):
+        """Ver `dados.BaseDados.chave_memo`."""
+        return ('sqlite', self.caminho, self.versao)
+
+    def contagem(self):
+        return self._contagem
+
+    def lojas(self):
+        return self._lojas
+
+    def periodo(self):
+        return self._periodo
+
+    def uso_memoria(self):
+        """Memória de `produtos` e tamanho do arquivo do banco, em bytes."""
+        return pd.DataFrame([
+            {'tabela': 'produtos', 'linhas': len(self.produtos), 'bytes': int(self.produtos.memory_usage(deep=True).sum()),
+             'bytes_mapeados': 0},
+            {'tabela': 'banco (disco)', 'linhas': None, 'bytes': os.path.getsize(self.caminho), 'bytes_mapeados': 0},
+        ])
+
+
+def abrir(backend='pandas', diretorio=dados.DIRETORIO_CACHE):
+    """A base do backend escolhido ('pandas' ou 'sqlite') e o módulo com as análises correspondentes."""
+    import analises
+    import analises_sql
+
+    if backend == 'sqlite':
+        return BancoDados(diretorio=diretorio), analises_sql
+    if backend == 'pandas':
+        return dados.BaseDados(diretorio), analises
+    raise ValueError(f"backend desconhecido: {backend}")
@@ -0,0 +1,328 @@
+"""Mede carga, deduplicação do estoque, filtros, cada painel e os gráficos em várias escalas de dados sintéticos.
+
+Os tempos (melhor de N repetições, em segundos) e a memória de cada escala
+vão para um JSON, que pode ser comparado com o de uma versão anterior.
+
+Exemplos:
+    python benchmark.py
+    python benchmark.py --escalas 1e4 1e5 1e6 1e7 1e8 --saida bench/atual.json
+    python benchmark.py --comparar bench/anterior.json
+"""
+import argparse
+import functools
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.tools
+import plotly.utils
+
+import analises
+import dados
+import filtros
+import fornecedores
+import gerar_dados
+import graficos
+import particoes
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+ESCALAS_PADRAO = ['1e4', '1e5', '1e6']
+
+# Orçamento da ingestão em blocos medida em `base_em_blocos`.
+ORCAMENTO_BLOCOS_MB = 64
+
+PAINEIS = [
+    'indicadores', 'visao_produto', 'produtos_criticos', 'top_vendas', 'maiores_gastos',
+    'analise_fornecedores', 'serie_temporal', 'analise_consolidada', 'vendas_por_loja',
+    'produtos_parados', 'recomendacoes', 'vendas_por_categoria', 'projecao_estoque',
+]
+
+
+def cronometrar(funcao, repeticoes=3, preparar=None):
+    """Melhor tempo de `repeticoes` chamadas; `preparar` roda antes de cada uma, fora da medição."""
+    melhor = math.inf
+    for _ in range(repeticoes):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def preparar_dados(linhas, diretorio, produtos, lojas, dias, semente):
+    """Gera (ou reaproveita) os CSVs sintéticos de uma escala; devolve o diretório e as linhas de vendas."""
+    vendas_por_dia = max(1, math.ceil(linhas / dias))
+    parametros = dict(produtos=produtos, lojas=lojas, dias=dias, vendas_por_dia=vendas_por_dia, semente=semente)
+    destino = os.path.join(diretorio, str(linhas))
+    caminho_parametros = os.path.join(destino, 'parametros.json')
+
+    if os.path.exists(caminho_parametros):
+        with open(caminho_parametros, encoding='utf-8') as f:
+            if json.load(f) == parametros:
+                return destino, dias * vendas_por_dia
+    shutil.rmtree(destino, ignore_errors=True)
+    gerar_dados.gerar(destino, **parametros)
+    with open(caminho_parametros, 'w', encoding='utf-8') as f:
+        json.dump(parametros, f)
+    return destino, dias * vendas_por_dia
+
+
+def estados_teste(base):
+    """Sem filtro, e um filtro típico: uma categoria, uma loja e o semestre do meio do período."""
+    categoria = sorted(base.produtos['categoria'].dropna().unique().tolist())[0]
+    loja = int(base.cubos['vendas'].chaves[0])
+    datas = base.vendas['data_venda']
+    meio = datas.iloc[0] + (datas.iloc[-1] - datas.iloc[0]) / 2
+    produto = int(base.produtos['produto_id'].iloc[0])
+    return {
+        'sem_filtro': filtros.EstadoFiltro(),
+        'filtrado': filtros.EstadoFiltro.criar([categoria], None, [loja], meio - pd.Timedelta(days=91), meio + pd.Timedelta(days=91)),
+        'produto': filtros.EstadoFiltro.criar((), [produto]),
+    }
+
+
+def entradas_graficos(base, estado):
+    """Os gráficos que o dashboard desenha para `estado`, como (id, chave, entradas, parâmetros) de `graficos.FIGURAS`."""
+    chamadas = [
+        ('deficit_criticos', analises.produtos_criticos, {'n': 20}),
+        ('top_vendas_quantidade', analises.top_vendas, {}),
+        ('top_vendas_receita', analises.top_vendas, {}),
+        ('maiores_gastos', analises.maiores_gastos, {}),
+        ('serie_temporal', analises.serie_temporal, {'freq': 'M'}),
+        ('analise_consolidada', analises.analise_consolidada, {}),
+        ('receita_lojas', analises.vendas_por_loja, {}),
+        ('quantidade_lojas', analises.vendas_por_loja, {}),
+        ('receita_categorias', analises.vendas_por_categoria, {}),
+        ('preco_fornecedores', analises.analise_fornecedores, {}),
+        ('prazo_fornecedores', analises.analise_fornecedores, {}),
+        ('matriz_fornecedores', analises.analise_fornecedores, {}),
+    ]
+    desenhados = []
+    for grafico, analise, argumentos in chamadas:
+        resultado = analise(base, estado, **argumentos)
+        if resultado is None:
+            continue
+        entradas = resultado if isinstance(resultado, tuple) else (resultado,)
+        if len(entradas[0]) > 0:
+            parametros = {'titulo': 'Mensal', 'eixo': 'Mês'} if grafico == 'serie_temporal' else {}
+            desenhados.append((grafico, analise.chave(base, estado, **argumentos), entradas, parametros))
+    return desenhados
+
+
+def serializar(figura):
+    """O que o `st.plotly_chart` faz com a figura a cada execução: conversão, validação e JSON."""
+    return json.dumps(plotly.tools.return_figure_from_figure_or_data(figura, validate_figure=True),
+                      cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def medir_graficos(base, estado, repeticoes):
+    """Construção e serialização (como em `st.plotly_chart`) de todos os gráficos de uma execução, e a serialização com o cache de figuras já quente."""
+    chamadas = entradas_graficos(base, estado)
+    figuras = [graficos.construir(grafico, *entradas, **parametros) for grafico, _, entradas, parametros in chamadas]
+    cache = graficos.CacheFiguras()
+    em_cache = lambda: [serializar(cache.figura(grafico, chave, *entradas, **parametros))
+                        for grafico, chave, entradas, parametros in chamadas]
+    em_cache()
+    return {
+        'construir': cronometrar(lambda: [graficos.construir(grafico, *entradas, **parametros)
+                                          for grafico, _, entradas, parametros in chamadas], repeticoes),
+        'serializar': cronometrar(lambda: [serializar(figura) for figura in figuras], repeticoes),
+        'em_cache': cronometrar(em_cache, repeticoes),
+    }
+
+
+def pico_memoria():
+    """Pico de memória residente do processo, em bytes (None fora de sistemas Unix)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if platform.system() == 'Darwin' else pico * 1024
+
+
+def medir(diretorio, repeticoes=3):
+    """Tempos e memória de uma escala; os CSVs são lidos de `diretorio`."""
+    anterior = os.getcwd()
+    os.chdir(diretorio)
+    try:
+        cache = os.path.join(diretorio, '.cache_dados')
+        shutil.rmtree(cache, ignore_errors=True)
+        tempos = {}
+
+        tempos['carga_csv'] = cronometrar(lambda: [dados.ler_csv(nome) for nome in dados.ARQUIVOS], 1)
+        coluna, formato = dados.FORMATOS_DATA['vendas']
+        texto = pd.read_csv(dados.ARQUIVOS['vendas'], sep=';', usecols=[coluna])[coluna]
+        tempos['datas_por_linha'] = cronometrar(lambda: pd.to_datetime(texto, format=formato, cache=False), repeticoes)
+        tempos['datas_unicas'] = cronometrar(lambda: dados.converter_datas(texto, formato), repeticoes)
+        if dados.SNAPSHOT_DISPONIVEL:
+            limpar = functools.partial(shutil.rmtree, cache, ignore_errors=True)
+            tempos['carga_snapshot_fria_sequencial'] = cronometrar(
+                lambda: dados.carregar_dados(cache, trabalhadores=1), 1, preparar=limpar
+            )
+            tempos['carga_snapshot_fria'] = cronometrar(lambda: dados.carregar_dados(cache), 1, preparar=limpar)
+            tempos['carga_snapshot'] = cronometrar(lambda: dados.carregar_dados(cache), repeticoes)
+        tempos['base_completa'] = cronometrar(
+            lambda: dados.BaseDados(cache, orcamento_mb=None, recorte=None).atualizar(), repeticoes
+        )
+        tempos['base_em_blocos'] = cronometrar(
+            lambda: dados.BaseDados(cache, orcamento_mb=ORCAMENTO_BLOCOS_MB, recorte=None).atualizar(), 1
+        )
+
+        base = dados.BaseDados(cache, orcamento_mb=None, recorte=None)
+        base.atualizar()
+        if dados.SNAPSHOT_DISPONIVEL:
+            # Uma loja e o último mês: só as partições correspondentes são lidas.
+            fim = base.vendas['data_venda'].iloc[-1]
+            recorte = filtros.Recorte(lojas=(int(base.cubos['vendas'].chaves[0]),),
+                                      data_inicio=(fim - pd.offsets.MonthBegin(1)).date(), data_fim=fim.date())
+            tabelas = dados.carregar_tabelas(particoes.PARTICIONADAS, cache)
+            tempos['particionar'] = cronometrar(
+                lambda: [particoes.particionar(nome, df, cache) for nome, df in tabelas.items()], 1
+            )
+            tempos['base_recorte'] = cronometrar(
+                lambda: dados.BaseDados(cache, orcamento_mb=None, recorte=recorte).atualizar(), repeticoes
+            )
+        tempos['estoque_atual'] = cronometrar(lambda: dados.estoque_atual(base.estoque, base.produtos), repeticoes)
+        for nome in dados.COLUNAS_DATA:
+            tabela = getattr(base, nome)
+            tempos[f'indices_{nome}'] = cronometrar(lambda: dados.construir_filtros(nome, tabela), repeticoes)
+            tempos[f'cubo_{nome}'] = cronometrar(lambda: dados.construir_cubo(nome, tabela, base.produtos), repeticoes)
+        tempos['estatisticas_fornecedores'] = cronometrar(lambda: fornecedores.EstatisticasFornecedores(base.compras), repeticoes)
+
+        estados = estados_teste(base)
+        filtrado = estados['filtrado']
+        produtos = analises.produtos_selecionados(base, filtrado)
+        tempos['filtrar_vendas'] = cronometrar(
+            lambda: base.filtros['vendas'].filtrar(filtrado.data_inicio, filtrado.data_fim,
+                                                   produto_id=produtos, loja_id=filtrado.lojas),
+            repeticoes,
+        )
+        tempos['filtrar_compras'] = cronometrar(lambda: analises.compras_filtradas(base, filtrado), repeticoes,
+                                                preparar=analises.limpar_memos)
+        tempos['filtrar_estoque'] = cronometrar(lambda: analises.estoque_filtrado(base, filtrado), repeticoes,
+                                                preparar=analises.limpar_memos)
+
+        for nome_estado, estado in estados.items():
+            for painel in PAINEIS:
+                funcao = getattr(analises, painel)
+                tempos[f'{painel}[{nome_estado}]'] = cronometrar(
+                    lambda: funcao(base, estado), repeticoes, preparar=analises.limpar_memos
+                )
+            # Por execução do dashboard: antes, todo gráfico era construído e serializado; agora sai do cache.
+            for etapa, tempo in medir_graficos(base, estado, repeticoes).items():
+                tempos[f'figuras_{etapa}[{nome_estado}]'] = tempo
+        analises.limpar_memos()
+
+        memoria = {linha.tabela: int(linha.bytes) for linha in base.uso_memoria().itertuples()}
+        return {
+            'linhas': {nome: len(getattr(base, nome)) for nome in dados.ARQUIVOS},
+            'tempos': tempos,
+            'memoria_bytes': memoria,
+            'pico_memoria_bytes': pico_memoria(),
+        }
+    finally:
+        os.chdir(anterior)
+
+
+def versao_codigo():
+    try:
+        resultado = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return resultado.stdout.strip() or None
+
+
+def ambiente():
+    try:
+        import pyarrow
+        versao_pyarrow = pyarrow.__version__
+    except ImportError:
+        versao_pyarrow = None
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'pyarrow': versao_pyarrow,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def comparar(atual, anterior):
+    """Razão atual/anterior de cada tempo presente nas duas execuções, por escala."""
+    anteriores = {escala['linhas_vendas']: escala['tempos'] for escala in anterior['escalas']}
+    linhas = []
+    for escala in atual['escalas']:
+        tempos_anteriores = anteriores.get(escala['linhas_vendas'], {})
+        for secao, tempo in escala['tempos'].items():
+            if secao in tempos_anteriores:
+                linhas.append({
+                    'linhas_vendas': escala['linhas_vendas'],
+                    'secao': secao,
+                    'anterior': tempos_anteriores[secao],
+                    'atual': tempo,
+                    'razao': tempo / tempos_anteriores[secao] if tempos_anteriores[secao] > 0 else None,
+                })
+    return pd.DataFrame(linhas, columns=['linhas_vendas', 'secao', 'anterior', 'atual', 'razao'])
+
+
+def _escala(texto):
+    return int(float(texto))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de carga e agregação do Super-Dashboard Integrado.")
+    parser.add_argument('--escalas', nargs='+', type=_escala, default=[_escala(e) for e in ESCALAS_PADRAO],
+                        help="Linhas de vendas de cada escala (ex.: 1e4 1e5 1e6 1e7 1e8)")
+    parser.add_argument('--produtos', type=int, default=1000)
+    parser.add_argument('--lojas', type=int, default=3)
+    parser.add_argument('--dias', type=int, default=730)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--dados', default='bench_dados', help="Diretório dos CSVs sintéticos (reaproveitados entre execuções)")
+    parser.add_argument('--saida', default=os.path.join('bench_dados', 'resultado.json'))
+    parser.add_argument('--comparar', help="JSON de uma execução anterior")
+    args = parser.parse_args(argv)
+
+    resultado = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'versao': versao_codigo(),
+        'ambiente': ambiente(),
+        'parametros': {'produtos': args.produtos, 'lojas': args.lojas, 'dias': args.dias,
+                       'semente': args.semente, 'repeticoes': args.repeticoes},
+        'escalas': [],
+    }
+    diretorio_dados = os.path.abspath(args.dados)
+    for linhas in args.escalas:
+        diretorio, linhas_vendas = preparar_dados(linhas, diretorio_dados, args.produtos, args.lojas, args.dias, args.semente)
+        print(f"escala {linhas_vendas} linhas de vendas...", flush=True)
+        resultado['escalas'].append({'linhas_vendas': linhas_vendas, **medir(diretorio, args.repeticoes)})
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+    tabela = pd.DataFrame([escala['tempos'] for escala in resultado['escalas']],
+                          index=[escala['linhas_vendas'] for escala in resultado['escalas']]).T
+    print(tabela.to_string(float_format=lambda t: f'{t:.4f}'))
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            anterior = json.load(f)
+        print(comparar(resultado, anterior).to_string(index=False, float_format=lambda t: f'{t:.3f}'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Ingestão em blocos: vendas, compras e estoque lidos aos pedaços e dobrados nos agregados do dashboard.
+
+Usada por `dados.BaseDados` quando há um orçamento de memória
+(`DASHBOARD_ORCAMENTO_MB`); as linhas brutas nunca ficam todas em memória.
+"""
+import pandas as pd
+
+import dados
+import fornecedores
+
+
+# Estimativa do custo de uma linha durante a leitura do CSV (texto lido,
+# colunas convertidas e o agrupamento do bloco).
+BYTES_POR_LINHA = 512
+
+# Chaves (a data primeiro) e medidas somadas de cada tabela.
+AGREGACOES = {
+    'vendas': (['data_venda', 'produto_id', 'loja_id'], ['quantidade_vendida', 'valor_total']),
+    'compras': (['data_compra', 'produto_id', 'fornecedor', 'status_compra'],
+                ['quantidade_comprada', 'valor_total', 'valor_unitario', 'prazo_entrega_dias',
+                 'valor_unitario_quadrado', 'prazo_entrega_dias_quadrado', 'no_prazo']),
+}
+
+
+def linhas_por_bloco(orcamento_bytes):
+    """Um quarto do orçamento vai para o bloco em leitura; o resto fica para os agregados parciais."""
+    return max(10_000, int(orcamento_bytes // (4 * BYTES_POR_LINHA)))
+
+
+def ler_em_blocos(nome, linhas, caminho=None):
+    caminho = caminho or dados.ARQUIVOS[nome]
+    with pd.read_csv(caminho, sep=';', encoding='utf-8', chunksize=linhas) as leitor:
+        for bloco in leitor:
+            yield dados.preparar_tabela(nome, bloco)
+
+
+class Agregador:
+    """Somas das medidas (e contagem em `linhas`) por combinação das chaves, bloco a bloco.
+
+    Cada bloco vira um agregado parcial, pendente até ser somado ao
+    agregado acumulado. A soma acontece quando os parciais pendentes passam
+    de `limite_linhas` ou do tamanho do próprio acumulado, o que for maior:
+    assim cada redução é paga por pelo menos tantas linhas novas quanto as
+    que ela percorre, e a ingestão fica linear no número de blocos. O
+    orçamento limita os parciais pendentes; o acumulado cresce com o número
+    de combinações distintas das chaves, não com o de linhas.
+    """
+
+    def __init__(self, chaves, medidas, limite_linhas):
+        self.chaves = chaves
+        self.medidas = ['linhas'] + medidas
+        self.limite_linhas = limite_linhas
+        self.linhas_lidas = 0
+        self._somado = None
+        self._parciais = []
+        self._linhas_pendentes = 0
+
+    def somar(self, bloco):
+        self.linhas_lidas += len(bloco)
+        bloco = bloco.assign(linhas=1)
+        # Somas em 64 bits: os tipos compactos do bloco estourariam ou perderiam precisão.
+        for medida in self.medidas:
+            tipo = 'int64' if pd.api.types.is_integer_dtype(bloco[medida]) else 'float64'
+            bloco[medida] = bloco[medida].astype(tipo)
+        # Chaves de texto como object: as categorias mudam de um bloco para outro.
+        for chave in self.chaves:
+            if isinstance(bloco[chave].dtype, pd.CategoricalDtype):
+                bloco[chave] = bloco[chave].astype(object)
+        parcial = bloco.groupby(self.chaves, sort=False, dropna=False)[self.medidas].sum()
+        self._parciais.append(parcial)
+        self._linhas_pendentes += len(parcial)
+        acumuladas = 0 if self._somado is None else len(self._somado)
+        if self._linhas_pendentes > max(self.limite_linhas, acumuladas):
+            self._reduzir()
+
+    def _reduzir(self):
+        partes = ([] if self._somado is None else [self._somado]) + self._parciais
+        if len(partes) > 1:
+            self._somado = pd.concat(partes).groupby(level=list(range(len(self.chaves))), sort=False, dropna=False).sum()
+        elif partes:
+            self._somado = partes[0]
+        self._parciais = []
+        self._linhas_pendentes = 0
+
+    def resultado(self):
+        """Tabela agregada, ordenada pelas chaves (a data primeiro) e com tipos compactos."""
+        self._reduzir()
+        if self._somado is None:
+            return pd.DataFrame(columns=self.chaves + self.medidas)
+        df = self._somado.reset_index().sort_values(self.chaves, kind='stable', ignore_index=True)
+        return dados.compactar_tipos(df)
+
+
+def agregar(nome, linhas, caminho=None):
+    """Agregado de vendas ou compras lido em blocos de `linhas`; devolve a tabela e as linhas lidas."""
+    chaves, medidas = AGREGACOES[nome]
+    agregador = Agregador(chaves, medidas, limite_linhas=linhas)
+    for bloco in ler_em_blocos(nome, linhas, caminho):
+        # Quadrados e entregas no prazo só podem ser calculados antes de somar as linhas.
+        agregador.somar(fornecedores.derivar(bloco) if nome == 'compras' else bloco)
+    return agregador.resultado(), agregador.linhas_lidas
+
+
+def estoque_mais_recente(linhas, caminho=None):
+    """A linha mais recente de cada produto × localização, lida em blocos; devolve as linhas e o total lido.
+
+    No empate de data vale a primeira linha do arquivo, como em `dados.posicoes_recentes`.
+    """
+    atual, lidas = None, 0
+    for bloco in ler_em_blocos('estoque', linhas, caminho):
+        lidas += len(bloco)
+        atual = dados.posicoes_recentes(bloco) if atual is None else dados.atualizar_posicoes(atual, bloco)
+    return atual, lidas
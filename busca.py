@@ -0,0 +1,99 @@
+"""Busca de produtos por nome e SKU, para a barra lateral não enviar o catálogo inteiro ao navegador."""
+import math
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from analises import memoizar
+
+
+# Máximo de produtos oferecidos no multiselect para o texto buscado.
+LIMITE_RESULTADOS = 50
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos, para comparar o texto digitado com nomes e SKUs."""
+    texto = unicodedata.normalize('NFKD', str(texto).lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+class IndiceProdutos:
+    """Índice de busca sobre `nome_produto` e `sku`.
+
+    Cada palavra do nome e o SKU viram termos de um vocabulário ordenado, e
+    os produtos de cada termo ficam contíguos em `_donos`; os termos que
+    começam com um prefixo formam um intervalo do vocabulário achado com
+    `searchsorted`, então uma busca não percorre o catálogo. Um produto casa
+    quando cada palavra digitada é prefixo de algum dos seus termos.
+    """
+
+    def __init__(self, df_produtos):
+        self.ids = df_produtos['produto_id'].to_numpy()
+        self.categorias = df_produtos['categoria'].astype(object).to_numpy()
+        self._nomes = dict(zip(self.ids.tolist(), df_produtos['nome_produto'].astype(str)))
+        self._posicoes = {produto_id: posicao for posicao, produto_id in enumerate(self.ids.tolist())}
+
+        nomes = df_produtos['nome_produto'].astype(str).map(normalizar).reset_index(drop=True)
+        self._nomes_normalizados = nomes.to_numpy(dtype=object)
+        self._ordem_alfabetica = np.argsort(np.argsort(self._nomes_normalizados, kind='stable'), kind='stable')
+
+        palavras = nomes.str.split().explode().dropna()
+        skus = df_produtos['sku'].astype(str).map(normalizar).reset_index(drop=True)
+        termos = pd.DataFrame({
+            'termo': np.concatenate([palavras.to_numpy(dtype=object), skus.to_numpy(dtype=object)]),
+            'posicao': np.concatenate([palavras.index.to_numpy(), skus.index.to_numpy()]),
+        }).drop_duplicates().sort_values(['termo', 'posicao'], kind='stable')
+
+        self._vocabulario, inicio = np.unique(termos['termo'].to_numpy(dtype=str), return_index=True)
+        self._inicio = np.append(inicio, len(termos))
+        self._donos = termos['posicao'].to_numpy(dtype=np.int32)
+
+    def nome(self, produto_id):
+        return self._nomes.get(produto_id, str(produto_id))
+
+    def na_categoria(self, produto_id, categorias):
+        if not categorias:
+            return produto_id in self._posicoes
+        posicao = self._posicoes.get(produto_id)
+        return posicao is not None and self.categorias[posicao] in categorias
+
+    def contar(self, categorias=()):
+        if not categorias:
+            return len(self.ids)
+        return int(np.isin(self.categorias, list(categorias)).sum())
+
+    def _com_prefixo(self, prefixo):
+        a = np.searchsorted(self._vocabulario, prefixo, 'left')
+        b = np.searchsorted(self._vocabulario, prefixo + '\uffff', 'left')
+        return np.unique(self._donos[self._inicio[a]:self._inicio[b]])
+
+    def buscar(self, texto, categorias=(), limite=LIMITE_RESULTADOS):
+        """Ids de até `limite` produtos das `categorias` que casam com `texto`.
+
+        Primeiro os nomes que começam com o texto digitado, depois os demais,
+        em ordem alfabética. Sem texto, os primeiros em ordem alfabética.
+        """
+        palavras = normalizar(texto).split()
+        if palavras:
+            posicoes = self._com_prefixo(palavras[0])
+            for palavra in palavras[1:]:
+                posicoes = np.intersect1d(posicoes, self._com_prefixo(palavra), assume_unique=True)
+        else:
+            posicoes = np.arange(len(self.ids))
+        if categorias:
+            posicoes = posicoes[np.isin(self.categorias[posicoes], list(categorias))]
+
+        alfabetica = self._ordem_alfabetica[posicoes]
+        if not palavras:
+            return self.ids[posicoes[np.argsort(alfabetica)[:limite]]].tolist()
+        digitado = ' '.join(palavras)
+        comeca = np.array([nome.startswith(digitado) for nome in self._nomes_normalizados[posicoes]], dtype=bool)
+        ordem = np.lexsort((alfabetica, ~comeca))
+        return self.ids[posicoes[ordem[:limite]]].tolist()
+
+
+@memoizar(maximo=2, validade=math.inf)
+def indice_produtos(base):
+    """Índice de busca dos produtos da base, montado uma vez por versão dos dados."""
+    return IndiceProdutos(base.produtos)
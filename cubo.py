@@ -0,0 +1,171 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+
+class Cubo:
+    """Cubo denso produto × chave × dia com somas acumuladas ao longo dos dias.
+
+    `chave` é a segunda dimensão da tabela (loja em vendas, status em
+    compras). `acumulado[d]` guarda a soma de cada medida do primeiro dia até
+    o dia `d - 1`, então qualquer período sai de uma subtração de duas fatias,
+    em O(produtos × chaves), independente do número de linhas. A medida
+    `linhas` conta as linhas originais, para distinguir "sem dados" de "soma
+    zero" (numa tabela já agregada, vem da sua coluna `linhas`). Medidas
+    inteiras voltam como inteiros e as demais são arredondadas para
+    descartar o ruído da subtração em ponto flutuante.
+    """
+
+    def __init__(self, df, coluna_data, coluna_chave, medidas, df_produtos):
+        self.coluna_data = coluna_data
+        self.coluna_chave = coluna_chave
+        self.medidas = ['linhas'] + list(medidas)
+        self.inteiras = ['linhas'] + [m for m in medidas if pd.api.types.is_integer_dtype(df[m])]
+        self.produtos = np.union1d(df_produtos['produto_id'].to_numpy(), df['produto_id'].unique())
+        self.chaves = np.sort(pd.unique(df[coluna_chave].dropna().to_numpy()))
+        categorias = df_produtos.set_index('produto_id')['categoria']
+        self.categorias = categorias.reindex(self.produtos).to_numpy()
+
+        datas = df[coluna_data].to_numpy().astype('datetime64[D]')
+        if len(datas) > 0:
+            self.inicio = datas.min()
+            self.dias = int((datas.max() - self.inicio).astype(np.int64)) + 1
+        else:
+            self.inicio = np.datetime64('1970-01-01', 'D')
+            self.dias = 0
+
+        self.acumulado = np.zeros((self.dias + 1, len(self.produtos), len(self.chaves), len(self.medidas)))
+        self._acumular(df, datas, 0, self.acumulado[1:])
+
+    def _acumular(self, df, datas, primeiro_dia, destino):
+        """Soma acumulada, a partir de `primeiro_dia`, das linhas de `df` (datas em `datas`) em `destino`."""
+        validas = df[self.coluna_chave].notna().to_numpy()
+        dia = (datas[validas] - self.inicio).astype(np.int64) - primeiro_dia
+        produto = np.searchsorted(self.produtos, df['produto_id'].to_numpy()[validas])
+        chave = np.searchsorted(self.chaves, df[self.coluna_chave].to_numpy()[validas])
+        dias, n_produtos, n_chaves = destino.shape[:3]
+        celula = (dia * n_produtos + produto) * n_chaves + chave
+        for m, medida in enumerate(self.medidas):
+            if medida == 'linhas' and 'linhas' not in df.columns:
+                pesos = None
+            else:
+                pesos = df[medida].to_numpy(dtype=float)[validas]
+            diario = np.bincount(celula, weights=pesos, minlength=dias * n_produtos * n_chaves)
+            np.cumsum(diario.reshape(dias, n_produtos, n_chaves), axis=0, out=destino[:, :, :, m])
+
+    def estender(self, linhas):
+        """Novo cubo com as `linhas` somadas, refazendo as somas acumuladas só do primeiro dia que elas tocam em diante.
+
+        Devolve None quando as linhas trazem um produto ou uma chave fora do
+        cubo ou um dia antes do início; aí o cubo precisa ser construído de
+        novo. Este cubo não é alterado.
+        """
+        validas = linhas[self.coluna_chave].notna().to_numpy()
+        if not validas.any():
+            return self
+        datas = linhas[self.coluna_data].to_numpy().astype('datetime64[D]')
+        dias_linhas = (datas[validas] - self.inicio).astype(np.int64)
+        if (self.dias == 0 or dias_linhas.min() < 0
+                or not np.isin(linhas['produto_id'].to_numpy()[validas], self.produtos).all()
+                or not np.isin(linhas[self.coluna_chave].to_numpy()[validas], self.chaves).all()):
+            return None
+
+        primeiro = int(dias_linhas.min())
+        dias = max(self.dias, int(dias_linhas.max()) + 1)
+        # Dias depois do último do cubo repetem o acumulado final das linhas antigas.
+        acumulado = self.acumulado[np.minimum(np.arange(dias + 1), self.dias)]
+        somas = np.empty((dias - primeiro,) + self.acumulado.shape[1:])
+        self._acumular(linhas, datas, primeiro, somas)
+        acumulado[primeiro + 1:] += somas
+
+        novo = copy.copy(self)
+        novo.acumulado, novo.dias = acumulado, dias
+        return novo
+
+    @property
+    def nbytes(self):
+        return self.acumulado.nbytes
+
+    def _tipar(self, resultado):
+        inteiras = [m for m in self.inteiras if m in resultado]
+        resultado = resultado.round(6)
+        resultado[inteiras] = np.rint(resultado[inteiras]).astype(np.int64)
+        return resultado
+
+    def _dia(self, data):
+        return int((np.datetime64(pd.Timestamp(data).date(), 'D') - self.inicio).astype(np.int64))
+
+    def _limites(self, data_inicio=None, data_fim=None):
+        a = 0 if data_inicio is None else min(max(self._dia(data_inicio), 0), self.dias)
+        b = self.dias if data_fim is None else min(max(self._dia(data_fim) + 1, 0), self.dias)
+        return a, max(a, b)
+
+    def _mascaras(self, produtos=None, categorias=None, chaves=None):
+        mascara_produtos = np.ones(len(self.produtos), dtype=bool)
+        if produtos is not None and len(produtos) > 0:
+            mascara_produtos &= np.isin(self.produtos, produtos)
+        if categorias is not None and len(categorias) > 0:
+            mascara_produtos &= pd.Series(self.categorias).isin(categorias).to_numpy()
+        mascara_chaves = np.ones(len(self.chaves), dtype=bool)
+        if chaves is not None and len(chaves) > 0:
+            mascara_chaves &= np.isin(self.chaves, chaves)
+        return mascara_produtos, mascara_chaves
+
+    def somar(self, data_inicio=None, data_fim=None, produtos=None, categorias=None, chaves=None, por=None):
+        """Soma das medidas no período e na seleção.
+
+        `por` pode ser None (uma Series com o total de cada medida),
+        'produto_id', a coluna de chave ou 'categoria' (um DataFrame só com os
+        grupos que têm linhas, como um groupby sobre as linhas filtradas).
+        Seleções vazias (ou None) não filtram.
+        """
+        a, b = self._limites(data_inicio, data_fim)
+        mascara_produtos, mascara_chaves = self._mascaras(produtos, categorias, chaves)
+        periodo = self.acumulado[b] - self.acumulado[a]
+        periodo = periodo[mascara_produtos][:, mascara_chaves]
+
+        if por is None:
+            return self._tipar(pd.DataFrame([periodo.sum(axis=(0, 1))], columns=self.medidas)).iloc[0]
+        if por == self.coluna_chave:
+            resultado = pd.DataFrame(periodo.sum(axis=0), columns=self.medidas,
+                                     index=pd.Index(self.chaves[mascara_chaves], name=por))
+        else:
+            resultado = pd.DataFrame(periodo.sum(axis=1), columns=self.medidas,
+                                     index=pd.Index(self.produtos[mascara_produtos], name='produto_id'))
+            if por == 'categoria':
+                resultado = resultado.groupby(self.categorias[mascara_produtos]).sum()
+                resultado.index.name = 'categoria'
+        return self._tipar(resultado[resultado['linhas'] > 0])
+
+    @property
+    def ultimo_dia(self):
+        return pd.Timestamp(self.inicio + np.timedelta64(max(self.dias - 1, 0), 'D'))
+
+    def valores(self, medida, produtos, chaves, data_inicio=None, data_fim=None):
+        """Soma de `medida` no período para cada par (`produtos[i]`, `chaves[i]`); pares fora do cubo valem 0."""
+        produtos, chaves = np.asarray(produtos), np.asarray(chaves)
+        if len(self.produtos) == 0 or len(self.chaves) == 0:
+            return np.zeros(len(produtos))
+        a, b = self._limites(data_inicio, data_fim)
+        m = self.medidas.index(medida)
+        i = np.minimum(np.searchsorted(self.produtos, produtos), len(self.produtos) - 1)
+        j = np.minimum(np.searchsorted(self.chaves, chaves), len(self.chaves) - 1)
+        validos = (self.produtos[i] == produtos) & (self.chaves[j] == chaves)
+        return np.where(validos, np.round(self.acumulado[b, i, j, m] - self.acumulado[a, i, j, m], 6), 0.0)
+
+    def serie(self, data_inicio=None, data_fim=None, produtos=None, categorias=None, chaves=None, freq='M'):
+        """Soma das medidas por período de calendário (mês, por padrão) dentro do intervalo."""
+        a, b = self._limites(data_inicio, data_fim)
+        if b == a:
+            return pd.DataFrame(columns=self.medidas)
+        mascara_produtos, mascara_chaves = self._mascaras(produtos, categorias, chaves)
+
+        primeiro = pd.Timestamp(self.inicio) + pd.Timedelta(days=a)
+        ultimo = pd.Timestamp(self.inicio) + pd.Timedelta(days=b - 1)
+        rotulos = pd.period_range(primeiro, ultimo, freq=freq).to_timestamp()
+        cortes = [max(a, self._dia(r)) for r in rotulos] + [b]
+
+        acumulado = self.acumulado[cortes][:, mascara_produtos][:, :, mascara_chaves].sum(axis=(1, 2))
+        resultado = pd.DataFrame(np.diff(acumulado, axis=0), columns=self.medidas, index=rotulos)
+        return self._tipar(resultado[resultado['linhas'] > 0])
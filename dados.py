@@ -0,0 +1,781 @@
+import copy
+import glob
+import hashlib
+import io
+import json
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import filtros
+from cubo import Cubo
+from fornecedores import EstatisticasFornecedores
+
+try:
+    from pyarrow import feather
+    SNAPSHOT_DISPONIVEL = True
+except ImportError:
+    SNAPSHOT_DISPONIVEL = False
+
+# Snapshots são lidos mapeando o arquivo em memória: as colunas apontam
+# direto para as páginas do arquivo, compartilhadas entre processos. No
+# Windows um arquivo mapeado não pode ser substituído, então lá são copiados.
+MAPEAR_SNAPSHOT = SNAPSHOT_DISPONIVEL and os.name != 'nt'
+
+
+ARQUIVOS = {
+    'estoque': 'FCD_estoque.csv',
+    'vendas': 'FCD_vendas.csv',
+    'compras': 'FCD_compras.csv',
+    'produtos': 'FCD_produtos.csv',
+}
+
+DIRETORIO_CACHE = os.environ.get('DASHBOARD_CACHE_DIR', '.cache_dados')
+
+# Incrementar sempre que o formato das tabelas preparadas mudar,
+# para que snapshots antigos sejam descartados.
+VERSAO_SNAPSHOT = 7
+
+# Coluna de data de cada tabela e o formato em que vem no CSV.
+FORMATOS_DATA = {
+    'estoque': ('data_referencia', '%Y-%m-%d'),
+    'vendas': ('data_venda', '%d/%m/%Y'),
+    'compras': ('data_compra', '%d/%m/%Y'),
+}
+
+# Tabelas que normalmente só recebem linhas no fim do arquivo (o PDV e as
+# contagens de estoque), com o id de cada linha. Uma contagem corrigida no
+# lugar muda o hash dos bytes já ingeridos e a tabela é recarregada inteira.
+TABELAS_INCREMENTAIS = {'vendas': 'venda_id', 'compras': 'compra_id', 'estoque': 'estoque_id'}
+# Tabelas de movimento, ordenadas por data e com índices de filtro e cubo.
+COLUNAS_DATA = {'vendas': 'data_venda', 'compras': 'data_compra'}
+
+# Posições atuais do estoque persistidas junto dos snapshots.
+ARQUIVO_POSICOES = 'posicoes_estoque'
+
+MAX_PARTES = 32
+
+# Memória para a ingestão, em MB. Sem valor, as tabelas ficam inteiras em
+# memória; com valor, os CSVs são lidos em blocos e só os agregados ficam.
+ORCAMENTO_MB = float(os.environ['DASHBOARD_ORCAMENTO_MB']) if os.environ.get('DASHBOARD_ORCAMENTO_MB') else None
+
+# Lojas e período de vendas e estoque carregados pelo processo; sem valor, as
+# tabelas vêm inteiras. Com valor, só as partições do recorte são lidas.
+RECORTE = filtros.Recorte.do_ambiente()
+
+# Nome da localização do estoque correspondente a cada `loja_id` das vendas.
+NOMES_LOJAS = {1: 'Loja 1', 2: 'Loja 2', 3: 'Depósito Central'}
+
+# Colunas de texto com até esta fração de valores distintos viram `category`.
+LIMITE_CATEGORIA = 0.5
+
+
+def ler_csv(nome, caminho=None):
+    caminho = caminho or ARQUIVOS[nome]
+    df = pd.read_csv(caminho, sep=';', encoding='utf-8')
+    return preparar_tabela(nome, df)
+
+
+def converter_datas(serie, formato):
+    """`pd.to_datetime` com formato fixo, convertendo cada texto distinto uma vez só.
+
+    As poucas centenas de datas de um histórico se repetem em milhões de
+    linhas; o resultado de cada uma é espalhado pelas linhas pelos códigos
+    de `pd.factorize` (nulos ficam NaT).
+    """
+    codigos, unicas = pd.factorize(serie)
+    convertidas = pd.to_datetime(pd.Series(unicas, dtype=object), format=formato).to_numpy()
+    convertidas = np.append(convertidas, np.datetime64('NaT', 'ns'))
+    return pd.Series(convertidas[codigos], index=serie.index, name=serie.name)
+
+
+def preparar_tabela(nome, df):
+    if nome in FORMATOS_DATA:
+        coluna, formato = FORMATOS_DATA[nome]
+        df[coluna] = converter_datas(df[coluna], formato)
+    elif nome == 'produtos':
+        df = df.rename(columns={
+            'produto_nome': 'nome_produto',
+            'preco_unitario': 'valor_unitario_estoque'
+        })
+        df = df[['produto_id', 'sku', 'nome_produto', 'categoria', 'valor_unitario_estoque']].copy()
+    return compactar_tipos(df)
+
+
+def compactar_tipos(df):
+    """Reduz a memória de uma tabela sem alterar os valores.
+
+    Inteiros vão para o menor tipo que comporta a faixa da coluna (medidas
+    ficam com pelo menos 32 bits, para que contas como `estoque_minimo * 2`
+    não estourem), floats só viram float32 se nenhum valor mudar, e textos
+    repetitivos viram `category`.
+    """
+    for coluna in df.columns:
+        serie = df[coluna]
+        if pd.api.types.is_integer_dtype(serie):
+            serie = pd.to_numeric(serie, downcast='integer')
+            if not coluna.endswith('_id') and serie.dtype.itemsize < 4:
+                serie = serie.astype(np.int32)
+            df[coluna] = serie
+        elif pd.api.types.is_float_dtype(serie):
+            reduzida = serie.astype(np.float32)
+            if np.array_equal(reduzida.to_numpy(np.float64), serie.to_numpy(), equal_nan=True):
+                df[coluna] = reduzida
+        elif serie.dtype == object and serie.nunique() <= len(serie) * LIMITE_CATEGORIA:
+            df[coluna] = serie.astype('category')
+    return df
+
+
+def concatenar(partes):
+    """`pd.concat` que preserva colunas `category` mesmo com categorias diferentes entre as partes."""
+    partes = [parte for parte in partes if len(parte) > 0] or partes[:1]
+    if len(partes) == 1:
+        return partes[0]
+    for coluna in partes[0].columns:
+        if any(isinstance(parte[coluna].dtype, pd.CategoricalDtype) for parte in partes):
+            categorias = pd.Index([])
+            for parte in partes:
+                serie = parte[coluna]
+                valores = serie.cat.categories if isinstance(serie.dtype, pd.CategoricalDtype) else serie.dropna().unique()
+                categorias = categorias.append(pd.Index(valores).difference(categorias))
+            tipo = pd.CategoricalDtype(categorias)
+            partes = [parte.astype({coluna: tipo}) for parte in partes]
+    return pd.concat(partes, ignore_index=True)
+
+
+def assinatura_arquivo(caminho):
+    info = os.stat(caminho)
+    return info.st_size, info.st_mtime_ns
+
+
+def versao_arquivos():
+    """Assinatura (tamanho, mtime) dos quatro CSVs, usada como chave de cache."""
+    return tuple((nome, *assinatura_arquivo(caminho)) for nome, caminho in ARQUIVOS.items())
+
+
+def descrever_versao(versao):
+    """Identificador curto de uma versão (de `versao_arquivos`) e o momento da última alteração dos CSVs."""
+    identificador = hashlib.blake2b(repr(versao).encode('utf-8'), digest_size=4).hexdigest()
+    alterado_em = datetime.fromtimestamp(max(mtime for _, _, mtime in versao) / 1e9)
+    return identificador, alterado_em
+
+
+def _hash_prefixo(caminho, offset=None, tamanho_bloco=1 << 20):
+    """Hash (ainda aberto a `update`) dos primeiros `offset` bytes do arquivo, ou do arquivo inteiro."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, 'rb') as f:
+        restante = math.inf if offset is None else offset
+        while restante > 0:
+            bloco = f.read(int(min(tamanho_bloco, restante)))
+            if not bloco:
+                break
+            h.update(bloco)
+            restante -= len(bloco)
+    return h
+
+
+def hash_arquivo(caminho):
+    return _hash_prefixo(caminho).hexdigest()
+
+
+def _ler_cabecalho(caminho):
+    with open(caminho, 'rb') as f:
+        return f.readline().decode('utf-8').rstrip('\r\n')
+
+
+def _identidade(nome, caminho, offset):
+    """Hash do conteúdo já ingerido: o arquivo inteiro, ou nas tabelas incrementais os bytes até `offset`.
+
+    Qualquer linha reescrita, mesmo sem mudar o tamanho do arquivo, muda o
+    hash. Ler o prefixo custa uma passada sequencial pelo arquivo, bem
+    menos que converter o CSV de novo.
+    """
+    if nome in TABELAS_INCREMENTAIS:
+        return _hash_prefixo(caminho, offset).hexdigest()
+    return hash_arquivo(caminho)
+
+
+def mesma_versao(nome, caminho, origem):
+    """Se o CSV ainda é o descrito em `origem` (tamanho, mtime, hash e, nas tabelas incrementais, offset)."""
+    tamanho, mtime = assinatura_arquivo(caminho)
+    if tamanho != origem['tamanho']:
+        return False
+    return mtime == origem['mtime'] or _identidade(nome, caminho, origem.get('offset', tamanho)) == origem['hash']
+
+
+def _caminho_parte(nome, diretorio, parte):
+    if parte == 0:
+        return os.path.join(diretorio, nome + '.feather')
+    return os.path.join(diretorio, f'{nome}.{parte}.feather')
+
+
+def ler_manifesto(caminho):
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _manifesto_valido(nome, diretorio, manifesto):
+    return (manifesto is not None
+            and manifesto.get('versao') == VERSAO_SNAPSHOT
+            and os.path.exists(_caminho_parte(nome, diretorio, 0)))
+
+
+def _gravar_atomico(caminho, escrever):
+    temporario = caminho + '.tmp'
+    escrever(temporario)
+    os.replace(temporario, caminho)
+
+
+def gravar_manifesto(nome, diretorio, manifesto):
+    def escrever(destino):
+        with open(destino, 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f)
+    _gravar_atomico(os.path.join(diretorio, nome + '.json'), escrever)
+
+
+def gravar_feather(df, caminho):
+    # Sem compressão e num único bloco por coluna, para que a leitura mapeada não copie nada.
+    _gravar_atomico(caminho, lambda destino: df.reset_index(drop=True).to_feather(
+        destino, compression='uncompressed', chunksize=max(len(df), 1)))
+
+
+def _gravar_parte(df, nome, diretorio, parte):
+    gravar_feather(df, _caminho_parte(nome, diretorio, parte))
+
+
+def _remover_partes_extras(nome, diretorio, partes):
+    for caminho in glob.glob(os.path.join(diretorio, f'{nome}.*.feather')):
+        sufixo = os.path.basename(caminho)[len(nome) + 1:-len('.feather')]
+        if sufixo.isdigit() and int(sufixo) >= partes:
+            os.remove(caminho)
+
+
+def ler_feather(caminho):
+    if not MAPEAR_SNAPSHOT:
+        return pd.read_feather(caminho)
+    # split_blocks evita juntar colunas do mesmo tipo num bloco, o que exigiria cópia.
+    return feather.read_table(caminho, memory_map=True).to_pandas(split_blocks=True)
+
+
+def _ler_snapshot(nome, diretorio, manifesto):
+    return concatenar([ler_feather(_caminho_parte(nome, diretorio, i)) for i in range(manifesto['partes'])])
+
+
+def _compactar_snapshot(nome, diretorio, manifesto):
+    _gravar_parte(_ler_snapshot(nome, diretorio, manifesto), nome, diretorio, 0)
+    manifesto['partes'] = 1
+    gravar_manifesto(nome, diretorio, manifesto)
+    _remover_partes_extras(nome, diretorio, 1)
+
+
+def _reconstruir_snapshot(nome, caminho, diretorio):
+    tamanho, mtime = assinatura_arquivo(caminho)
+    df = ler_csv(nome, caminho)
+    manifesto = {
+        'versao': VERSAO_SNAPSHOT,
+        'tamanho': tamanho,
+        'mtime': mtime,
+        'hash': _identidade(nome, caminho, tamanho),
+        'partes': 1,
+    }
+    if nome in TABELAS_INCREMENTAIS:
+        coluna_id = TABELAS_INCREMENTAIS[nome]
+        manifesto.update({
+            'offset': tamanho,
+            'cabecalho': _ler_cabecalho(caminho),
+            'ultimo_id': int(df[coluna_id].max()) if len(df) > 0 else 0,
+        })
+    os.makedirs(diretorio, exist_ok=True)
+    _gravar_parte(df, nome, diretorio, 0)
+    gravar_manifesto(nome, diretorio, manifesto)
+    _remover_partes_extras(nome, diretorio, 1)
+    return df
+
+
+def _anexar_linhas_novas(nome, caminho, diretorio, manifesto):
+    tamanho, mtime = assinatura_arquivo(caminho)
+    offset = manifesto['offset']
+    if tamanho < offset or _ler_cabecalho(caminho) != manifesto['cabecalho']:
+        return None
+    # O mesmo hash do prefixo confere as linhas já ingeridas e, estendido com a cauda, vira o do novo offset.
+    prefixo = _hash_prefixo(caminho, offset)
+    if prefixo.hexdigest() != manifesto['hash']:
+        return None
+
+    with open(caminho, 'rb') as f:
+        f.seek(offset)
+        bruto = f.read(tamanho - offset)
+    # Uma linha ainda sendo escrita pelo PDV fica para a próxima atualização.
+    bruto = bruto[:bruto.rfind(b'\n') + 1]
+
+    colunas = manifesto['cabecalho'].split(';')
+    if bruto.strip():
+        df = pd.read_csv(io.BytesIO(bruto), sep=';', encoding='utf-8', header=None, names=colunas)
+        df = preparar_tabela(nome, df)
+    else:
+        df = pd.DataFrame(columns=colunas)
+
+    coluna_id = TABELAS_INCREMENTAIS[nome]
+    if len(df) > 0:
+        if df[coluna_id].min() <= manifesto['ultimo_id']:
+            return None
+        _gravar_parte(df, nome, diretorio, manifesto['partes'])
+        manifesto['partes'] += 1
+        manifesto['ultimo_id'] = int(df[coluna_id].max())
+
+    manifesto['offset'] = offset + len(bruto)
+    manifesto['tamanho'] = tamanho
+    manifesto['mtime'] = mtime
+    prefixo.update(bruto)
+    manifesto['hash'] = prefixo.hexdigest()
+    gravar_manifesto(nome, diretorio, manifesto)
+    if manifesto['partes'] > MAX_PARTES:
+        _compactar_snapshot(nome, diretorio, manifesto)
+    return df
+
+
+def ler_linhas_novas(nome, ultimo_id, caminho=None, diretorio=DIRETORIO_CACHE):
+    """Lê só as linhas acrescentadas ao CSV desde a última ingestão e as anexa ao snapshot.
+
+    `ultimo_id` é o último id que quem chama já tem em memória. Retorna None
+    quando não é possível anexar (cabeçalho mudou, linhas já ingeridas foram
+    reescritas, ids novos não são maiores que o último processado ou o
+    snapshot já avançou além de `ultimo_id`); nesse caso a tabela precisa ser
+    recarregada.
+    """
+    caminho = caminho or ARQUIVOS[nome]
+    if not SNAPSHOT_DISPONIVEL or nome not in TABELAS_INCREMENTAIS:
+        return None
+    manifesto = ler_manifesto(os.path.join(diretorio, nome + '.json'))
+    if not _manifesto_valido(nome, diretorio, manifesto) or manifesto['ultimo_id'] != ultimo_id:
+        return None
+    return _anexar_linhas_novas(nome, caminho, diretorio, manifesto)
+
+
+def carregar_tabela(nome, caminho=None, diretorio=DIRETORIO_CACHE):
+    """Carrega uma tabela a partir do snapshot colunar, reprocessando o CSV só se ele mudou.
+
+    O snapshot é reaproveitado quando tamanho e mtime do CSV coincidem com o
+    manifesto; se só o mtime mudou, o hash do conteúdo inteiro decide. Nas
+    tabelas incrementais, um arquivo que só cresceu (com o hash dos bytes já
+    ingeridos igual ao do manifesto) tem apenas a cauda nova processada.
+    """
+    caminho = caminho or ARQUIVOS[nome]
+    if not SNAPSHOT_DISPONIVEL:
+        return ler_csv(nome, caminho)
+
+    manifesto = ler_manifesto(os.path.join(diretorio, nome + '.json'))
+    if _manifesto_valido(nome, diretorio, manifesto):
+        tamanho, mtime = assinatura_arquivo(caminho)
+        if tamanho == manifesto['tamanho']:
+            if mtime == manifesto['mtime']:
+                return _ler_snapshot(nome, diretorio, manifesto)
+            if _identidade(nome, caminho, manifesto.get('offset', tamanho)) == manifesto['hash']:
+                manifesto['mtime'] = mtime
+                gravar_manifesto(nome, diretorio, manifesto)
+                return _ler_snapshot(nome, diretorio, manifesto)
+        elif nome in TABELAS_INCREMENTAIS:
+            if _anexar_linhas_novas(nome, caminho, diretorio, manifesto) is not None:
+                return _ler_snapshot(nome, diretorio, manifesto)
+
+    return _reconstruir_snapshot(nome, caminho, diretorio)
+
+
+def carregar_tabelas(nomes, diretorio=DIRETORIO_CACHE, trabalhadores=None):
+    """Carrega várias tabelas ao mesmo tempo, uma thread por tabela; devolve {nome: df}.
+
+    Leitura de CSV e de feather liberam o GIL na maior parte do tempo, e cada
+    tabela grava o próprio snapshot, então as cargas não disputam arquivos.
+    """
+    nomes = list(nomes)
+    trabalhadores = trabalhadores or len(nomes)
+    if trabalhadores <= 1 or len(nomes) <= 1:
+        return {nome: carregar_tabela(nome, diretorio=diretorio) for nome in nomes}
+    with ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+        futuros = {nome: executor.submit(carregar_tabela, nome, diretorio=diretorio) for nome in nomes}
+        return {nome: futuro.result() for nome, futuro in futuros.items()}
+
+
+def carregar_dados(diretorio=DIRETORIO_CACHE, trabalhadores=None):
+    tabelas = carregar_tabelas(['estoque', 'vendas', 'compras', 'produtos'], diretorio, trabalhadores)
+    return tabelas['estoque'], tabelas['vendas'], tabelas['compras'], tabelas['produtos']
+
+
+def bytes_mapeados(df):
+    """Bytes das colunas que são views somente leitura de um snapshot mapeado (não contam por processo)."""
+    total = 0
+    for coluna in df.columns:
+        # Os códigos de `category` são sempre expostos como somente leitura; não dá para distinguir.
+        if df[coluna].dtype == object or isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            continue
+        valores = df[coluna].to_numpy()
+        if not valores.flags.writeable:
+            total += valores.nbytes
+    return total
+
+
+def lojas_das_localizacoes(localizacoes):
+    """`loja_id` de cada localização do estoque (-1 se não for uma loja conhecida)."""
+    ids = {nome: loja for loja, nome in NOMES_LOJAS.items()}
+    return pd.Series(localizacoes).astype(object).map(ids).fillna(-1).to_numpy(np.int64)
+
+
+def juntar_produtos(df, df_produtos):
+    return df.merge(df_produtos, on='produto_id', how='left')
+
+
+def ordenar_por_data(df, coluna):
+    if df[coluna].is_monotonic_increasing:
+        return df
+    return df.sort_values(coluna, kind='stable', ignore_index=True)
+
+
+def posicoes_recentes(df_estoque):
+    """Linha mais recente de cada produto × localização; no empate de data, a primeira do arquivo."""
+    idx = df_estoque.groupby(["produto_id", "localizacao"], observed=True)["data_referencia"].idxmax()
+    return df_estoque.loc[idx].reset_index(drop=True)
+
+
+def atualizar_posicoes(posicoes, novas):
+    """Aplica linhas novas de estoque às posições atuais, sem rever o histórico.
+
+    As posições vêm antes das linhas novas, então no empate de data continua
+    valendo a linha mais antiga, como em `posicoes_recentes` sobre a tabela inteira.
+    """
+    return posicoes_recentes(concatenar([posicoes, novas]))
+
+
+def valorizar_posicoes(posicoes, df_produtos):
+    df = juntar_produtos(posicoes, df_produtos)
+    df['valor_total_estoque'] = df['quantidade_estoque'] * df['valor_unitario_estoque']
+    return df
+
+
+def estoque_atual(df_estoque, df_produtos):
+    """Posição mais recente de cada produto em cada localização, valorizada."""
+    return valorizar_posicoes(posicoes_recentes(df_estoque), df_produtos)
+
+
+def _chave_posicoes(diretorio, ultimo_id):
+    """Identidade do snapshot de estoque a que as posições persistidas correspondem."""
+    manifesto = ler_manifesto(os.path.join(diretorio, 'estoque.json'))
+    if not _manifesto_valido('estoque', diretorio, manifesto) or manifesto['ultimo_id'] != ultimo_id:
+        return None
+    return [manifesto['offset'], manifesto['ultimo_id'], manifesto['hash']]
+
+
+def ler_posicoes(diretorio, ultimo_id):
+    """Posições persistidas, se correspondem ao snapshot de estoque atual; senão None."""
+    if not SNAPSHOT_DISPONIVEL:
+        return None
+    chave = _chave_posicoes(diretorio, ultimo_id)
+    manifesto = ler_manifesto(os.path.join(diretorio, ARQUIVO_POSICOES + '.json'))
+    caminho = os.path.join(diretorio, ARQUIVO_POSICOES + '.feather')
+    if (chave is None or manifesto is None or manifesto.get('versao') != VERSAO_SNAPSHOT
+            or manifesto.get('estoque') != chave or not os.path.exists(caminho)):
+        return None
+    return ler_feather(caminho)
+
+
+def gravar_posicoes(posicoes, diretorio, ultimo_id):
+    if not SNAPSHOT_DISPONIVEL:
+        return
+    chave = _chave_posicoes(diretorio, ultimo_id)
+    if chave is None:
+        return
+    _gravar_parte(posicoes, ARQUIVO_POSICOES, diretorio, 0)
+    gravar_manifesto(ARQUIVO_POSICOES, diretorio, {'versao': VERSAO_SNAPSHOT, 'estoque': chave})
+
+
+def construir_cubo(nome, df, df_produtos):
+    if nome == 'vendas':
+        return Cubo(df, 'data_venda', 'loja_id', ['quantidade_vendida', 'valor_total'], df_produtos)
+    return Cubo(df, 'data_compra', 'status_compra', ['quantidade_comprada', 'valor_total'], df_produtos)
+
+
+def construir_filtros(nome, df):
+    if nome == 'estoque':
+        return filtros.IndiceFiltros(df, colunas=('produto_id',))
+    if nome == 'vendas':
+        return filtros.IndiceFiltros(df, 'data_venda', ('produto_id', 'loja_id'))
+    return filtros.IndiceFiltros(df, 'data_compra', ('produto_id',))
+
+
+class BaseDados:
+    """Tabelas em memória do dashboard, mantidas em sincronia com os CSVs.
+
+    `vendas` e `compras` ficam ordenadas por data e guardam só o `produto_id`;
+    nome e categoria são resolvidos em `produtos`. Quando o PDV só acrescentou
+    linhas, apenas a cauda nova é lida e anexada; as demais mudanças
+    recarregam a tabela afetada a partir do snapshot. `estoque_atual`, os
+    índices de `filtros`, os `cubos` de agregação e as estatísticas de
+    `fornecedores` são refeitos só para as tabelas que mudaram; linhas
+    anexadas em ordem de data são levadas adiante sem refazê-los. As posições
+    atuais do estoque são mantidas à parte: contagens novas só são comparadas
+    às posições guardadas, que ficam persistidas junto dos snapshots.
+
+    Com `orcamento_mb` (ou `DASHBOARD_ORCAMENTO_MB`), os CSVs são lidos em
+    blocos por `blocos` e só os agregados ficam em memória: vendas e compras
+    somadas por dia × produto × loja/fornecedor/status, com a contagem de
+    linhas originais em `linhas`, e em `estoque` só a posição mais recente.
+    Nesse modo uma tabela que mudou é relida por inteiro.
+
+    Com `recorte` (ou `DASHBOARD_LOJAS`, `DASHBOARD_INICIO` e
+    `DASHBOARD_FIM`), vendas e estoque vêm das partições por loja e mês de
+    `particoes`, e só as que cruzam o recorte são lidas.
+
+    Tabelas vindas de um snapshot de uma parte só são views somente leitura
+    do arquivo mapeado (`MAPEAR_SNAPSHOT`); nada aqui as altera no lugar, e
+    a mesma instância serve todas as sessões do processo.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_CACHE, orcamento_mb=ORCAMENTO_MB, recorte=RECORTE):
+        self.diretorio = diretorio
+        self.orcamento_mb = orcamento_mb
+        self.recorte = recorte
+        self.versao = None
+        self.estoque = None
+        self.vendas = None
+        self.compras = None
+        self.produtos = None
+        self.estoque_atual = None
+        self._posicoes = None
+        self.filtros = {}
+        self.cubos = {}
+        self.fornecedores = None
+        self._ultimo_id = {}
+        self._linhas_lidas = {}
+        self._uso_memoria = (None, None)
+        self._trava = threading.Lock()
+
+    def atualizar(self):
+        with self._trava:
+            versao = versao_arquivos()
+            if versao == self.versao:
+                return False
+
+            anterior = {nome: (tamanho, mtime) for nome, tamanho, mtime in self.versao or ()}
+            alteradas = {nome for nome, tamanho, mtime in versao if anterior.get(nome) != (tamanho, mtime)}
+
+            if self.orcamento_mb is None:
+                novas, anexadas = self._carregar_tabelas(alteradas)
+            else:
+                novas, anexadas = self._agregar_tabelas(alteradas), {}
+
+            for nome in COLUNAS_DATA:
+                if nome not in novas:
+                    if 'produtos' in alteradas:
+                        self.cubos[nome] = construir_cubo(nome, getattr(self, nome), self.produtos)
+                    continue
+                if nome in anexadas and self._estender(nome, novas[nome], anexadas[nome], 'produtos' in alteradas):
+                    continue
+                atual = ordenar_por_data(novas[nome], COLUNAS_DATA[nome])
+                self.filtros[nome] = construir_filtros(nome, atual)
+                setattr(self, nome, atual)
+                self.cubos[nome] = construir_cubo(nome, atual, self.produtos)
+                if nome == 'compras':
+                    self.fornecedores = EstatisticasFornecedores(atual)
+
+            if 'estoque' in novas:
+                self.estoque = novas['estoque']
+                self._posicoes = self._atualizar_posicoes(anexadas.get('estoque'))
+            if 'estoque' in novas or 'produtos' in alteradas:
+                self.estoque_atual = valorizar_posicoes(self._posicoes, self.produtos)
+                self.filtros['estoque'] = construir_filtros('estoque', self.estoque_atual)
+
+            self.versao = versao
+            return True
+
+    def proxima(self):
+        """A versão seguinte como uma nova instância, ou None se os CSVs não mudaram.
+
+        Esta instância não é alterada; a nova reaproveita as tabelas, índices
+        e cubos que não mudaram. Quem ainda usa esta continua vendo uma
+        versão coerente.
+        """
+        with self._trava:
+            if versao_arquivos() == self.versao:
+                return None
+            nova = copy.copy(self)
+            nova._trava = threading.Lock()
+            for atributo in ('filtros', 'cubos', '_ultimo_id', '_linhas_lidas'):
+                setattr(nova, atributo, dict(getattr(self, atributo)))
+        nova.atualizar()
+        return nova
+
+    def _estender(self, nome, df, linhas, refazer_cubo):
+        """Leva índices, cubo e estatísticas de `nome` até `df`, a tabela atual com as `linhas` anexadas no fim.
+
+        Só as linhas novas são percorridas: os índices ganham as posições
+        delas, o cubo refaz as somas acumuladas a partir do primeiro dia que
+        elas tocam (ou é construído de novo, se `refazer_cubo` ou se elas
+        trazem produto ou chave novos) e os baldes de fornecedores, a partir
+        do mês delas. Devolve False, sem alterar nada, se alguma linha nova
+        tem data anterior à última carregada; aí a tabela é reordenada e
+        tudo é refeito.
+        """
+        indice = self.filtros[nome].estender(df)
+        if indice is None:
+            return False
+        fornecedores = self.fornecedores.estender(df) if nome == 'compras' else None
+        cubo = None if refazer_cubo else self.cubos[nome].estender(linhas)
+        setattr(self, nome, df)
+        self.filtros[nome] = indice
+        self.cubos[nome] = cubo if cubo is not None else construir_cubo(nome, df, self.produtos)
+        if fornecedores is not None:
+            self.fornecedores = fornecedores
+        return True
+
+    def _carregar_tabelas(self, alteradas):
+        """Recarrega produtos e devolve as tabelas incrementais que mudaram e as linhas anexadas a cada uma.
+
+        Tabelas que só cresceram recebem apenas a cauda nova; as que precisam
+        ser carregadas inteiras são lidas em paralelo. Com recorte, vendas e
+        estoque vêm das partições e a cauda nova também é gravada nelas.
+        """
+        import particoes
+
+        particionadas = particoes.PARTICIONADAS if self.recorte is not None else {}
+        novas, anexadas = {}, {}
+        recarregar = ['produtos'] if 'produtos' in alteradas else []
+        for nome, coluna_id in TABELAS_INCREMENTAIS.items():
+            atual = getattr(self, nome)
+            if atual is None:
+                recarregar.append(nome)
+            elif nome in alteradas:
+                anterior = particoes.origem(nome, self.diretorio) if nome in particionadas else None
+                linhas = ler_linhas_novas(nome, self._ultimo_id[nome], diretorio=self.diretorio)
+                if linhas is None:
+                    recarregar.append(nome)
+                elif len(linhas) > 0:
+                    self._ultimo_id[nome] = int(linhas[coluna_id].max())
+                    if nome in particionadas:
+                        particoes.anexar(nome, linhas, anterior, self.diretorio)
+                        linhas = particoes.filtrar(nome, linhas, self.recorte)
+                    if len(linhas) > 0:
+                        novas[nome] = concatenar([atual, linhas])
+                        anexadas[nome] = linhas
+
+        carregadas = carregar_tabelas([nome for nome in recarregar if nome not in particionadas], self.diretorio)
+        ultimos = {}
+        for nome in recarregar:
+            if nome in particionadas:
+                carregadas[nome], ultimos[nome] = particoes.carregar(nome, self.recorte, self.diretorio)
+
+        for nome, df in carregadas.items():
+            if nome in ultimos:
+                self._ultimo_id[nome] = ultimos[nome]
+                novas[nome] = df
+            elif nome in TABELAS_INCREMENTAIS:
+                coluna_id = TABELAS_INCREMENTAIS[nome]
+                self._ultimo_id[nome] = int(df[coluna_id].max()) if len(df) > 0 else 0
+                novas[nome] = df
+            else:
+                setattr(self, nome, df)
+            self._linhas_lidas[nome] = len(df)
+        for nome, df in novas.items():
+            self._linhas_lidas[nome] = len(df)
+        return novas, anexadas
+
+    def _agregar_tabelas(self, alteradas):
+        """Relê em blocos as tabelas que mudaram, guardando só os agregados (do recorte, se houver)."""
+        import blocos
+        import particoes
+
+        if 'produtos' in alteradas:
+            self.produtos = carregar_tabela('produtos', diretorio=self.diretorio)
+            self._linhas_lidas['produtos'] = len(self.produtos)
+        linhas = blocos.linhas_por_bloco(self.orcamento_mb * 2 ** 20)
+
+        novas = {}
+        if 'estoque' in alteradas:
+            novas['estoque'], self._linhas_lidas['estoque'] = blocos.estoque_mais_recente(linhas)
+        for nome in COLUNAS_DATA:
+            if nome in alteradas:
+                novas[nome], self._linhas_lidas[nome] = blocos.agregar(nome, linhas)
+        if self.recorte is not None:
+            for nome in set(novas) & set(particoes.PARTICIONADAS):
+                novas[nome] = particoes.filtrar(nome, novas[nome], self.recorte)
+        return novas
+
+    def _atualizar_posicoes(self, anexadas):
+        """Posições atuais do estoque para o `self.estoque` recém-carregado.
+
+        Com linhas anexadas, só elas são comparadas às posições guardadas;
+        numa carga completa, as posições persistidas servem se ainda
+        correspondem ao snapshot, e só senão o histórico é percorrido.
+        """
+        if self.orcamento_mb is not None:
+            return self.estoque
+        if self.recorte is not None:
+            # As posições persistidas são as do estoque inteiro; as do recorte saem das poucas linhas carregadas.
+            if anexadas is not None:
+                return atualizar_posicoes(self._posicoes, anexadas)
+            return posicoes_recentes(self.estoque)
+        ultimo_id = self._ultimo_id['estoque']
+        if anexadas is not None:
+            posicoes = atualizar_posicoes(self._posicoes, anexadas)
+        else:
+            posicoes = ler_posicoes(self.diretorio, ultimo_id)
+            if posicoes is not None:
+                return posicoes
+            posicoes = posicoes_recentes(self.estoque)
+        gravar_posicoes(posicoes, self.diretorio, ultimo_id)
+        return posicoes
+
+    @property
+    def chave_memo(self):
+        """O que distingue os resultados desta base nas análises memoizadas: configuração e versão dos dados."""
+        return ('pandas', self.diretorio, self.orcamento_mb, self.recorte, self.versao)
+
+    def contagem(self):
+        """Número de linhas lidas de cada CSV."""
+        return {nome: self._linhas_lidas[nome] for nome in ARQUIVOS}
+
+    def lojas(self):
+        """Ids das lojas com vendas, em ordem."""
+        return self.cubos['vendas'].chaves.tolist()
+
+    def periodo(self):
+        """Primeira e última data de venda."""
+        datas = self.vendas['data_venda']
+        return datas.iloc[0], datas.iloc[-1]
+
+    def uso_memoria(self):
+        """Memória ocupada por tabela e por estrutura derivada, em bytes (calculada uma vez por versão)."""
+        versao, uso = self._uso_memoria
+        if versao != self.versao or uso is None:
+            uso = self._medir_memoria()
+            self._uso_memoria = (self.versao, uso)
+        return uso.copy()
+
+    def _medir_memoria(self):
+        tabelas = {
+            'estoque': self.estoque,
+            'vendas': self.vendas,
+            'compras': self.compras,
+            'produtos': self.produtos,
+            'estoque_atual': self.estoque_atual,
+        }
+        linhas = [
+            {'tabela': nome, 'linhas': len(df), 'bytes': int(df.memory_usage(deep=True).sum()),
+             'bytes_mapeados': bytes_mapeados(df)}
+            for nome, df in tabelas.items() if df is not None
+        ]
+        for nome, indice in self.filtros.items():
+            linhas.append({'tabela': f'filtros_{nome}', 'linhas': len(indice.df), 'bytes': indice.nbytes,
+                           'bytes_mapeados': 0})
+        for nome, cubo in self.cubos.items():
+            linhas.append({'tabela': f'cubo_{nome}', 'linhas': cubo.dias, 'bytes': cubo.nbytes, 'bytes_mapeados': 0})
+        if self.fornecedores is not None:
+            linhas.append({'tabela': 'fornecedores', 'linhas': len(self.fornecedores.baldes),
+                           'bytes': self.fornecedores.nbytes, 'bytes_mapeados': 0})
+        return pd.DataFrame(linhas)
@@ -1,9 +1,15 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
 import numpy as np
+import os
+
+import atualizador
+import banco
+import busca
+import dados
+import filtros
+import fornecedores
+import graficos
+import perfil
 
 
 st.set_page_config(
@@ -13,6 +19,8 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+perf = perfil.Perfil(perfil.ativado(st.experimental_get_query_params().get('perfil', [])))
+
 st.markdown("""
     <style>
     .main {
@@ -57,37 +65,56 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-@st.cache_data
+# Com 'todas', as abas voltam a ser st.tabs e todas rodam a cada interação.
+ABAS_SOB_DEMANDA = os.environ.get('DASHBOARD_ABAS', 'sob_demanda') != 'todas'
+# 'pandas' (tabelas em memória) ou 'sqlite' (consultas a um banco local).
+BACKEND = os.environ.get('DASHBOARD_BACKEND', 'pandas')
+# Granularidade da Série Temporal: frequência, título do gráfico e eixo x.
+GRANULARIDADES = {
+    'Dia': ('D', 'Diária', 'Dia'),
+    'Semana': ('W', 'Semanal', 'Semana'),
+    'Mês': ('M', 'Mensal', 'Mês'),
+}
+
+
+@st.cache_resource
 def carregar_dados():
-    df_estoque = pd.read_csv('FCD_estoque.csv', sep=';', encoding='utf-8')
-    df_vendas = pd.read_csv('FCD_vendas.csv', sep=';', encoding='utf-8')
-    df_compras = pd.read_csv('FCD_compras.csv', sep=';', encoding='utf-8')
-    df_produtos = pd.read_csv('FCD_produtos.csv', sep=';', encoding='utf-8')
-    
-    df_estoque['data_referencia'] = pd.to_datetime(df_estoque['data_referencia'])
-    df_vendas['data_venda'] = pd.to_datetime(df_vendas['data_venda'], format='%d/%m/%Y')
-    df_compras['data_compra'] = pd.to_datetime(df_compras['data_compra'], format='%d/%m/%Y')
-    
-    df_produtos = df_produtos.rename(columns={
-        'produto_nome': 'nome_produto',
-        'preco_unitario': 'valor_unitario_estoque'
-    })
-    
-    df_produtos = df_produtos[['produto_id', 'nome_produto', 'categoria', 'valor_unitario_estoque']]
-    
-    return df_estoque, df_vendas, df_compras, df_produtos
+    base, analises = banco.abrir(BACKEND)
+    base.atualizar()
+    return atualizador.Atualizador(base).iniciar(), analises
 
-df_estoque, df_vendas, df_compras, df_produtos = carregar_dados()
 
+def mostrar_grafico(grafico, chave, *entradas, **parametros):
+    """Desenha um gráfico de `graficos.FIGURAS` a partir da figura em cache.
 
-idx = df_estoque.groupby(["produto_id", "localizacao"])["data_referencia"].idxmax()
-df_estoque = df_estoque.loc[idx]
+    `chave` é a da análise que produziu as entradas (`.chave` da função
+    memoizada). Sem o tema do Streamlit (`theme=None`), vale o tema
+    `graficos.TEMA` da própria figura.
+    """
+    with perf.medir('graficos'):
+        fig = graficos.FIGURAS_EM_CACHE.figura(grafico, chave, *entradas, **parametros)
+        st.plotly_chart(fig, use_container_width=True, theme=None)
 
-df_estoque = df_estoque.merge(df_produtos, on='produto_id', how='left')
-df_vendas = df_vendas.merge(df_produtos, on='produto_id', how='left')
-df_compras = df_compras.merge(df_produtos, on='produto_id', how='left')
 
-df_estoque['valor_total_estoque'] = df_estoque['quantidade_estoque'] * df_estoque['valor_unitario_estoque']
+def mostrar_abas(titulos, abas, chave):
+    """Mostra um grupo de abas; com abas sob demanda, só a escolhida é calculada e desenhada."""
+    if ABAS_SOB_DEMANDA:
+        escolhida = st.radio(chave, titulos, horizontal=True, key=chave, label_visibility='collapsed')
+        abas[titulos.index(escolhida)]()
+    else:
+        for aba, mostrar in zip(st.tabs(titulos), abas):
+            with aba:
+                mostrar()
+
+
+perf.secao('carregar_dados')
+fonte, analises = carregar_dados()
+if not fonte.em_segundo_plano:
+    fonte.tentar_verificar()
+# A versão pega aqui vale até o fim desta execução, mesmo que outra entre no ar.
+base, no_ar_desde = fonte.atual()
+perf.linhas(sum(base.contagem().values()))
+df_produtos = base.produtos
 
 
 st.markdown("<h1 style='text-align: center;'>Super-Dashboard Integrado</h1>", unsafe_allow_html=True)
@@ -95,48 +122,55 @@ st.markdown("<h3 style='text-align: center; color: #b3b3b3;'>Estoque • Vendas
 st.markdown("---")
 
 
+perf.secao('barra_lateral')
+versao = atualizador.descrever(base, no_ar_desde)
+st.sidebar.caption(f"Dados: versão {versao['versao']} · CSVs de {versao['alterado_em']:%d/%m/%Y %H:%M} · "
+                   f"no ar desde {versao['no_ar_desde']:%H:%M:%S}")
+if fonte.erro is not None:
+    st.sidebar.warning(f"Falha ao atualizar os dados; mantida a versão anterior. ({fonte.erro})")
 st.sidebar.markdown("## Filtros")
 
 categorias_disponiveis = sorted(df_produtos['categoria'].unique().tolist())
 categorias_selecionadas = st.sidebar.multiselect('Categoria', categorias_disponiveis, default=categorias_disponiveis)
 
-if len(categorias_selecionadas) > 0:
-    produtos_filtrados = df_produtos[df_produtos['categoria'].isin(categorias_selecionadas)]
-else:
-    produtos_filtrados = df_produtos
-
-
-produtos_disponiveis = sorted(produtos_filtrados['nome_produto'].tolist())
-if len(produtos_disponiveis) > 0:
-    produtos_selecionados = st.sidebar.multiselect(
+# O multiselect recebe só os ids encontrados pela busca (mais os já escolhidos),
+# nunca o catálogo inteiro; a escolha fica guardada por id na sessão.
+indice_produtos = busca.indice_produtos(base)
+produtos_disponiveis = indice_produtos.contar(categorias_selecionadas)
+if produtos_disponiveis > 0:
+    texto_busca = st.sidebar.text_input('Buscar produto', placeholder='Nome ou SKU', key='busca_produto')
+    escolhidos = [produto_id for produto_id in st.session_state.get('produtos_escolhidos', [])
+                  if indice_produtos.na_categoria(produto_id, categorias_selecionadas)]
+    encontrados = indice_produtos.buscar(texto_busca, categorias_selecionadas)
+    produtos_escolhidos = st.sidebar.multiselect(
         'Produto', 
-        produtos_disponiveis, 
-        default=[],  
-        help=f"Deixe vazio para incluir todos. {len(produtos_disponiveis)} produtos disponíveis"
+        escolhidos + [produto_id for produto_id in encontrados if produto_id not in escolhidos],
+        default=escolhidos,
+        format_func=indice_produtos.nome,
+        help=f"Use a busca para encontrar produtos e deixe vazio para incluir todos. {produtos_disponiveis} produtos disponíveis"
     )
+    st.session_state['produtos_escolhidos'] = produtos_escolhidos
 
-    if len(produtos_selecionados) == 0:
-        st.sidebar.caption(f"✓ Todos os {len(produtos_disponiveis)} produtos selecionados")
-        produtos_selecionados = produtos_disponiveis 
+    if len(produtos_escolhidos) == 0:
+        st.sidebar.caption(f"✓ Todos os {produtos_disponiveis} produtos selecionados")
     else:
-        st.sidebar.caption(f"{len(produtos_selecionados)} de {len(produtos_disponiveis)} produtos selecionados")
+        st.sidebar.caption(f"{len(produtos_escolhidos)} de {produtos_disponiveis} produtos selecionados")
 else:
-    produtos_selecionados = []
+    produtos_escolhidos = []
+produto_unico = len(produtos_escolhidos) == 1 or (len(produtos_escolhidos) == 0 and produtos_disponiveis == 1)
 
 
 
-loja_nomes = {1: 'Loja 1', 2: 'Loja 2', 3: 'Depósito Central'}
-lojas_ids = sorted(df_vendas['loja_id'].unique().tolist())
-lojas_disponiveis = [loja_nomes.get(loja_id, f'Loja {loja_id}') for loja_id in lojas_ids]
+lojas_ids = base.lojas()
+lojas_disponiveis = [dados.NOMES_LOJAS.get(loja_id, f'Loja {loja_id}') for loja_id in lojas_ids]
 lojas_selecionadas_nomes = st.sidebar.multiselect('Loja', lojas_disponiveis, default=lojas_disponiveis)
 
-loja_nomes_invertido = {v: k for k, v in loja_nomes.items()}
+loja_nomes_invertido = {v: k for k, v in dados.NOMES_LOJAS.items()}
 lojas_selecionadas = [loja_nomes_invertido[nome] for nome in lojas_selecionadas_nomes]
 
 
 st.sidebar.markdown("### Período")
-data_min = df_vendas['data_venda'].min()
-data_max = df_vendas['data_venda'].max()
+data_min, data_max = base.periodo()
 
 col1, col2 = st.sidebar.columns(2)
 with col1:
@@ -144,86 +178,62 @@ with col1:
 with col2:
     data_fim = st.date_input('Até', data_max, min_value=data_min, max_value=data_max)
 
+with st.sidebar.expander("Uso de Memória"):
+    memoria = base.uso_memoria()
+    memoria['MB'] = memoria['bytes'] / 1024 ** 2
+    memoria['MB mapeados'] = memoria['bytes_mapeados'] / 1024 ** 2
+    st.dataframe(memoria[['tabela', 'linhas', 'MB', 'MB mapeados']], use_container_width=True, hide_index=True)
+    st.caption(f"Total: {memoria['MB'].sum():.1f} MB, dos quais {memoria['MB mapeados'].sum():.1f} MB mapeados "
+               "dos snapshots e compartilhados entre processos")
 
-df_estoque_filtrado = df_estoque.copy()
-df_vendas_filtrado = df_vendas.copy()
-df_compras_filtrado = df_compras.copy()
-
-if len(categorias_selecionadas) > 0:
-    df_estoque_filtrado = df_estoque_filtrado[df_estoque_filtrado['categoria'].isin(categorias_selecionadas)]
-    df_vendas_filtrado = df_vendas_filtrado[df_vendas_filtrado['categoria'].isin(categorias_selecionadas)]
-    df_compras_filtrado = df_compras_filtrado[df_compras_filtrado['categoria'].isin(categorias_selecionadas)]
 
-if len(produtos_selecionados) > 0:
-    produtos_ids = df_produtos[df_produtos['nome_produto'].isin(produtos_selecionados)]['produto_id'].values
-    df_estoque_filtrado = df_estoque_filtrado[df_estoque_filtrado['produto_id'].isin(produtos_ids)]
-    df_vendas_filtrado = df_vendas_filtrado[df_vendas_filtrado['produto_id'].isin(produtos_ids)]
-    df_compras_filtrado = df_compras_filtrado[df_compras_filtrado['produto_id'].isin(produtos_ids)]
-
-if len(lojas_selecionadas) > 0:
-    df_vendas_filtrado = df_vendas_filtrado[df_vendas_filtrado['loja_id'].isin(lojas_selecionadas)]
-
-df_vendas_filtrado = df_vendas_filtrado[
-    (df_vendas_filtrado['data_venda'] >= pd.to_datetime(data_inicio)) &
-    (df_vendas_filtrado['data_venda'] <= pd.to_datetime(data_fim))
-]
-
-df_compras_filtrado = df_compras_filtrado[
-    (df_compras_filtrado['data_compra'] >= pd.to_datetime(data_inicio)) &
-    (df_compras_filtrado['data_compra'] <= pd.to_datetime(data_fim))
-]
+estado = filtros.EstadoFiltro.criar(categorias_selecionadas, produtos_escolhidos or None, lojas_selecionadas,
+                                    data_inicio, data_fim)
 
 
+perf.secao('indicadores')
 st.markdown("### Indicadores Principais")
 col1, col2, col3, col4, col5 = st.columns(5)
 
+indicadores = analises.indicadores(base, estado)
+
 with col1:
-    receita_total = df_vendas_filtrado['valor_total'].sum()
-    st.metric("$ Receita Total", f"R$ {receita_total:,.2f}")
+    st.metric("$ Receita Total", f"R$ {indicadores['receita_total']:,.2f}")
 
 with col2:
-    valor_estoque = df_estoque_filtrado['valor_total_estoque'].sum()
-    st.metric("Valor do Estoque", f"R$ {valor_estoque:,.2f}")
+    st.metric("Valor do Estoque", f"R$ {indicadores['valor_estoque']:,.2f}")
 
 with col3:
-    gasto_compras = df_compras_filtrado['valor_total'].sum()
-    st.metric("Gasto em Compras", f"R$ {gasto_compras:,.2f}")
+    st.metric("Gasto em Compras", f"R$ {indicadores['gasto_compras']:,.2f}")
 
 with col4:
-   
-    estoque_por_produto = df_estoque_filtrado.groupby('produto_id').agg({
-        'quantidade_estoque': 'sum',
-        'estoque_minimo': 'sum'  
-    }).reset_index()
-    produtos_criticos = len(estoque_por_produto[estoque_por_produto['quantidade_estoque'] < estoque_por_produto['estoque_minimo']])
-    st.metric("Produtos Críticos", produtos_criticos)
+    st.metric("Produtos Críticos", indicadores['produtos_criticos'])
 
 with col5:
-    compras_entregues = df_compras_filtrado[df_compras_filtrado['status_compra'] == 'Entregue']
-    if len(compras_entregues) > 0:
-        prazo_medio = compras_entregues['prazo_entrega_dias'].mean()
-        st.metric("Prazo Médio de Reposição", f"{prazo_medio:.1f} dias")
+    if indicadores['prazo_medio'] is not None:
+        st.metric("Prazo Médio de Reposição", f"{indicadores['prazo_medio']:.1f} dias")
     else:
         st.metric("Prazo Médio de Reposição", "N/A")
 
 st.markdown("---")
 
-if len(produtos_selecionados) == 1:
+perf.secao('visao_produto')
+if produto_unico:
     st.markdown("### Visão 360° do Produto")
-elif len(produtos_selecionados) == 0 or len(produtos_selecionados) > 1:
+else:
     st.info("**Dica:** Selecione somente 1 produto no filtro na barra lateral   para visualizar a **Visão 360° do Produto** com detalhes completos.")
     st.markdown("---")
 
-if len(produtos_selecionados) == 1:
+if produto_unico:
     
-    produto_id_sel = df_produtos[df_produtos['nome_produto'] == produtos_selecionados[0]]['produto_id'].values[0]
+    visao = analises.visao_produto(base, estado)
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
         st.markdown("Estoque")
-        estoque_atual = df_estoque_filtrado['quantidade_estoque'].sum()
-        estoque_minimo = df_estoque_filtrado['estoque_minimo'].mean()
+        estoque_atual = visao['estoque_atual']
+        estoque_minimo = visao['estoque_minimo']
         
         if estoque_atual < estoque_minimo:
             st.error(f"ALERTA: Estoque abaixo do mínimo!")
@@ -240,18 +250,18 @@ if len(produtos_selecionados) == 1:
     
     with col2:
         st.markdown("Vendas")
-        vendas_quantidade = df_vendas_filtrado['quantidade_vendida'].sum()
-        vendas_valor = df_vendas_filtrado['valor_total'].sum()
+        vendas_quantidade = visao['vendas_quantidade']
+        vendas_valor = visao['vendas_valor']
         st.metric("Quantidade Vendida", f"{vendas_quantidade:.0f} un")
         st.metric("Receita Gerada", f"R$ {vendas_valor:,.2f}")
     
     with col3:
         st.markdown("Compras")
-        compras_quantidade = df_compras_filtrado[df_compras_filtrado['status_compra'] == 'Entregue']['quantidade_comprada'].sum()
-        compras_valor = df_compras_filtrado[df_compras_filtrado['status_compra'] == 'Entregue']['valor_total'].sum()
+        compras_quantidade = visao['compras_quantidade']
+        compras_valor = visao['compras_valor']
+        fornecedor_principal = visao['fornecedor_principal']
         
-        if len(df_compras_filtrado) > 0:
-            fornecedor_principal = df_compras_filtrado.groupby('fornecedor')['valor_total'].sum().idxmax()
+        if fornecedor_principal is not None:
             st.metric("Quantidade Comprada", f"{compras_quantidade:.0f} un")
             st.metric("Valor Investido", f"R$ {compras_valor:,.2f}")
             st.info(f"Fornecedor Principal: **{fornecedor_principal}**")
@@ -264,23 +274,16 @@ if len(produtos_selecionados) == 1:
 
 st.markdown("### Indicadores Estratégicos")
 
-tab1, tab2, tab3, tab4 = st.tabs(["Produtos Críticos", "Top 10 Vendas", "Maiores Gastos", "Fornecedores"])
-
-with tab1:
+def aba_produtos_criticos():
+    perf.secao('produtos_criticos')
     st.markdown("Produtos com Estoque Crítico (Abaixo do Mínimo)")
     
    
-    estoque_agrupado = df_estoque_filtrado.groupby(['produto_id', 'nome_produto', 'categoria']).agg({
-        'quantidade_estoque': 'sum',
-        'estoque_minimo': 'sum'
-    }).reset_index()
-    
-    df_criticos = estoque_agrupado[estoque_agrupado['quantidade_estoque'] < estoque_agrupado['estoque_minimo']].copy()
-    df_criticos['deficit'] = df_criticos['estoque_minimo'] - df_criticos['quantidade_estoque']
-    df_criticos = df_criticos.sort_values('deficit', ascending=False)
+    df_criticos = analises.produtos_criticos(base, estado, n=20)
+    perf.linhas(len(df_criticos))
     
     if len(df_criticos) > 0:
-        df_criticos_display = df_criticos[['nome_produto', 'categoria', 'quantidade_estoque', 'estoque_minimo', 'deficit']].head(20)
+        df_criticos_display = df_criticos[['nome_produto', 'categoria', 'quantidade_estoque', 'estoque_minimo', 'deficit']]
         df_criticos_display.columns = ['Produto', 'Categoria', 'Estoque Total', 'Estoque Mínimo', 'Déficit']
         
         st.dataframe(
@@ -289,77 +292,25 @@ with tab1:
             hide_index=True
         )
         
-        fig = px.bar(
-            df_criticos.head(10),
-            x='nome_produto',
-            y='deficit',
-            title='Top 10 Produtos com Maior Déficit de Estoque',
-            labels={'nome_produto': 'Produto', 'deficit': 'Déficit (unidades)'},
-            color='deficit',
-            color_continuous_scale=['#ff6b6b', '#ff0000']
-        )
-        fig.update_layout(
-            plot_bgcolor='#2b2b2b',
-            paper_bgcolor='#2b2b2b',
-            font_color='#e0e0e0',
-            title_font_color='#4da6ff',
-            xaxis_title_font_color='#4da6ff',
-            yaxis_title_font_color='#4da6ff'
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        mostrar_grafico('deficit_criticos', analises.produtos_criticos.chave(base, estado, n=20), df_criticos)
     else:
         st.success("Nenhum produto com estoque crítico no momento!")
 
-with tab2:
+def aba_top_vendas():
+    perf.secao('top_vendas')
     st.markdown("Top 10 Produtos Mais Vendidos")
     
-    top_vendas = df_vendas_filtrado.groupby(['produto_id', 'nome_produto', 'categoria']).agg({
-        'quantidade_vendida': 'sum',
-        'valor_total': 'sum'
-    }).reset_index().sort_values('quantidade_vendida', ascending=False).head(10)
+    top_vendas = analises.top_vendas(base, estado)
+    perf.linhas(len(top_vendas))
     
     if len(top_vendas) > 0:
         col1, col2 = st.columns(2)
         
         with col1:
-            fig = px.bar(
-                top_vendas,
-                x='nome_produto',
-                y='quantidade_vendida',
-                title='Quantidade Vendida',
-                labels={'nome_produto': 'Produto', 'quantidade_vendida': 'Quantidade'},
-                color='quantidade_vendida',
-                color_continuous_scale='Blues'
-            )
-            fig.update_layout(
-                plot_bgcolor='#2b2b2b',
-                paper_bgcolor='#2b2b2b',
-                font_color='#e0e0e0',
-                title_font_color='#4da6ff',
-                xaxis_title_font_color='#4da6ff',
-                yaxis_title_font_color='#4da6ff'
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            mostrar_grafico('top_vendas_quantidade', analises.top_vendas.chave(base, estado), top_vendas)
         
         with col2:
-            fig = px.bar(
-                top_vendas,
-                x='nome_produto',
-                y='valor_total',
-                title='Receita Gerada',
-                labels={'nome_produto': 'Produto', 'valor_total': 'Receita (R$)'},
-                color='valor_total',
-                color_continuous_scale='Blues'
-            )
-            fig.update_layout(
-                plot_bgcolor='#2b2b2b',
-                paper_bgcolor='#2b2b2b',
-                font_color='#e0e0e0',
-                title_font_color='#4da6ff',
-                xaxis_title_font_color='#4da6ff',
-                yaxis_title_font_color='#4da6ff'
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            mostrar_grafico('top_vendas_receita', analises.top_vendas.chave(base, estado), top_vendas)
         
         top_vendas_display = top_vendas[['nome_produto', 'categoria', 'quantidade_vendida', 'valor_total']].copy()
         top_vendas_display.columns = ['Produto', 'Categoria', 'Quantidade Vendida', 'Receita Total (R$)']
@@ -367,33 +318,15 @@ with tab2:
     else:
         st.info("Nenhuma venda encontrada no período selecionado.")
 
-with tab3:
+def aba_maiores_gastos():
+    perf.secao('maiores_gastos')
     st.markdown("Produtos com Maior Gasto em Compras")
     
-    maiores_gastos = df_compras_filtrado[df_compras_filtrado['status_compra'] == 'Entregue'].groupby(['produto_id', 'nome_produto', 'categoria']).agg({
-        'valor_total': 'sum',
-        'quantidade_comprada': 'sum'
-    }).reset_index().sort_values('valor_total', ascending=False).head(10)
+    maiores_gastos = analises.maiores_gastos(base, estado)
+    perf.linhas(len(maiores_gastos))
     
     if len(maiores_gastos) > 0:
-        fig = px.bar(
-            maiores_gastos,
-            x='nome_produto',
-            y='valor_total',
-            title='Top 10 Produtos com Maior Investimento em Compras',
-            labels={'nome_produto': 'Produto', 'valor_total': 'Valor Investido (R$)'},
-            color='valor_total',
-            color_continuous_scale='Blues'
-        )
-        fig.update_layout(
-            plot_bgcolor='#2b2b2b',
-            paper_bgcolor='#2b2b2b',
-            font_color='#e0e0e0',
-            title_font_color='#4da6ff',
-            xaxis_title_font_color='#4da6ff',
-            yaxis_title_font_color='#4da6ff'
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        mostrar_grafico('maiores_gastos', analises.maiores_gastos.chave(base, estado), maiores_gastos)
         
         maiores_gastos_display = maiores_gastos[['nome_produto', 'categoria', 'quantidade_comprada', 'valor_total']].copy()
         maiores_gastos_display.columns = ['Produto', 'Categoria', 'Quantidade Comprada', 'Valor Total (R$)']
@@ -401,251 +334,85 @@ with tab3:
     else:
         st.info("Nenhuma compra entregue encontrada no período selecionado.")
 
-with tab4:
+def aba_fornecedores():
+    perf.secao('fornecedores')
     st.markdown("Análise de Fornecedores")
     
-    if len(df_compras_filtrado) > 0:
-        analise_fornecedores = df_compras_filtrado[df_compras_filtrado['status_compra'] == 'Entregue'].groupby('fornecedor').agg({
-            'valor_unitario': 'mean',
-            'prazo_entrega_dias': 'mean',
-            'quantidade_comprada': 'sum',
-            'valor_total': 'sum'
-        }).reset_index()
-        
-        analise_fornecedores.columns = ['Fornecedor', 'Preço Médio', 'Prazo Médio (dias)', 'Volume Total', 'Gasto Total']
-        analise_fornecedores = analise_fornecedores.sort_values('Gasto Total', ascending=False)
-        
+    analise_fornecedores = analises.analise_fornecedores(base, estado)
+    chave_fornecedores = analises.analise_fornecedores.chave(base, estado)
+    
+    if analise_fornecedores is not None:
         col1, col2 = st.columns(2)
         
         with col1:
-            fig = px.bar(
-                analise_fornecedores.head(10),
-                x='Fornecedor',
-                y='Preço Médio',
-                title='Preço Médio por Fornecedor',
-                labels={'Preço Médio': 'Preço Médio (R$)'},
-                color='Preço Médio',
-                color_continuous_scale='Blues'
-            )
-            fig.update_layout(
-                plot_bgcolor='#2b2b2b',
-                paper_bgcolor='#2b2b2b',
-                font_color='#e0e0e0',
-                title_font_color='#4da6ff',
-                xaxis_title_font_color='#4da6ff',
-                yaxis_title_font_color='#4da6ff'
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            mostrar_grafico('preco_fornecedores', chave_fornecedores, analise_fornecedores)
         
         with col2:
-            fig = px.bar(
-                analise_fornecedores.head(10),
-                x='Fornecedor',
-                y='Prazo Médio (dias)',
-                title='Prazo Médio de Entrega por Fornecedor',
-                labels={'Prazo Médio (dias)': 'Dias'},
-                color='Prazo Médio (dias)',
-                color_continuous_scale='Reds'
-            )
-            fig.update_layout(
-                plot_bgcolor='#2b2b2b',
-                paper_bgcolor='#2b2b2b',
-                font_color='#e0e0e0',
-                title_font_color='#4da6ff',
-                xaxis_title_font_color='#4da6ff',
-                yaxis_title_font_color='#4da6ff'
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            mostrar_grafico('prazo_fornecedores', chave_fornecedores, analise_fornecedores)
     
-        fig = px.scatter(
-            analise_fornecedores.head(15),
-            x='Prazo Médio (dias)',
-            y='Preço Médio',
-            size='Volume Total',
-            color='Gasto Total',
-            hover_name='Fornecedor',
-            title='Matriz de Análise de Fornecedores',
-            labels={'Prazo Médio (dias)': 'Prazo Médio (dias)', 'Preço Médio': 'Preço Médio (R$)'},
-            color_continuous_scale='Blues'
-        )
-        fig.update_layout(
-            plot_bgcolor='#2b2b2b',
-            paper_bgcolor='#2b2b2b',
-            font_color='#e0e0e0',
-            title_font_color='#4da6ff',
-            xaxis_title_font_color='#4da6ff',
-            yaxis_title_font_color='#4da6ff'
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        mostrar_grafico('matriz_fornecedores', chave_fornecedores, analise_fornecedores)
         
         st.dataframe(analise_fornecedores, use_container_width=True, hide_index=True)
+        st.caption(f"Entregas no prazo: até {fornecedores.PRAZO_COMBINADO} dias, um prazo de referência "
+                   "(DASHBOARD_PRAZO_COMBINADO), já que as compras não trazem a data prometida. Tendência do preço: "
+                   "variação mensal do preço unitário no período, em % do preço médio.")
         
         prazo_medio_geral = analise_fornecedores['Prazo Médio (dias)'].mean()
         st.info(f"● Tempo Médio de Reposição: **{prazo_medio_geral:.1f} dias**")
     else:
         st.info("Nenhuma compra encontrada no período selecionado.")
 
+mostrar_abas(
+    ["Produtos Críticos", "Top 10 Vendas", "Maiores Gastos", "Fornecedores"],
+    [aba_produtos_criticos, aba_top_vendas, aba_maiores_gastos, aba_fornecedores],
+    'abas_estrategicas',
+)
+
 st.markdown("---")
 
 st.markdown("### Análises Avançadas")
 
-tab1, tab2, tab3 = st.tabs(["Série Temporal", "Estoque vs Vendas vs Compras", "Análise por Loja"])
-
-with tab1:
+def aba_serie_temporal():
+    perf.secao('serie_temporal')
     st.markdown("Vendas vs Compras ao Longo do Tempo")
+
+    granularidade = st.radio('Granularidade', list(GRANULARIDADES), index=2, horizontal=True, key='granularidade_serie')
+    freq, titulo, eixo = GRANULARIDADES[granularidade]
+    vendas_periodo, compras_periodo = analises.serie_temporal(base, estado, freq=freq)
+    perf.linhas(len(vendas_periodo) + len(compras_periodo))
     
-    df_vendas_mes = df_vendas_filtrado.copy()
-    df_vendas_mes['mes'] = df_vendas_mes['data_venda'].dt.to_period('M').dt.to_timestamp()
-    vendas_mes = df_vendas_mes.groupby('mes')['quantidade_vendida'].sum().reset_index()
-    vendas_mes.columns = ['mes', 'quantidade']
-    
-    df_compras_mes = df_compras_filtrado[df_compras_filtrado['status_compra'] == 'Entregue'].copy()
-    df_compras_mes['mes'] = df_compras_mes['data_compra'].dt.to_period('M').dt.to_timestamp()
-    compras_mes = df_compras_mes.groupby('mes')['quantidade_comprada'].sum().reset_index()
-    compras_mes.columns = ['mes', 'quantidade']
-    
-    if len(vendas_mes) > 0 or len(compras_mes) > 0:
-        fig = go.Figure()
-        
-        if len(vendas_mes) > 0:
-            fig.add_trace(go.Scatter(
-                x=vendas_mes['mes'],
-                y=vendas_mes['quantidade'],
-                mode='lines+markers',
-                name='Vendas',
-                line=dict(color='#4da6ff', width=3),
-                marker=dict(size=8)
-            ))
-        
-        if len(compras_mes) > 0:
-            fig.add_trace(go.Scatter(
-                x=compras_mes['mes'],
-                y=compras_mes['quantidade'],
-                mode='lines+markers',
-                name='Compras',
-                line=dict(color='#ff6b6b', width=3),
-                marker=dict(size=8)
-            ))
-        
-        fig.update_layout(
-            title='Evolução Mensal: Vendas vs Compras',
-            xaxis_title='Mês',
-            yaxis_title='Quantidade',
-            plot_bgcolor='#2b2b2b',
-            paper_bgcolor='#2b2b2b',
-            font_color='#e0e0e0',
-            title_font_color='#4da6ff',
-            xaxis_title_font_color='#4da6ff',
-            yaxis_title_font_color='#4da6ff',
-            legend=dict(font=dict(color='#e0e0e0'))
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+    if len(vendas_periodo) > 0 or len(compras_periodo) > 0:
+        mostrar_grafico('serie_temporal', analises.serie_temporal.chave(base, estado, freq=freq),
+                        vendas_periodo, compras_periodo, titulo=titulo, eixo=eixo)
     else:
         st.info("Dados insuficientes para gerar o gráfico de série temporal.")
 
-with tab2:
+def aba_analise_consolidada():
+    perf.secao('analise_consolidada')
     st.markdown("Relação Estoque × Vendas × Compras por Produto")
     
-    estoque_produto = df_estoque_filtrado.groupby(['produto_id', 'nome_produto'])['quantidade_estoque'].sum().reset_index()
-    vendas_produto = df_vendas_filtrado.groupby('produto_id')['quantidade_vendida'].sum().reset_index()
-    compras_produto = df_compras_filtrado[df_compras_filtrado['status_compra'] == 'Entregue'].groupby('produto_id')['quantidade_comprada'].sum().reset_index()
-    
-    analise_consolidada = estoque_produto.merge(vendas_produto, on='produto_id', how='left')
-    analise_consolidada = analise_consolidada.merge(compras_produto, on='produto_id', how='left')
-    analise_consolidada.fillna(0, inplace=True)
-    
-    analise_consolidada = analise_consolidada.sort_values('quantidade_vendida', ascending=False).head(20)
+    analise_consolidada = analises.analise_consolidada(base, estado)
+    perf.linhas(len(analise_consolidada))
     
     if len(analise_consolidada) > 0:
-        fig = go.Figure()
-        
-        fig.add_trace(go.Bar(
-            x=analise_consolidada['nome_produto'],
-            y=analise_consolidada['quantidade_estoque'],
-            name='Estoque',
-            marker_color='#4da6ff'
-        ))
-        
-        fig.add_trace(go.Bar(
-            x=analise_consolidada['nome_produto'],
-            y=analise_consolidada['quantidade_vendida'],
-            name='Vendas',
-            marker_color='#66ff66'
-        ))
-        
-        fig.add_trace(go.Bar(
-            x=analise_consolidada['nome_produto'],
-            y=analise_consolidada['quantidade_comprada'],
-            name='Compras',
-            marker_color='#ff6b6b'
-        ))
-        
-        fig.update_layout(
-            title='Top 20 Produtos: Estoque × Vendas × Compras',
-            xaxis_title='Produto',
-            yaxis_title='Quantidade',
-            barmode='group',
-            plot_bgcolor='#2b2b2b',
-            paper_bgcolor='#2b2b2b',
-            font_color='#e0e0e0',
-            title_font_color='#4da6ff',
-            xaxis_title_font_color='#4da6ff',
-            yaxis_title_font_color='#4da6ff',
-            legend=dict(font=dict(color='#e0e0e0'))
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        mostrar_grafico('analise_consolidada', analises.analise_consolidada.chave(base, estado), analise_consolidada)
     else:
         st.info("Dados insuficientes para análise consolidada.")
 
-with tab3:
+def aba_vendas_por_loja():
+    perf.secao('vendas_por_loja')
     st.markdown("Análise de Vendas por Loja")
     
     if len(lojas_selecionadas) > 1:
-        vendas_loja = df_vendas_filtrado.groupby('loja_id').agg({
-            'valor_total': 'sum',
-            'quantidade_vendida': 'sum',
-            'venda_id': 'count'
-        }).reset_index()
-        vendas_loja.columns = ['Loja', 'Receita Total', 'Quantidade Vendida', 'Número de Vendas']
+        vendas_loja = analises.vendas_por_loja(base, estado)
         
         col1, col2 = st.columns(2)
         
         with col1:
-            fig = px.pie(
-                vendas_loja,
-                values='Receita Total',
-                names='Loja',
-                title='Distribuição de Receita por Loja',
-                color_discrete_sequence=px.colors.sequential.Blues_r
-            )
-            fig.update_layout(
-                plot_bgcolor='#2b2b2b',
-                paper_bgcolor='#2b2b2b',
-                font_color='#e0e0e0',
-                title_font_color='#4da6ff'
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            mostrar_grafico('receita_lojas', analises.vendas_por_loja.chave(base, estado), vendas_loja)
         
         with col2:
-            fig = px.bar(
-                vendas_loja,
-                x='Loja',
-                y='Quantidade Vendida',
-                title='Quantidade Vendida por Loja',
-                color='Quantidade Vendida',
-                color_continuous_scale='Blues'
-            )
-            fig.update_layout(
-                plot_bgcolor='#2b2b2b',
-                paper_bgcolor='#2b2b2b',
-                font_color='#e0e0e0',
-                title_font_color='#4da6ff',
-                xaxis_title_font_color='#4da6ff',
-                yaxis_title_font_color='#4da6ff'
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            mostrar_grafico('quantidade_lojas', analises.vendas_por_loja.chave(base, estado), vendas_loja)
         
         st.dataframe(vendas_loja, use_container_width=True, hide_index=True)
     elif len(lojas_selecionadas) == 1:
@@ -653,8 +420,15 @@ with tab3:
     else:
         st.warning("Selecione ao menos uma loja para visualizar os dados.")
 
+mostrar_abas(
+    ["Série Temporal", "Estoque vs Vendas vs Compras", "Análise por Loja"],
+    [aba_serie_temporal, aba_analise_consolidada, aba_vendas_por_loja],
+    'abas_avancadas',
+)
+
 st.markdown("---")
 
+perf.secao('recomendacoes')
 st.markdown("### Recomendações Estratégicas")
 
 col1, col2 = st.columns(2)
@@ -662,79 +436,77 @@ col1, col2 = st.columns(2)
 with col1:
     st.markdown("**Ações Urgentes**")
     
-    produtos_ruptura = df_estoque_filtrado[df_estoque_filtrado['quantidade_estoque'] < df_estoque_filtrado['estoque_minimo']]
-    if len(produtos_ruptura) > 0:
-        st.error(f"**{len(produtos_ruptura)} produtos** em risco de ruptura de estoque")
+    recomendacoes = analises.recomendacoes(base, estado)
+    
+    if recomendacoes['produtos_ruptura'] > 0:
+        st.error(f"**{recomendacoes['produtos_ruptura']} produtos** em risco de ruptura de estoque")
         st.markdown("**Ação:** Realizar pedidos de reposição imediatamente")
         st.caption("_Justificativa: Produtos abaixo do estoque mínimo podem causar perda de vendas e insatisfação dos clientes._")
     else:
         st.success("✓ Nenhum produto em risco de ruptura")
     
-    if len(df_vendas_filtrado) > 0:
-        vendas_por_produto = df_vendas_filtrado.groupby('produto_id')['quantidade_vendida'].sum()
-        estoque_alto = df_estoque_filtrado[df_estoque_filtrado['quantidade_estoque'] > df_estoque_filtrado['estoque_minimo'] * 2]
-        
-        produtos_parados = []
-        for _, row in estoque_alto.iterrows():
-            vendas = vendas_por_produto.get(row['produto_id'], 0)
-            if vendas < row['quantidade_estoque'] * 0.1:
-                produtos_parados.append(row)
+    reposicao, total_reposicao = analises.reposicao_urgente(base, estado)
+    if total_reposicao > 0:
+        st.error(f"**{total_reposicao} posições** (produto × localização) no ponto de pedido")
+        st.markdown("**Ação:** Repor agora, começando pela ruptura prevista mais próxima")
+        st.caption(f"_Justificativa: A venda esperada até a entrega (média diária dos últimos {analises.JANELA_VELOCIDADE} dias × prazo médio de entrega do produto) mais o estoque mínimo já supera o estoque da posição._")
         
-        if len(produtos_parados) > 0:
-            st.warning(f"**{len(produtos_parados)} produtos** com excesso de estoque e baixa venda")
+        df_reposicao_display = reposicao[[
+            'nome_produto', 'localizacao', 'quantidade_estoque', 'estoque_minimo', 'velocidade_diaria',
+            'cobertura_dias', 'data_ruptura', 'prazo_entrega_dias', 'quantidade_sugerida'
+        ]].replace(np.inf, np.nan)
+        df_reposicao_display.columns = ['Produto', 'Localização', 'Estoque', 'Estoque Mínimo', 'Venda/dia',
+                                        'Cobertura (dias)', 'Ruptura Prevista', 'Prazo (dias)', 'Sugestão (un)']
+        st.dataframe(df_reposicao_display, use_container_width=True, hide_index=True)
+        if len(reposicao) < total_reposicao:
+            st.caption(f"Mostrando as {len(reposicao)} posições com ruptura mais próxima de {total_reposicao}.")
+    
+    if recomendacoes['produtos_parados'] is not None:
+        if recomendacoes['produtos_parados'] > 0:
+            st.warning(f"**{recomendacoes['produtos_parados']} produtos** com excesso de estoque e baixa venda")
             st.markdown("**Ação:** Considerar promoções ou descontos")
             st.caption("_Justificativa: Reduzir o capital imobilizado e liberar espaço físico no estoque._")
+            
+            df_parados_display = analises.produtos_parados(base, estado)[[
+                'nome_produto', 'localizacao', 'quantidade_estoque', 'estoque_minimo',
+                'quantidade_vendida', 'excesso_unidades', 'capital_imobilizado'
+            ]].copy()
+            df_parados_display.columns = ['Produto', 'Localização', 'Estoque', 'Estoque Mínimo', 'Vendido no Período', 'Excesso (un)', 'Capital Imobilizado (R$)']
+            st.dataframe(df_parados_display, use_container_width=True, hide_index=True)
         else:
             st.success("✓ Estoque proporcional às vendas")
 
 with col2:
     st.markdown("**Oportunidades**")
     
-    if len(df_vendas_filtrado) > 0:
-        top_5_vendas = df_vendas_filtrado.groupby(['produto_id', 'nome_produto'])['quantidade_vendida'].sum().sort_values(ascending=False).head(5)
+    if recomendacoes['tem_vendas']:
         st.info(f"**Top 5 produtos** representam oportunidade de marketing")
         st.markdown("**Ação:** Investir em campanhas promocionais")
         st.caption("_Justificativa: Produtos com alta demanda têm maior potencial de retorno sobre investimento em marketing._")
         
-        if len(df_compras_filtrado) > 0:
-            fornecedores = df_compras_filtrado[df_compras_filtrado['status_compra'] == 'Entregue'].groupby('fornecedor').agg({
-                'prazo_entrega_dias': 'mean',
-                'valor_unitario': 'mean'
-            })
-            
-            if len(fornecedores) > 0:
-                melhor_prazo = fornecedores['prazo_entrega_dias'].idxmin()
-                st.success(f"**Fornecedor recomendado:** {melhor_prazo}")
-                st.markdown("**Ação:** Priorizar parcerias estratégicas")
-                st.caption("_Justificativa: Menor prazo de entrega reduz tempo de reposição e risco de ruptura de estoque._")
+        if recomendacoes['fornecedor_recomendado'] is not None:
+            st.success(f"**Fornecedor recomendado:** {recomendacoes['fornecedor_recomendado']}")
+            st.markdown("**Ação:** Priorizar parcerias estratégicas")
+            st.caption("_Justificativa: Menor prazo de entrega reduz tempo de reposição e risco de ruptura de estoque._")
 
 
+perf.secao('vendas_por_categoria')
 st.markdown("### Análise por Categoria")
-if len(df_vendas_filtrado) > 0:
-    vendas_categoria = df_vendas_filtrado.groupby('categoria').agg({
-        'valor_total': 'sum',
-        'quantidade_vendida': 'sum'
-    }).sort_values('valor_total', ascending=False)
+if recomendacoes['tem_vendas']:
+    vendas_categoria = analises.vendas_por_categoria(base, estado)
     
-    fig = px.bar(
-        vendas_categoria,
-        x=vendas_categoria.index,
-        y='valor_total',
-        title='Receita por Categoria',
-        labels={'valor_total': 'Receita (R$)', 'index': 'Categoria'},
-        color='valor_total',
-        color_continuous_scale='Blues'
-    )
-    fig.update_layout(
-        plot_bgcolor='#2b2b2b',
-        paper_bgcolor='#2b2b2b',
-        font_color='#e0e0e0',
-        title_font_color='#4da6ff',
-        xaxis_title_font_color='#4da6ff',
-        yaxis_title_font_color='#4da6ff'
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    mostrar_grafico('receita_categorias', analises.vendas_por_categoria.chave(base, estado), vendas_categoria)
 
 st.markdown("---")
 st.markdown("<p style='text-align: center; color: #808080;'>Super-Dashboard Integrado | Desenvolvido para a cadeira de Fundamentos em Ciência da Dados 2025.2</p>", unsafe_allow_html=True)
-st.markdown("<p style='text-align: center; color: #808080;'>2025 - Rafael Alves</p>", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown("<p style='text-align: center; color: #808080;'>2025 - Rafael Alves</p>", unsafe_allow_html=True)
+
+tabela_perfil = perf.encerrar()
+if tabela_perfil is not None:
+    perf.gravar(estado)
+    with st.sidebar.expander("Perfil da Execução", expanded=True):
+        tabela_perfil['Seção'] = ['↳ ' * nivel + secao for nivel, secao in zip(tabela_perfil['nivel'], tabela_perfil['secao'])]
+        tabela_perfil['ms'] = tabela_perfil['segundos'] * 1000
+        tabela_perfil['Pico (MB)'] = tabela_perfil['pico_bytes'] / 1024 ** 2
+        st.dataframe(tabela_perfil[['Seção', 'ms', 'Pico (MB)', 'chamadas', 'linhas']], use_container_width=True, hide_index=True)
+        st.caption(f"Total: {perf.total * 1000:.0f} ms. Linhas com ↳ são medições aninhadas, somadas em todas as seções e já incluídas no tempo delas. Registro em `{perfil.ARQUIVO_LOG}`")
\ No newline at end of file
@@ -0,0 +1,181 @@
+import copy
+import os
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class EstadoFiltro:
+    """Seleção da barra lateral, imutável e hashable para servir de chave de cache.
+
+    Tuplas vazias (e `produtos=None`) significam "sem filtro", como nos
+    multiselects do dashboard.
+    """
+
+    categorias: tuple = ()
+    produtos: tuple = None
+    lojas: tuple = ()
+    data_inicio: date = None
+    data_fim: date = None
+
+    @classmethod
+    def criar(cls, categorias=(), produtos=None, lojas=(), data_inicio=None, data_fim=None):
+        return cls(
+            categorias=tuple(sorted(categorias)),
+            produtos=None if produtos is None else tuple(sorted(int(p) for p in produtos)),
+            lojas=tuple(sorted(int(loja) for loja in lojas)),
+            data_inicio=None if data_inicio is None else pd.Timestamp(data_inicio).date(),
+            data_fim=None if data_fim is None else pd.Timestamp(data_fim).date(),
+        )
+
+    def projetar(self, campos):
+        """O filtro só com `campos`; os demais voltam a "sem filtro"."""
+        return EstadoFiltro(**{campo: getattr(self, campo) for campo in campos})
+
+    def descrever(self):
+        """O filtro como dicionário serializável em JSON."""
+        return {
+            'categorias': list(self.categorias),
+            'produtos': None if self.produtos is None else list(self.produtos),
+            'lojas': list(self.lojas),
+            'data_inicio': None if self.data_inicio is None else self.data_inicio.isoformat(),
+            'data_fim': None if self.data_fim is None else self.data_fim.isoformat(),
+        }
+
+
+@dataclass(frozen=True)
+class Recorte:
+    """Lojas (ids) e período de vendas que uma instalação carrega; None é sem limite.
+
+    Ao contrário de `EstadoFiltro`, vale para o processo inteiro e decide o
+    que é lido do disco (ver `particoes`).
+    """
+
+    lojas: tuple = None
+    data_inicio: date = None
+    data_fim: date = None
+
+    @classmethod
+    def do_ambiente(cls, ambiente=os.environ):
+        """Recorte de `DASHBOARD_LOJAS` (ids separados por vírgula), `DASHBOARD_INICIO` e `DASHBOARD_FIM`; None sem nenhum deles."""
+        lojas, inicio, fim = (ambiente.get(variavel) for variavel in ('DASHBOARD_LOJAS', 'DASHBOARD_INICIO', 'DASHBOARD_FIM'))
+        if not (lojas or inicio or fim):
+            return None
+        return cls(
+            lojas=tuple(sorted(int(loja) for loja in lojas.split(','))) if lojas else None,
+            data_inicio=pd.Timestamp(inicio).date() if inicio else None,
+            data_fim=pd.Timestamp(fim).date() if fim else None,
+        )
+
+    def cobre_loja(self, loja):
+        return self.lojas is None or loja in self.lojas
+
+    def cobre_periodo(self, inicio, fim):
+        """Se algum dia entre `inicio` e `fim` está dentro do período."""
+        return ((self.data_inicio is None or pd.Timestamp(fim) >= pd.Timestamp(self.data_inicio))
+                and (self.data_fim is None or pd.Timestamp(inicio) <= pd.Timestamp(self.data_fim)))
+
+
+class IndiceFiltros:
+    """Índices de filtro de uma tabela, construídos uma vez por carga dos dados.
+
+    A tabela precisa estar ordenada por `coluna_data`, de modo que um período
+    vira um intervalo contíguo de linhas achado com `searchsorted`. Para cada
+    coluna em `colunas` guarda-se um índice invertido valor -> posições
+    (ordenadas), e uma seleção é resolvida marcando essas posições dentro do
+    intervalo de datas, sem copiar nem varrer a tabela inteira.
+    """
+
+    def __init__(self, df, coluna_data=None, colunas=()):
+        if coluna_data is not None and not df[coluna_data].is_monotonic_increasing:
+            raise ValueError(f"tabela precisa estar ordenada por '{coluna_data}'")
+        self.df = df
+        self.coluna_data = coluna_data
+        self.datas = df[coluna_data].to_numpy() if coluna_data is not None else None
+        self.indices = {}
+        self._cobre_tudo = {}
+        for coluna in colunas:
+            indice = df.groupby(coluna, sort=False, observed=True).indices
+            self.indices[coluna] = indice
+            self._cobre_tudo[coluna] = sum(len(posicoes) for posicoes in indice.values()) == len(df)
+
+    def estender(self, df):
+        """Novos índices para `df`, esta tabela com linhas acrescentadas no fim; só as linhas novas são agrupadas.
+
+        Devolve None se as linhas novas quebram a ordem por data. Estes
+        índices não são alterados: os valores que não aparecem nas linhas
+        novas compartilham as mesmas posições.
+        """
+        inicio = len(self.df)
+        novas = df.iloc[inicio:]
+        novo = copy.copy(self)
+        novo.df = df
+        if self.datas is not None:
+            datas = novas[self.coluna_data].to_numpy()
+            if len(datas) > 0 and ((inicio > 0 and datas[0] < self.datas[-1]) or (datas[1:] < datas[:-1]).any()):
+                return None
+            novo.datas = np.concatenate([self.datas, datas])
+        novo.indices, novo._cobre_tudo = {}, {}
+        for coluna, indice in self.indices.items():
+            indice = dict(indice)
+            for valor, posicoes in novas.groupby(coluna, sort=False, observed=True).indices.items():
+                anteriores = indice.get(valor)
+                posicoes = posicoes + inicio
+                indice[valor] = posicoes if anteriores is None else np.concatenate([anteriores, posicoes])
+            novo.indices[coluna] = indice
+            novo._cobre_tudo[coluna] = self._cobre_tudo[coluna] and bool(novas[coluna].notna().all())
+        return novo
+
+    @property
+    def nbytes(self):
+        total = 0 if self.datas is None else self.datas.nbytes
+        for indice in self.indices.values():
+            total += sum(posicoes.nbytes for posicoes in indice.values())
+        return total
+
+    def intervalo(self, data_inicio=None, data_fim=None):
+        inicio, fim = 0, len(self.df)
+        if self.datas is not None:
+            if data_inicio is not None:
+                inicio = int(np.searchsorted(self.datas, pd.Timestamp(data_inicio).to_datetime64(), 'left'))
+            if data_fim is not None:
+                fim = int(np.searchsorted(self.datas, pd.Timestamp(data_fim).to_datetime64(), 'right'))
+        return inicio, max(inicio, fim)
+
+    def linhas(self, data_inicio=None, data_fim=None, **selecoes):
+        """Posições das linhas que atendem ao período e às seleções.
+
+        Cada seleção é `coluna=valores`; uma seleção vazia (ou None) não filtra,
+        como nos filtros da barra lateral.
+        """
+        inicio, fim = self.intervalo(data_inicio, data_fim)
+        mascara = None
+        for coluna, valores in selecoes.items():
+            if valores is None or len(valores) == 0:
+                continue
+            indice = self.indices[coluna]
+            valores = set(valores)
+            if self._cobre_tudo[coluna] and indice.keys() <= valores:
+                continue
+
+            marcadas = np.zeros(fim - inicio, dtype=bool)
+            for valor in valores:
+                posicoes = indice.get(valor)
+                if posicoes is None:
+                    continue
+                a, b = np.searchsorted(posicoes, [inicio, fim])
+                marcadas[posicoes[a:b] - inicio] = True
+            mascara = marcadas if mascara is None else mascara & marcadas
+
+        if mascara is None:
+            return np.arange(inicio, fim)
+        return np.flatnonzero(mascara) + inicio
+
+    def filtrar(self, data_inicio=None, data_fim=None, **selecoes):
+        linhas = self.linhas(data_inicio, data_fim, **selecoes)
+        if len(linhas) > 0 and linhas[-1] - linhas[0] + 1 == len(linhas):
+            return self.df.iloc[linhas[0]:linhas[-1] + 1]
+        return self.df.take(linhas)
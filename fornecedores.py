@@ -0,0 +1,174 @@
+"""Estatísticas de compras entregues por fornecedor × produto × mês, montadas na carga dos dados.
+
+Cada balde guarda contagens, somas e somas dos quadrados do preço
+unitário e do prazo de entrega. Médias, desvios, entregas no prazo e
+tendência de preço de qualquer período saem da soma dos baldes dos meses
+inteiros do período; só os meses das pontas, quando o período não começa
+ou termina na virada do mês, são lidos linha a linha.
+"""
+import copy
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Prazo de entrega (em dias) até o qual uma compra conta como entregue no
+# prazo. As compras não trazem a data prometida pelo fornecedor, então é
+# um prazo de referência único, escolhido por instalação.
+PRAZO_COMBINADO = int(os.environ.get('DASHBOARD_PRAZO_COMBINADO', '10'))
+
+MEDIDAS = ['linhas', 'quantidade_comprada', 'valor_total', 'valor_unitario', 'valor_unitario_quadrado',
+           'prazo_entrega_dias', 'prazo_entrega_dias_quadrado', 'no_prazo']
+
+COLUNAS = ['Fornecedor', 'Preço Médio', 'Desvio do Preço', 'Tendência do Preço (%/mês)', 'Prazo Médio (dias)',
+           'Desvio do Prazo (dias)', 'Entregas no Prazo (%)', 'Volume Total', 'Gasto Total']
+
+
+def derivar(df_compras):
+    """Acrescenta a contagem, os quadrados e as entregas no prazo às linhas originais de compras.
+
+    Numa tabela já agregada (`blocos`), essas medidas já vêm somadas e a
+    tabela volta como está.
+    """
+    if 'no_prazo' in df_compras.columns:
+        return df_compras
+    prazo = df_compras['prazo_entrega_dias']
+    return df_compras.assign(
+        linhas=1,
+        valor_unitario_quadrado=df_compras['valor_unitario'].astype(float) ** 2,
+        prazo_entrega_dias_quadrado=prazo.astype(float) ** 2,
+        no_prazo=(prazo <= PRAZO_COMBINADO).astype('int64'),
+    )
+
+
+def _mes(datas):
+    """Primeiro dia do mês de cada data."""
+    return np.asarray(datas).astype('datetime64[M]').astype('datetime64[ns]')
+
+
+def _entregues(df_compras, produtos):
+    mascara = (df_compras['status_compra'] == 'Entregue').to_numpy()
+    if produtos is not None:
+        mascara &= np.isin(df_compras['produto_id'].to_numpy(), produtos)
+    entregues = derivar(df_compras[mascara])
+    return pd.DataFrame({
+        'mes': _mes(entregues['data_compra']),
+        'fornecedor': entregues['fornecedor'].astype(object).to_numpy(),
+        'produto_id': entregues['produto_id'].to_numpy(),
+        **{medida: entregues[medida].to_numpy(dtype=float) for medida in MEDIDAS},
+    })
+
+
+class EstatisticasFornecedores:
+    """Baldes mensais de compras entregues por fornecedor × produto, ordenados por mês.
+
+    `compras` precisa estar ordenada por `data_compra`; ela é guardada (sem
+    cópia) para as pontas de períodos que cortam um mês ao meio.
+    """
+
+    def __init__(self, df_compras):
+        self.compras = df_compras
+        self.datas = df_compras['data_compra'].to_numpy()
+        entregues = _entregues(df_compras, None)
+        self.baldes = entregues.groupby(['mes', 'fornecedor', 'produto_id'], sort=True)[MEDIDAS].sum().reset_index()
+        self.meses = self.baldes['mes'].to_numpy()
+
+    def estender(self, df_compras):
+        """Novas estatísticas para `df_compras`, estas compras com linhas acrescentadas no fim.
+
+        Só os baldes a partir do mês da primeira linha nova são somados de
+        novo; os anteriores são reaproveitados. Devolve None se as linhas
+        novas quebram a ordem por data. Estas estatísticas não são alteradas.
+        """
+        inicio = len(self.compras)
+        novas = df_compras.iloc[inicio:]
+        datas = novas['data_compra'].to_numpy()
+        if len(datas) > 0 and ((inicio > 0 and datas[0] < self.datas[-1]) or (datas[1:] < datas[:-1]).any()):
+            return None
+        novo = copy.copy(self)
+        novo.compras = df_compras
+        novo.datas = np.concatenate([self.datas, datas])
+        entregues = _entregues(novas, None)
+        if len(entregues) > 0:
+            corte = int(np.searchsorted(self.meses, entregues['mes'].to_numpy().min(), 'left'))
+            refeitos = (pd.concat([self.baldes.iloc[corte:], entregues], ignore_index=True)
+                        .groupby(['mes', 'fornecedor', 'produto_id'], sort=True)[MEDIDAS].sum().reset_index())
+            novo.baldes = pd.concat([self.baldes.iloc[:corte], refeitos], ignore_index=True)
+            novo.meses = novo.baldes['mes'].to_numpy()
+        return novo
+
+    @property
+    def nbytes(self):
+        return int(self.baldes.memory_usage(deep=True).sum())
+
+    def _linhas(self, inicio, fim, produtos):
+        """Compras entregues entre `inicio` e `fim` (inclusive; None é sem limite), lidas linha a linha."""
+        a = 0 if inicio is None else int(np.searchsorted(self.datas, inicio.to_datetime64(), 'left'))
+        b = len(self.datas) if fim is None else int(np.searchsorted(self.datas, fim.to_datetime64(), 'right'))
+        return _entregues(self.compras.iloc[a:max(a, b)], produtos)
+
+    def somar(self, data_inicio=None, data_fim=None, produtos=None, por=('fornecedor',)):
+        """Somas das `MEDIDAS` no período agrupadas pelas colunas `por` ('mes', 'fornecedor', 'produto_id').
+
+        Os meses inteiros do período vêm dos baldes; os dias antes do
+        primeiro e depois do último mês inteiro, das linhas de compras.
+        """
+        inicio = None if data_inicio is None else pd.Timestamp(data_inicio)
+        fim = None if data_fim is None else pd.Timestamp(data_fim)
+        # Meses inteiros dentro do período: de `primeiro` até o dia antes de `seguinte`.
+        primeiro = None if inicio is None else inicio + pd.offsets.MonthBegin(int(inicio.day != 1))
+        seguinte = None if fim is None else (fim + pd.Timedelta(days=1)).to_period('M').to_timestamp()
+
+        if primeiro is not None and seguinte is not None and primeiro >= seguinte:
+            partes = [self._linhas(inicio, fim, produtos)]
+        else:
+            a = 0 if primeiro is None else int(np.searchsorted(self.meses, primeiro.to_datetime64(), 'left'))
+            b = len(self.meses) if seguinte is None else int(np.searchsorted(self.meses, seguinte.to_datetime64(), 'left'))
+            baldes = self.baldes.iloc[a:max(a, b)]
+            if produtos is not None:
+                baldes = baldes[np.isin(baldes['produto_id'].to_numpy(), produtos)]
+            partes = [baldes]
+            if primeiro is not None and inicio < primeiro:
+                partes.append(self._linhas(inicio, primeiro - pd.Timedelta(days=1), produtos))
+            if seguinte is not None and seguinte <= fim:
+                partes.append(self._linhas(seguinte, fim, produtos))
+
+        return pd.concat(partes, ignore_index=True).groupby(list(por), sort=True)[MEDIDAS].sum()
+
+
+def _desvio(soma, soma_quadrados, n):
+    """Desvio padrão amostral a partir das somas; NaN com menos de duas linhas."""
+    variancia = (soma_quadrados - soma ** 2 / n) / (n - 1)
+    return np.sqrt(variancia.clip(lower=0)).where(n > 1)
+
+
+def indicadores(somas_por_mes):
+    """Scorecard por fornecedor a partir das somas por fornecedor × mês (índice ou colunas `fornecedor` e `mes`).
+
+    A tendência do preço é a inclinação da reta de mínimos quadrados do
+    preço unitário de cada compra contra o seu mês, em % do preço médio.
+    """
+    somas = somas_por_mes.reset_index() if 'fornecedor' not in somas_por_mes.columns else somas_por_mes
+    meses = pd.DatetimeIndex(somas['mes'])
+    t = (meses.year * 12 + meses.month).to_numpy()
+    t = t - t.min() if len(t) > 0 else t
+    somas = somas.assign(t_linhas=t * somas['linhas'], t2_linhas=t * t * somas['linhas'], t_preco=t * somas['valor_unitario'])
+    total = somas.groupby('fornecedor', sort=True)[MEDIDAS + ['t_linhas', 't2_linhas', 't_preco']].sum()
+
+    n = total['linhas']
+    preco_medio = total['valor_unitario'] / n
+    inclinacao = ((n * total['t_preco'] - total['t_linhas'] * total['valor_unitario'])
+                  / (n * total['t2_linhas'] - total['t_linhas'] ** 2).replace(0, np.nan))
+    analise = pd.DataFrame({
+        'Fornecedor': total.index,
+        'Preço Médio': preco_medio,
+        'Desvio do Preço': _desvio(total['valor_unitario'], total['valor_unitario_quadrado'], n),
+        'Tendência do Preço (%/mês)': 100 * inclinacao / preco_medio,
+        'Prazo Médio (dias)': total['prazo_entrega_dias'] / n,
+        'Desvio do Prazo (dias)': _desvio(total['prazo_entrega_dias'], total['prazo_entrega_dias_quadrado'], n),
+        'Entregas no Prazo (%)': 100 * total['no_prazo'] / n,
+        'Volume Total': total['quantidade_comprada'].round().astype('int64'),
+        'Gasto Total': total['valor_total'],
+    })
+    return analise.sort_values('Gasto Total', ascending=False, kind='stable', ignore_index=True)
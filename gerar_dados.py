@@ -0,0 +1,148 @@
+"""Gera arquivos FCD_*.csv sintéticos, no mesmo formato dos originais, em escala configurável.
+
+Exemplo:
+    python gerar_dados.py --saida dados_teste --produtos 50000 --lojas 3 --dias 730 --vendas-por-dia 100000
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+
+CATEGORIAS = ['Motor', 'Freios', 'Suspensão', 'Elétrica', 'Transmissão', 'Pneus', 'Acessórios']
+MARCAS = ['Bosch', 'NGK', 'Pirelli', 'Yamaha', 'Honda', 'Suzuki', 'Kawasaki', 'Cofap', 'Shineray']
+PALAVRAS = ['Lorem', 'Ipsum', 'Dolor', 'Amet', 'Velit', 'Neque', 'Quia', 'Nihil', 'Fugiat', 'Rerum',
+            'Eius', 'Totam', 'Beatae', 'Nobis', 'Illum', 'Sunt', 'Minus', 'Autem', 'Vero', 'Ipsa']
+FORNECEDORES = ['Bosch Distribuição', 'Cofap Distrib', 'Honda Peças', 'Magneti Marelli',
+                'NGK Brasil', 'Pirelli Brasil', 'Yamaha Parts']
+STATUS_COMPRA = ['Entregue', 'Pendente', 'Cancelada']
+PROB_STATUS = [0.86, 0.09, 0.05]
+
+
+def nome_localizacao(loja_id):
+    return {1: 'Loja 1', 2: 'Loja 2', 3: 'Depósito Central'}.get(loja_id, f'Loja {loja_id}')
+
+
+def gerar_produtos(n_produtos, rng):
+    ids = np.arange(1, n_produtos + 1)
+    categoria = rng.choice(CATEGORIAS, n_produtos)
+    marca = rng.choice(MARCAS, n_produtos)
+    palavra = rng.choice(PALAVRAS, n_produtos)
+    preco = np.round(rng.uniform(20, 2500, n_produtos), 2)
+    return pd.DataFrame({
+        'produto_id': ids,
+        'sku': [f'SKU{i:05d}' for i in ids],
+        'produto_nome': [f'{c} {m} {p} {i}' for c, m, p, i in zip(categoria, marca, palavra, ids)],
+        'categoria': categoria,
+        'marca': marca,
+        'preco_unitario': preco,
+        'custo_unitario': np.round(preco * rng.uniform(0.4, 0.7, n_produtos), 2),
+        'estoque_inicial': rng.integers(0, 100, n_produtos),
+        'unidade_medida': 'unidade',
+        'peso_kg': np.round(rng.uniform(0.1, 10, n_produtos), 2),
+        'dimensao_cm': [f'{a}x{b}x{c}' for a, b, c in rng.integers(1, 100, (n_produtos, 3))],
+    })
+
+
+def gerar_estoque(n_produtos, n_lojas, inicio, dias, rng):
+    """Uma posição por produto × localização no dia 28 de cada mês do período."""
+    datas = pd.date_range(inicio, periods=dias, freq='D')
+    referencias = datas[datas.day == 28]
+    if len(referencias) == 0:
+        referencias = datas[-1:]
+    produto, loja, data = np.meshgrid(np.arange(1, n_produtos + 1), np.arange(1, n_lojas + 1),
+                                      np.arange(len(referencias)), indexing='ij')
+    n = produto.size
+    localizacoes = np.array([nome_localizacao(i) for i in range(1, n_lojas + 1)], dtype=object)
+    return pd.DataFrame({
+        'estoque_id': np.arange(1, n + 1),
+        'data_referencia': referencias.strftime('%Y-%m-%d').to_numpy()[data.ravel()],
+        'produto_id': produto.ravel(),
+        'quantidade_estoque': rng.integers(0, 800, n),
+        'estoque_minimo': rng.integers(5, 80, n),
+        'localizacao': localizacoes[loja.ravel() - 1],
+    })
+
+
+def gerar_compras(precos, inicio, dias, compras_por_dia, rng):
+    n = dias * compras_por_dia
+    datas = pd.date_range(inicio, periods=dias, freq='D').strftime('%d/%m/%Y').to_numpy()
+    produto = rng.integers(1, len(precos) + 1, n)
+    quantidade = rng.integers(1, 60, n)
+    valor_unitario = np.round(precos[produto - 1] * rng.uniform(0.4, 0.7, n), 2)
+    return pd.DataFrame({
+        'compra_id': np.arange(1, n + 1),
+        'data_compra': datas[np.repeat(np.arange(dias), compras_por_dia)],
+        'produto_id': produto,
+        'fornecedor': rng.choice(FORNECEDORES, n),
+        'quantidade_comprada': quantidade,
+        'valor_unitario': valor_unitario,
+        'valor_total': np.round(quantidade * valor_unitario, 2),
+        'prazo_entrega_dias': rng.integers(2, 21, n),
+        'status_compra': rng.choice(STATUS_COMPRA, n, p=PROB_STATUS),
+    })
+
+
+def escrever_vendas(caminho, precos, n_lojas, inicio, dias, vendas_por_dia, rng, linhas_por_bloco=2_000_000):
+    """Escreve as vendas em blocos de dias, sem manter o arquivo inteiro em memória."""
+    datas = pd.date_range(inicio, periods=dias, freq='D').strftime('%d/%m/%Y').to_numpy()
+    dias_por_bloco = max(1, linhas_por_bloco // max(vendas_por_dia, 1))
+    proximo_id = 1
+    with open(caminho, 'w', encoding='utf-8', newline='') as f:
+        for primeiro_dia in range(0, dias, dias_por_bloco):
+            dias_bloco = np.arange(primeiro_dia, min(dias, primeiro_dia + dias_por_bloco))
+            n = len(dias_bloco) * vendas_por_dia
+            produto = rng.integers(1, len(precos) + 1, n)
+            quantidade = rng.integers(1, 10, n)
+            valor_unitario = precos[produto - 1]
+            pd.DataFrame({
+                'venda_id': np.arange(proximo_id, proximo_id + n),
+                'data_venda': datas[np.repeat(dias_bloco, vendas_por_dia)],
+                'produto_id': produto,
+                'loja_id': rng.integers(1, n_lojas + 1, n),
+                'quantidade_vendida': quantidade,
+                'valor_unitario': valor_unitario,
+                'valor_total': np.round(quantidade * valor_unitario, 2),
+            }).to_csv(f, sep=';', index=False, header=proximo_id == 1)
+            proximo_id += n
+
+
+def gerar(saida, produtos=300, lojas=3, dias=365, vendas_por_dia=50, compras_por_dia=None,
+          inicio='2024-01-01', semente=0):
+    """Gera os quatro FCD_*.csv em `saida`; devolve o número de linhas de vendas."""
+    rng = np.random.default_rng(semente)
+    compras_por_dia = compras_por_dia or max(1, vendas_por_dia // 7)
+    os.makedirs(saida, exist_ok=True)
+
+    df_produtos = gerar_produtos(produtos, rng)
+    df_produtos.to_csv(os.path.join(saida, 'FCD_produtos.csv'), sep=';', index=False)
+    gerar_estoque(produtos, lojas, inicio, dias, rng).to_csv(
+        os.path.join(saida, 'FCD_estoque.csv'), sep=';', index=False)
+
+    precos = df_produtos['preco_unitario'].to_numpy()
+    gerar_compras(precos, inicio, dias, compras_por_dia, rng).to_csv(
+        os.path.join(saida, 'FCD_compras.csv'), sep=';', index=False)
+    escrever_vendas(os.path.join(saida, 'FCD_vendas.csv'), precos, lojas, inicio, dias, vendas_por_dia, rng)
+    return dias * vendas_por_dia
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera FCD_*.csv sintéticos em escala configurável.")
+    parser.add_argument('--saida', default='dados_sinteticos', help="Diretório de destino")
+    parser.add_argument('--produtos', type=int, default=300)
+    parser.add_argument('--lojas', type=int, default=3)
+    parser.add_argument('--dias', type=int, default=365)
+    parser.add_argument('--vendas-por-dia', type=int, default=50)
+    parser.add_argument('--compras-por-dia', type=int, help="Padrão: um sétimo das vendas por dia")
+    parser.add_argument('--inicio', default='2024-01-01', help="Primeiro dia, AAAA-MM-DD")
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    linhas = gerar(args.saida, args.produtos, args.lojas, args.dias, args.vendas_por_dia,
+                   args.compras_por_dia, args.inicio, args.semente)
+    print(f"{linhas} vendas geradas em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
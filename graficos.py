@@ -0,0 +1,288 @@
+"""Gráficos do dashboard: tema, construção e cache das figuras, redução de séries longas e escolha entre SVG e WebGL."""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+
+# Pontos por série enviados ao navegador; séries maiores são reduzidas por LTTB.
+PONTOS_POR_SERIE = 1500
+# A partir de quantos pontos um trace é desenhado com WebGL (Scattergl) em vez de SVG.
+LIMITE_WEBGL = 1000
+# Figuras guardadas (LRU); cada gráfico × entrada ocupa uma.
+MAXIMO_FIGURAS = 64
+
+# Tema escuro do dashboard, aplicado sobre o `plotly_dark` em todas as figuras.
+pio.templates['dashboard'] = go.layout.Template(layout=dict(
+    plot_bgcolor='#2b2b2b',
+    paper_bgcolor='#2b2b2b',
+    font=dict(color='#e0e0e0'),
+    title=dict(font=dict(color='#4da6ff')),
+    xaxis=dict(title=dict(font=dict(color='#4da6ff'))),
+    yaxis=dict(title=dict(font=dict(color='#4da6ff'))),
+    legend=dict(font=dict(color='#e0e0e0')),
+))
+TEMA = 'plotly_dark+dashboard'
+
+
+def _numeros(valores):
+    valores = np.asarray(valores)
+    if np.issubdtype(valores.dtype, np.datetime64):
+        valores = valores.astype('datetime64[ns]').astype(np.int64)
+    return valores.astype(float)
+
+
+def lttb(x, y, pontos):
+    """Posições dos `pontos` mantidos pelo Largest-Triangle-Three-Buckets.
+
+    O primeiro e o último ponto ficam; o miolo é dividido em `pontos - 2`
+    baldes e, de cada um, fica o ponto que forma o maior triângulo com o
+    escolhido no balde anterior e a média do seguinte, o que preserva picos
+    e vales que uma média por balde apagaria.
+    """
+    n = len(y)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+    x, y = _numeros(x), _numeros(y)
+    limites = np.linspace(1, n - 1, pontos - 1).astype(np.int64)
+    limites = np.append(limites, n)
+
+    escolhidos = np.empty(pontos, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+    anterior = 0
+    for balde in range(pontos - 2):
+        inicio, fim, fim_seguinte = limites[balde], limites[balde + 1], limites[balde + 2]
+        media_x, media_y = x[fim:fim_seguinte].mean(), y[fim:fim_seguinte].mean()
+        areas = np.abs((x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+                       - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior]))
+        anterior = inicio + int(np.argmax(areas))
+        escolhidos[balde + 1] = anterior
+    return escolhidos
+
+
+def reduzir(df, coluna_x, coluna_y, pontos=PONTOS_POR_SERIE):
+    """`df` com no máximo `pontos` linhas, escolhidas por `lttb`."""
+    if len(df) <= pontos:
+        return df
+    return df.iloc[lttb(df[coluna_x].to_numpy(), df[coluna_y].to_numpy(), pontos)]
+
+
+def linha(x, y, **kwargs):
+    """Trace de linha; com mais de `LIMITE_WEBGL` pontos usa Scattergl."""
+    classe = go.Scattergl if len(x) > LIMITE_WEBGL else go.Scatter
+    return classe(x=x, y=y, **kwargs)
+
+
+def _deficit_criticos(df_criticos):
+    return px.bar(
+        df_criticos.head(10),
+        x='nome_produto',
+        y='deficit',
+        title='Top 10 Produtos com Maior Déficit de Estoque',
+        labels={'nome_produto': 'Produto', 'deficit': 'Déficit (unidades)'},
+        color='deficit',
+        color_continuous_scale=['#ff6b6b', '#ff0000']
+    )
+
+
+def _top_vendas_quantidade(top_vendas):
+    return px.bar(
+        top_vendas,
+        x='nome_produto',
+        y='quantidade_vendida',
+        title='Quantidade Vendida',
+        labels={'nome_produto': 'Produto', 'quantidade_vendida': 'Quantidade'},
+        color='quantidade_vendida',
+        color_continuous_scale='Blues'
+    )
+
+
+def _top_vendas_receita(top_vendas):
+    return px.bar(
+        top_vendas,
+        x='nome_produto',
+        y='valor_total',
+        title='Receita Gerada',
+        labels={'nome_produto': 'Produto', 'valor_total': 'Receita (R$)'},
+        color='valor_total',
+        color_continuous_scale='Blues'
+    )
+
+
+def _maiores_gastos(maiores_gastos):
+    return px.bar(
+        maiores_gastos,
+        x='nome_produto',
+        y='valor_total',
+        title='Top 10 Produtos com Maior Investimento em Compras',
+        labels={'nome_produto': 'Produto', 'valor_total': 'Valor Investido (R$)'},
+        color='valor_total',
+        color_continuous_scale='Blues'
+    )
+
+
+def _preco_fornecedores(analise_fornecedores):
+    return px.bar(
+        analise_fornecedores.head(10),
+        x='Fornecedor',
+        y='Preço Médio',
+        title='Preço Médio por Fornecedor',
+        labels={'Preço Médio': 'Preço Médio (R$)'},
+        color='Preço Médio',
+        color_continuous_scale='Blues'
+    )
+
+
+def _prazo_fornecedores(analise_fornecedores):
+    return px.bar(
+        analise_fornecedores.head(10),
+        x='Fornecedor',
+        y='Prazo Médio (dias)',
+        title='Prazo Médio de Entrega por Fornecedor',
+        labels={'Prazo Médio (dias)': 'Dias'},
+        color='Prazo Médio (dias)',
+        color_continuous_scale='Reds'
+    )
+
+
+def _matriz_fornecedores(analise_fornecedores):
+    return px.scatter(
+        analise_fornecedores.head(15),
+        x='Prazo Médio (dias)',
+        y='Preço Médio',
+        size='Volume Total',
+        color='Gasto Total',
+        hover_name='Fornecedor',
+        title='Matriz de Análise de Fornecedores',
+        labels={'Prazo Médio (dias)': 'Prazo Médio (dias)', 'Preço Médio': 'Preço Médio (R$)'},
+        color_continuous_scale='Blues'
+    )
+
+
+def _serie_temporal(vendas_periodo, compras_periodo, titulo, eixo):
+    fig = go.Figure()
+    for serie, nome, cor in [(vendas_periodo, 'Vendas', '#4da6ff'), (compras_periodo, 'Compras', '#ff6b6b')]:
+        if len(serie) == 0:
+            continue
+        serie = reduzir(serie, 'periodo', 'quantidade')
+        fig.add_trace(linha(
+            serie['periodo'],
+            serie['quantidade'],
+            mode='lines+markers' if len(serie) <= 100 else 'lines',
+            name=nome,
+            line=dict(color=cor, width=3 if len(serie) <= 100 else 1.5),
+            marker=dict(size=8)
+        ))
+    fig.update_layout(title=f'Evolução {titulo}: Vendas vs Compras', xaxis_title=eixo, yaxis_title='Quantidade')
+    return fig
+
+
+def _analise_consolidada(analise_consolidada):
+    fig = go.Figure()
+    for coluna, nome, cor in [('quantidade_estoque', 'Estoque', '#4da6ff'), ('quantidade_vendida', 'Vendas', '#66ff66'),
+                              ('quantidade_comprada', 'Compras', '#ff6b6b')]:
+        fig.add_trace(go.Bar(x=analise_consolidada['nome_produto'], y=analise_consolidada[coluna], name=nome, marker_color=cor))
+    fig.update_layout(
+        title='Top 20 Produtos: Estoque × Vendas × Compras',
+        xaxis_title='Produto',
+        yaxis_title='Quantidade',
+        barmode='group'
+    )
+    return fig
+
+
+def _receita_lojas(vendas_loja):
+    return px.pie(
+        vendas_loja,
+        values='Receita Total',
+        names='Loja',
+        title='Distribuição de Receita por Loja',
+        color_discrete_sequence=px.colors.sequential.Blues_r
+    )
+
+
+def _quantidade_lojas(vendas_loja):
+    return px.bar(
+        vendas_loja,
+        x='Loja',
+        y='Quantidade Vendida',
+        title='Quantidade Vendida por Loja',
+        color='Quantidade Vendida',
+        color_continuous_scale='Blues'
+    )
+
+
+def _receita_categorias(vendas_categoria):
+    return px.bar(
+        vendas_categoria,
+        x=vendas_categoria.index,
+        y='valor_total',
+        title='Receita por Categoria',
+        labels={'valor_total': 'Receita (R$)', 'index': 'Categoria'},
+        color='valor_total',
+        color_continuous_scale='Blues'
+    )
+
+
+# Gráficos do dashboard por id; cada função recebe os resultados de `analises` e devolve a figura.
+FIGURAS = {
+    'deficit_criticos': _deficit_criticos,
+    'top_vendas_quantidade': _top_vendas_quantidade,
+    'top_vendas_receita': _top_vendas_receita,
+    'maiores_gastos': _maiores_gastos,
+    'preco_fornecedores': _preco_fornecedores,
+    'prazo_fornecedores': _prazo_fornecedores,
+    'matriz_fornecedores': _matriz_fornecedores,
+    'serie_temporal': _serie_temporal,
+    'analise_consolidada': _analise_consolidada,
+    'receita_lojas': _receita_lojas,
+    'quantidade_lojas': _quantidade_lojas,
+    'receita_categorias': _receita_categorias,
+}
+
+
+def construir(grafico, *entradas, **parametros):
+    """Figura do `grafico` com o tema do dashboard."""
+    fig = FIGURAS[grafico](*entradas, **parametros)
+    fig.update_layout(template=TEMA)
+    return fig
+
+
+class CacheFiguras:
+    """Figuras já construídas, por gráfico e chave da entrada (LRU).
+
+    A `chave` é a da análise memoizada que produziu as entradas
+    (`analises.<funcao>.chave(base, ...)`), que já muda junto com os dados
+    ou o filtro; um gráfico cuja análise não mudou desde a última execução
+    reaproveita a figura sem olhar as tabelas nem passar de novo por
+    `px`/`go`. As figuras são compartilhadas entre sessões e não devem ser
+    alteradas.
+    """
+
+    def __init__(self, maximo=MAXIMO_FIGURAS):
+        self.maximo = maximo
+        self._figuras = OrderedDict()
+        self._trava = threading.Lock()
+
+    def figura(self, grafico, chave, *entradas, **parametros):
+        chave = (grafico, chave, tuple(sorted(parametros.items())))
+        with self._trava:
+            if chave in self._figuras:
+                self._figuras.move_to_end(chave)
+                return self._figuras[chave]
+        figura = construir(grafico, *entradas, **parametros)
+        with self._trava:
+            self._figuras[chave] = figura
+            while len(self._figuras) > self.maximo:
+                self._figuras.popitem(last=False)
+        return figura
+
+    def limpar(self):
+        with self._trava:
+            self._figuras.clear()
+
+
+FIGURAS_EM_CACHE = CacheFiguras()
@@ -0,0 +1,164 @@
+"""Vendas e estoque gravados em disco por loja (vendas também por mês), para ler só o recorte da instalação.
+
+Com um `filtros.Recorte` (de `DASHBOARD_LOJAS`, `DASHBOARD_INICIO` e
+`DASHBOARD_FIM`), `dados.BaseDados` abre apenas as partições que cruzam o
+recorte; as demais não são lidas nem convertidas.
+"""
+import glob
+import os
+
+import pandas as pd
+
+import dados
+
+
+# Coluna de loja e coluna de data (que divide as partições por mês) de cada tabela.
+# O estoque só é dividido por loja: a posição atual pode vir de uma contagem antiga.
+PARTICIONADAS = {'vendas': ('loja_id', 'data_venda'), 'estoque': ('localizacao', None)}
+
+
+def _diretorio(nome, diretorio):
+    return os.path.join(diretorio, 'particoes', nome)
+
+
+def _caminho_manifesto(nome, diretorio):
+    return os.path.join(diretorio, 'particoes', nome + '.json')
+
+
+def _lojas(nome, df):
+    """`loja_id` de cada linha; no estoque, o da localização (-1 se não for uma loja conhecida)."""
+    coluna, _ = PARTICIONADAS[nome]
+    if nome == 'estoque':
+        return pd.Series(dados.lojas_das_localizacoes(df[coluna]), index=df.index)
+    return df[coluna].astype('int64')
+
+
+def _meses(nome, df):
+    """Mês de cada linha como AAAAMM (0 nas tabelas divididas só por loja)."""
+    _, coluna_data = PARTICIONADAS[nome]
+    if coluna_data is None:
+        return pd.Series(0, index=df.index)
+    return df[coluna_data].dt.year * 100 + df[coluna_data].dt.month
+
+
+def _limites_mes(mes):
+    inicio = pd.Timestamp(year=mes // 100, month=mes % 100, day=1)
+    return inicio, inicio + pd.offsets.MonthEnd(0)
+
+
+def _no_recorte(particao, recorte):
+    if not recorte.cobre_loja(particao['loja']):
+        return False
+    return particao['mes'] is None or recorte.cobre_periodo(*_limites_mes(particao['mes']))
+
+
+def filtrar(nome, df, recorte):
+    """Linhas de `df` dentro do recorte (lojas e, em vendas, o período)."""
+    mascara = pd.Series(True, index=df.index)
+    if recorte.lojas is not None:
+        mascara &= _lojas(nome, df).isin(recorte.lojas)
+    _, coluna_data = PARTICIONADAS[nome]
+    if coluna_data is not None and recorte.data_inicio is not None:
+        mascara &= df[coluna_data] >= pd.Timestamp(recorte.data_inicio)
+    if coluna_data is not None and recorte.data_fim is not None:
+        mascara &= df[coluna_data] <= pd.Timestamp(recorte.data_fim)
+    return df if mascara.all() else df[mascara.to_numpy()].reset_index(drop=True)
+
+
+def origem(nome, diretorio=dados.DIRETORIO_CACHE):
+    """Versão do CSV já ingerida no snapshot da tabela, que as partições passam a espelhar (None sem snapshot)."""
+    manifesto = dados.ler_manifesto(os.path.join(diretorio, nome + '.json'))
+    if manifesto is None:
+        return None
+    return {chave: manifesto[chave] for chave in ('tamanho', 'mtime', 'hash', 'offset', 'ultimo_id')}
+
+
+def _atualizado(nome, manifesto, caminho):
+    return (manifesto is not None and manifesto.get('versao') == dados.VERSAO_SNAPSHOT
+            and dados.mesma_versao(nome, caminho, manifesto['origem']))
+
+
+def _gravar_grupos(nome, df, diretorio, geracao, particoes):
+    """Grava cada loja × mês de `df` num arquivo da `geracao`, acrescentando ao que já houver em `particoes`."""
+    os.makedirs(_diretorio(nome, diretorio), exist_ok=True)
+    for (loja, mes), grupo in df.groupby([_lojas(nome, df), _meses(nome, df)], sort=True):
+        chave = (int(loja), int(mes) or None)
+        anterior = particoes.get(chave)
+        if anterior is not None:
+            grupo = dados.concatenar([dados.ler_feather(os.path.join(_diretorio(nome, diretorio), anterior['arquivo'])), grupo])
+        arquivo = f'{chave[0]}_{mes}.{geracao}.feather'
+        dados.gravar_feather(grupo, os.path.join(_diretorio(nome, diretorio), arquivo))
+        particoes[chave] = {'loja': chave[0], 'mes': chave[1], 'arquivo': arquivo, 'linhas': len(grupo)}
+
+
+def _publicar(nome, diretorio, manifesto, particoes):
+    """Grava o manifesto e só então apaga os arquivos que ele deixou de citar."""
+    manifesto['particoes'] = [particoes[chave] for chave in sorted(particoes, key=lambda chave: (chave[0], chave[1] or 0))]
+    dados.gravar_manifesto(nome, os.path.join(diretorio, 'particoes'), manifesto)
+    citados = {particao['arquivo'] for particao in manifesto['particoes']} | {manifesto['esquema']}
+    for caminho in glob.glob(os.path.join(_diretorio(nome, diretorio), '*.feather')):
+        if os.path.basename(caminho) not in citados:
+            os.remove(caminho)
+
+
+def particionar(nome, df, diretorio=dados.DIRETORIO_CACHE):
+    """Regrava as partições a partir da tabela inteira `df`, já ingerida no snapshot; devolve o manifesto."""
+    anterior = dados.ler_manifesto(_caminho_manifesto(nome, diretorio)) or {}
+    geracao = anterior.get('geracao', 0) + 1
+    manifesto = {'versao': dados.VERSAO_SNAPSHOT, 'origem': origem(nome, diretorio), 'geracao': geracao,
+                 'esquema': f'esquema.{geracao}.feather'}
+    particoes = {}
+    _gravar_grupos(nome, df, diretorio, geracao, particoes)
+    dados.gravar_feather(df.iloc[:0], os.path.join(_diretorio(nome, diretorio), manifesto['esquema']))
+    _publicar(nome, diretorio, manifesto, particoes)
+    return manifesto
+
+
+def anexar(nome, linhas, anterior, diretorio=dados.DIRETORIO_CACHE):
+    """Acrescenta às partições as linhas do fim do CSV já anexadas ao snapshot; só as partições tocadas são regravadas.
+
+    `anterior` é a `origem` do snapshot antes de receber `linhas`. Se as
+    partições não espelhavam os mesmos bytes ingeridos (offset, hash e
+    último id: o CSV foi reescrito, ou o snapshot avançou sem elas), o
+    manifesto é apagado e a próxima carga as refaz a partir do snapshot.
+    """
+    manifesto = dados.ler_manifesto(_caminho_manifesto(nome, diretorio))
+    if (manifesto is None or manifesto.get('versao') != dados.VERSAO_SNAPSHOT or anterior is None
+            or any(manifesto['origem'][chave] != anterior[chave] for chave in ('offset', 'hash', 'ultimo_id'))):
+        if manifesto is not None:
+            os.remove(_caminho_manifesto(nome, diretorio))
+        return
+    manifesto['geracao'] += 1
+    manifesto['origem'] = origem(nome, diretorio)
+    particoes = {(particao['loja'], particao['mes']): particao for particao in manifesto['particoes']}
+    _gravar_grupos(nome, linhas, diretorio, manifesto['geracao'], particoes)
+    _publicar(nome, diretorio, manifesto, particoes)
+
+
+def carregar(nome, recorte, diretorio=dados.DIRETORIO_CACHE, caminho=None):
+    """Linhas de vendas ou estoque dentro do `recorte` e o último id ingerido do CSV.
+
+    Com as partições em dia com o CSV, só as que cruzam o recorte são lidas;
+    senão a tabela é carregada inteira (pelo snapshot, só a cauda se o CSV
+    apenas cresceu) e reparticionada.
+    """
+    caminho = caminho or dados.ARQUIVOS[nome]
+    coluna_id = dados.TABELAS_INCREMENTAIS[nome]
+    if not dados.SNAPSHOT_DISPONIVEL:
+        df = dados.ler_csv(nome, caminho)
+        return filtrar(nome, df, recorte), int(df[coluna_id].max()) if len(df) > 0 else 0
+
+    manifesto = dados.ler_manifesto(_caminho_manifesto(nome, diretorio))
+    if not _atualizado(nome, manifesto, caminho):
+        df = dados.carregar_tabela(nome, caminho, diretorio)
+        manifesto = particionar(nome, df, diretorio)
+        return filtrar(nome, df, recorte), manifesto['origem']['ultimo_id']
+
+    arquivos = [particao['arquivo'] for particao in manifesto['particoes'] if _no_recorte(particao, recorte)]
+    partes = [dados.ler_feather(os.path.join(_diretorio(nome, diretorio), arquivo))
+              for arquivo in arquivos or [manifesto['esquema']]]
+    df = dados.concatenar(partes)
+    # Partições de várias lojas voltam à ordem do arquivo, como na tabela inteira.
+    if not df[coluna_id].is_monotonic_increasing:
+        df = df.sort_values(coluna_id, kind='stable', ignore_index=True)
+    return filtrar(nome, df, recorte), manifesto['origem']['ultimo_id']
@@ -0,0 +1,150 @@
+"""Medição opcional de tempo e memória por seção de uma execução do dashboard.
+
+Ligada com `DASHBOARD_PERFIL=1` ou `?perfil=1` na URL. Cada execução gera
+um registro JSON por linha em `DASHBOARD_PERFIL_LOG` (padrão `perfil.jsonl`).
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from datetime import datetime
+
+import pandas as pd
+
+
+ARQUIVO_LOG = os.environ.get('DASHBOARD_PERFIL_LOG', 'perfil.jsonl')
+
+_trava = threading.Lock()
+_perfis_ativos = 0
+
+
+def ativado(valores_url=()):
+    """True se a variável de ambiente ou o parâmetro `perfil` da URL pedem o perfil."""
+    valores = [os.environ.get('DASHBOARD_PERFIL', '')] + list(valores_url)
+    return any(str(valor).strip().lower() in ('1', 'true', 'sim') for valor in valores)
+
+
+def _iniciar_rastreamento():
+    global _perfis_ativos
+    with _trava:
+        if _perfis_ativos == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _perfis_ativos += 1
+
+
+def _parar_rastreamento():
+    global _perfis_ativos
+    with _trava:
+        _perfis_ativos -= 1
+        if _perfis_ativos == 0:
+            tracemalloc.stop()
+
+
+class Perfil:
+    """Tempo e pico de alocação de cada seção nomeada de uma execução.
+
+    `secao(nome)` fecha a seção corrente e abre a próxima, para marcar o
+    script em sequência; `medir(nome)` é um bloco aninhado dentro dela.
+    Medições repetidas com o mesmo nome são somadas. O pico vem do
+    `tracemalloc`, que é do processo inteiro: com várias sessões perfiladas
+    ao mesmo tempo, os picos de uma incluem alocações das outras. Desativado,
+    todos os métodos são no-ops.
+    """
+
+    def __init__(self, ativo=False):
+        self.ativo = ativo
+        self.inicio = time.perf_counter()
+        self.total = None
+        self.secoes = {}
+        self._pilha = []
+        self._secao_aberta = False
+        if ativo:
+            _iniciar_rastreamento()
+            # Uma execução interrompida pelo Streamlit (rerun) nunca chega a
+            # `encerrar`; o tracemalloc é liberado quando o perfil é coletado.
+            self._finalizador = weakref.finalize(self, _parar_rastreamento)
+            tracemalloc.reset_peak()
+
+    def _entrar(self, nome):
+        if self._pilha:
+            self._pilha[-1]['pico'] = max(self._pilha[-1]['pico'], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        atual = tracemalloc.get_traced_memory()[0]
+        self.secoes.setdefault(nome, {
+            'secao': nome, 'nivel': len(self._pilha), 'chamadas': 0,
+            'segundos': 0.0, 'pico_bytes': 0, 'linhas': None,
+        })
+        self._pilha.append({'nome': nome, 'inicio': time.perf_counter(), 'memoria': atual, 'pico': atual, 'linhas': None})
+
+    def _sair(self):
+        quadro = self._pilha.pop()
+        segundos = time.perf_counter() - quadro['inicio']
+        pico = max(quadro['pico'], tracemalloc.get_traced_memory()[1])
+        if self._pilha:
+            self._pilha[-1]['pico'] = max(self._pilha[-1]['pico'], pico)
+
+        registro = self.secoes[quadro['nome']]
+        registro['chamadas'] += 1
+        registro['segundos'] += segundos
+        registro['pico_bytes'] = max(registro['pico_bytes'], pico - quadro['memoria'])
+        if quadro['linhas'] is not None:
+            registro['linhas'] = (registro['linhas'] or 0) + quadro['linhas']
+
+    def secao(self, nome):
+        if not self.ativo:
+            return
+        if self._secao_aberta:
+            self._sair()
+        self._entrar(nome)
+        self._secao_aberta = True
+
+    @contextlib.contextmanager
+    def medir(self, nome):
+        if not self.ativo:
+            yield
+            return
+        self._entrar(nome)
+        try:
+            yield
+        finally:
+            self._sair()
+
+    def linhas(self, quantidade):
+        """Soma `quantidade` às linhas processadas pela seção corrente."""
+        if self.ativo and self._pilha:
+            quadro = self._pilha[-1]
+            quadro['linhas'] = (quadro['linhas'] or 0) + int(quantidade)
+
+    def encerrar(self):
+        """Fecha as seções abertas e libera o tracemalloc; devolve a tabela das seções."""
+        if not self.ativo:
+            return None
+        while self._pilha:
+            self._sair()
+        self._secao_aberta = False
+        self.ativo = False
+        self.total = time.perf_counter() - self.inicio
+        self._finalizador()
+        return self.tabela()
+
+    def tabela(self):
+        return pd.DataFrame(list(self.secoes.values()),
+                            columns=['secao', 'nivel', 'chamadas', 'segundos', 'pico_bytes', 'linhas'])
+
+    def registro(self, estado=None):
+        return {
+            'momento': datetime.now().isoformat(timespec='milliseconds'),
+            'filtro': None if estado is None else estado.descrever(),
+            'total_segundos': self.total,
+            'secoes': list(self.secoes.values()),
+        }
+
+    def gravar(self, estado=None, caminho=None):
+        """Acrescenta o registro desta execução ao log JSON (uma linha por execução)."""
+        texto = json.dumps(self.registro(estado), ensure_ascii=False, default=str)
+        with _trava:
+            with open(caminho or ARQUIVO_LOG, 'a', encoding='utf-8') as f:
+                f.write(texto + '\n')
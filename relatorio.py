@@ -0,0 +1,155 @@
+"""Gera os indicadores do dashboard sem Streamlit, para e-mails e cargas de BI.
+
+Exemplos:
+    python relatorio.py --categoria Motor --loja 1 --inicio 2024-01-01 --fim 2024-06-30
+    python relatorio.py --lote --processos 4 --formato csv --saida relatorios/
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import analises
+import banco
+import dados
+import filtros
+
+
+COLUNAS = {
+    'produtos_criticos': ['produto_id', 'nome_produto', 'categoria', 'quantidade_estoque', 'estoque_minimo', 'deficit'],
+    'top_vendas': ['produto_id', 'nome_produto', 'categoria', 'quantidade_vendida', 'valor_total'],
+    'fornecedores': ['Fornecedor', 'Preço Médio', 'Prazo Médio (dias)', 'Volume Total', 'Gasto Total'],
+}
+
+_base = None
+_analises = None
+
+
+def calcular(base, estado, analises=analises):
+    """Indicadores Principais, Produtos Críticos, Top 10 Vendas e Fornecedores para um filtro.
+
+    `analises` é o módulo do backend de `base` (`analises` ou `analises_sql`).
+    """
+    fornecedores = analises.analise_fornecedores(base, estado)
+    if fornecedores is None:
+        fornecedores = pd.DataFrame(columns=COLUNAS['fornecedores'])
+    return {
+        'filtro': estado.descrever(),
+        'indicadores': analises.indicadores(base, estado),
+        'produtos_criticos': analises.produtos_criticos(base, estado)[COLUNAS['produtos_criticos']],
+        'top_vendas': analises.top_vendas(base, estado)[COLUNAS['top_vendas']],
+        'fornecedores': fornecedores[COLUNAS['fornecedores']],
+    }
+
+
+def _iniciar_processo(diretorio, backend):
+    global _base, _analises
+    _base, _analises = banco.abrir(backend, diretorio)
+    _base.atualizar()
+
+
+def _calcular_no_processo(estado):
+    return calcular(_base, estado, _analises)
+
+
+def calcular_lote(estados, processos=None, diretorio=dados.DIRETORIO_CACHE, backend='pandas'):
+    """Avalia vários filtros em paralelo; cada processo carrega a base uma vez, a partir dos snapshots."""
+    # Garante os snapshots (ou o banco) em disco antes de abrir os processos,
+    # para que nenhum deles precise ler os CSVs.
+    if backend == 'sqlite':
+        banco.BancoDados(diretorio).atualizar()
+    else:
+        dados.carregar_dados(diretorio)
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo,
+                             initargs=(diretorio, backend)) as executor:
+        return list(executor.map(_calcular_no_processo, estados, chunksize=4))
+
+
+def estados_lote(base, data_inicio=None, data_fim=None):
+    """Um filtro para cada combinação categoria × loja."""
+    categorias = sorted(base.produtos['categoria'].dropna().unique().tolist())
+    lojas = base.lojas()
+    return [
+        filtros.EstadoFiltro.criar([categoria], None, [loja], data_inicio, data_fim)
+        for categoria, loja in itertools.product(categorias, lojas)
+    ]
+
+
+def _para_json(valor):
+    if isinstance(valor, pd.DataFrame):
+        return valor.astype(object).where(valor.notna(), None).to_dict('records')
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    raise TypeError(f"tipo não serializável: {type(valor).__name__}")
+
+
+def gravar_json(resultados, saida):
+    texto = json.dumps(resultados, default=_para_json, ensure_ascii=False, indent=2)
+    if saida is None:
+        sys.stdout.write(texto + '\n')
+    else:
+        with open(saida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+
+
+def gravar_csv(resultados, diretorio):
+    """Um CSV por resultado, com as colunas do filtro na frente de cada linha."""
+    os.makedirs(diretorio, exist_ok=True)
+    tabelas = {'indicadores': []}
+    for resultado in resultados:
+        filtro = {chave: json.dumps(valor, ensure_ascii=False) for chave, valor in resultado['filtro'].items()}
+        tabelas['indicadores'].append(pd.DataFrame([{**filtro, **resultado['indicadores']}]))
+        for nome in COLUNAS:
+            tabelas.setdefault(nome, []).append(resultado[nome].assign(**filtro))
+    for nome, partes in tabelas.items():
+        df = pd.concat(partes, ignore_index=True)
+        colunas_filtro = list(resultados[0]['filtro'])
+        df = df[colunas_filtro + [c for c in df.columns if c not in colunas_filtro]]
+        df.to_csv(os.path.join(diretorio, nome + '.csv'), sep=';', index=False, encoding='utf-8')
+
+
+def _data(texto):
+    return date.fromisoformat(texto)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indicadores do Super-Dashboard Integrado em JSON ou CSV.")
+    parser.add_argument('--categoria', action='append', default=[], help="Categoria (pode repetir)")
+    parser.add_argument('--produto', action='append', type=int, help="produto_id (pode repetir)")
+    parser.add_argument('--loja', action='append', type=int, default=[], help="loja_id (pode repetir)")
+    parser.add_argument('--inicio', type=_data, help="Data inicial, AAAA-MM-DD")
+    parser.add_argument('--fim', type=_data, help="Data final, AAAA-MM-DD")
+    parser.add_argument('--lote', action='store_true', help="Avalia cada categoria × loja (ignora --categoria/--produto/--loja)")
+    parser.add_argument('--processos', type=int, help="Processos do modo lote (padrão: um por CPU)")
+    parser.add_argument('--formato', choices=['json', 'csv'], default='json')
+    parser.add_argument('--saida', help="Arquivo JSON (padrão: saída padrão) ou diretório dos CSVs (padrão: relatorio)")
+    parser.add_argument('--cache', default=dados.DIRETORIO_CACHE, help="Diretório dos snapshots")
+    parser.add_argument('--backend', choices=['pandas', 'sqlite'], default='pandas',
+                        help="Tabelas em memória (padrão) ou consultas a um banco SQLite local")
+    args = parser.parse_args(argv)
+
+    base, modulo_analises = banco.abrir(args.backend, args.cache)
+    base.atualizar()
+
+    if args.lote:
+        resultados = calcular_lote(estados_lote(base, args.inicio, args.fim), args.processos, args.cache, args.backend)
+    else:
+        estado = filtros.EstadoFiltro.criar(args.categoria, args.produto, args.loja, args.inicio, args.fim)
+        resultados = [calcular(base, estado, modulo_analises)]
+
+    if args.formato == 'csv':
+        gravar_csv(resultados, args.saida or 'relatorio')
+    else:
+        gravar_json(resultados if args.lote else resultados[0], args.saida)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+import os
+import sys
+
+# Os módulos do dashboard ficam na raiz do repositório.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import gerar_dados
+
+
+@pytest.fixture
+def pasta_dados(tmp_path, monkeypatch):
+    """CSVs sintéticos pequenos no diretório de trabalho do teste."""
+    gerar_dados.gerar(str(tmp_path), produtos=40, lojas=3, dias=120, vendas_por_dia=30, semente=1)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,20 @@
+import pytest
+
+import analises
+import dados
+import filtros
+
+
+pytestmark = pytest.mark.skipif(not dados.SNAPSHOT_DISPONIVEL, reason='snapshot exige pyarrow')
+
+
+def test_bases_com_recortes_diferentes_nao_compartilham_resultados(pasta_dados):
+    inteira = dados.BaseDados('cache', orcamento_mb=None, recorte=None)
+    loja_1 = dados.BaseDados('cache', orcamento_mb=None, recorte=filtros.Recorte(lojas=(1,)))
+    inteira.atualizar()
+    loja_1.atualizar()
+    assert inteira.versao == loja_1.versao
+
+    estado = filtros.EstadoFiltro()
+    assert analises.vendas_por_loja(inteira, estado)['Loja'].tolist() == [1, 2, 3]
+    assert analises.vendas_por_loja(loja_1, estado)['Loja'].tolist() == [1]
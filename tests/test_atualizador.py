@@ -0,0 +1,27 @@
+import atualizador
+
+
+class _Base:
+    def __init__(self, proxima):
+        self._proxima = proxima
+
+    def proxima(self):
+        if isinstance(self._proxima, Exception):
+            raise self._proxima
+        return self._proxima
+
+
+def test_falha_na_verificacao_sem_thread_mantem_a_versao_e_guarda_o_erro():
+    base = _Base(OSError('CSV pela metade'))
+    fonte = atualizador.Atualizador(base, intervalo=0).iniciar()
+
+    assert not fonte.em_segundo_plano
+    assert fonte.tentar_verificar() is False
+    assert fonte.atual()[0] is base
+    assert isinstance(fonte.erro, OSError)
+
+    nova = _Base(None)
+    base._proxima = nova
+    assert fonte.tentar_verificar() is True
+    assert fonte.atual()[0] is nova
+    assert fonte.erro is None
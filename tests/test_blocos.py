@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+import analises
+import blocos
+import dados
+import filtros
+
+
+pytestmark = pytest.mark.skipif(not dados.SNAPSHOT_DISPONIVEL, reason='snapshot exige pyarrow')
+
+E = filtros.EstadoFiltro.criar
+ESTADOS = [E(), E(['Motor']), E((), None, [1, 3], '2024-02-10', '2024-03-20'), E((), [7])]
+
+
+def test_agregado_em_blocos_igual_ao_groupby_das_linhas(pasta_dados):
+    chaves, medidas = blocos.AGREGACOES['vendas']
+    linhas = dados.ler_csv('vendas')
+    esperado = linhas.groupby(chaves)[medidas].agg(['sum', 'size'])
+
+    # Blocos bem menores que a tabela, para passar por várias reduções.
+    agregado, lidas = blocos.agregar('vendas', 250)
+
+    assert lidas == len(linhas)
+    assert agregado[chaves].apply(tuple, axis=1).tolist() == esperado.index.tolist()
+    assert agregado['linhas'].tolist() == esperado[('valor_total', 'size')].tolist()
+    assert agregado['quantidade_vendida'].tolist() == esperado[('quantidade_vendida', 'sum')].tolist()
+    pd.testing.assert_series_equal(agregado['valor_total'], esperado[('valor_total', 'sum')].reset_index(drop=True),
+                                   check_names=False, check_dtype=False)
+
+
+@pytest.mark.parametrize('analise', ['totais_vendas', 'top_vendas', 'maiores_gastos', 'vendas_por_loja',
+                                     'vendas_por_categoria', 'analise_fornecedores', 'produtos_criticos'])
+def test_modo_em_blocos_igual_ao_modo_completo(pasta_dados, monkeypatch, analise):
+    completa = dados.BaseDados('cache', orcamento_mb=None, recorte=None)
+    completa.atualizar()
+    monkeypatch.setattr(blocos, 'linhas_por_bloco', lambda orcamento_bytes: 500)
+    em_blocos = dados.BaseDados('cache_blocos', orcamento_mb=1, recorte=None)
+    em_blocos.atualizar()
+    assert len(em_blocos.vendas) < len(completa.vendas)
+
+    for estado in ESTADOS:
+        esperado = getattr(analises, analise)(completa, estado)
+        resultado = getattr(analises, analise)(em_blocos, estado)
+        if isinstance(esperado, pd.Series):
+            pd.testing.assert_series_equal(resultado, esperado, check_dtype=False)
+        else:
+            pd.testing.assert_frame_equal(resultado.reset_index(drop=True), esperado.reset_index(drop=True),
+                                          check_dtype=False, check_categorical=False)
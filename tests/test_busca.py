@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from busca import IndiceProdutos
+
+
+@pytest.fixture
+def indice():
+    return IndiceProdutos(pd.DataFrame({
+        'produto_id': [1, 2, 3, 4, 5],
+        'sku': ['SKU00001', 'SKU00002', 'SKU00003', 'SKU00004', 'SKU00005'],
+        'nome_produto': ['Pneu Pirelli Aro 17', 'Pastilha de Freio Bosch', 'Pneu Honda Aro 14',
+                         'Vela de Ignição NGK', 'Amortecedor Cofap Pneu'],
+        'categoria': ['Pneus', 'Freios', 'Pneus', 'Motor', 'Suspensão'],
+    }))
+
+
+def test_busca_por_prefixo_de_palavras_sem_acentos(indice):
+    assert indice.buscar('ignicao') == [4]
+    assert indice.buscar('pne aro') == [3, 1]
+
+
+def test_nomes_que_comecam_com_o_texto_vem_primeiro(indice):
+    assert indice.buscar('pneu') == [3, 1, 5]
+
+
+def test_busca_por_sku_e_por_categoria(indice):
+    assert indice.buscar('sku00002') == [2]
+    assert indice.buscar('pneu', categorias=['Suspensão']) == [5]
+
+
+def test_sem_texto_devolve_os_primeiros_em_ordem_alfabetica(indice):
+    assert indice.buscar('', limite=3) == [5, 2, 3]
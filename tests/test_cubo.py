@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cubo import Cubo
+
+
+MEDIDAS = ['quantidade_vendida', 'valor_total']
+
+
+@pytest.fixture
+def vendas():
+    rng = np.random.default_rng(0)
+    n = 3000
+    df = pd.DataFrame({
+        'data_venda': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 90, n), unit='D'),
+        'produto_id': rng.integers(1, 13, n),
+        'loja_id': rng.integers(1, 4, n),
+        'quantidade_vendida': rng.integers(1, 20, n),
+        'valor_total': np.round(rng.uniform(5, 500, n), 2),
+    })
+    return df.sort_values('data_venda', kind='stable', ignore_index=True)
+
+
+@pytest.fixture
+def produtos():
+    # O produto 13 não tem vendas e fica no cubo com somas zeradas.
+    return pd.DataFrame({'produto_id': np.arange(1, 14), 'categoria': ['Motor', 'Freios', 'Pneus'] * 4 + ['Motor']})
+
+
+def _filtrar(df, produtos, inicio=None, fim=None, produto_ids=None, categorias=None, lojas=None):
+    mascara = pd.Series(True, index=df.index)
+    if inicio is not None:
+        mascara &= df['data_venda'] >= pd.Timestamp(inicio)
+    if fim is not None:
+        mascara &= df['data_venda'] <= pd.Timestamp(fim)
+    if produto_ids:
+        mascara &= df['produto_id'].isin(produto_ids)
+    if categorias:
+        mascara &= df['produto_id'].map(produtos.set_index('produto_id')['categoria']).isin(categorias)
+    if lojas:
+        mascara &= df['loja_id'].isin(lojas)
+    return df[mascara].assign(categoria=lambda d: d['produto_id'].map(produtos.set_index('produto_id')['categoria']))
+
+
+SELECOES = [
+    {},
+    {'inicio': '2024-01-15', 'fim': '2024-02-10'},
+    {'inicio': '2024-02-01', 'fim': '2024-02-01', 'lojas': [2]},
+    {'produto_ids': [1, 5, 13], 'lojas': [1, 3]},
+    {'categorias': ['Pneus'], 'inicio': '2023-12-01', 'fim': '2024-01-20'},
+    {'inicio': '2025-01-01'},
+]
+
+
+@pytest.mark.parametrize('selecao', SELECOES)
+@pytest.mark.parametrize('por', ['produto_id', 'loja_id', 'categoria'])
+def test_somas_por_grupo_iguais_ao_groupby(vendas, produtos, selecao, por):
+    cubo = Cubo(vendas, 'data_venda', 'loja_id', MEDIDAS, produtos)
+    esperado = _filtrar(vendas, produtos, **selecao).groupby(por)[MEDIDAS].agg(['sum', 'size'])
+
+    resultado = cubo.somar(selecao.get('inicio'), selecao.get('fim'), produtos=selecao.get('produto_ids'),
+                           categorias=selecao.get('categorias'), chaves=selecao.get('lojas'), por=por)
+
+    assert resultado.index.tolist() == esperado.index.tolist()
+    assert resultado['linhas'].tolist() == esperado[('quantidade_vendida', 'size')].tolist()
+    assert resultado['quantidade_vendida'].tolist() == esperado[('quantidade_vendida', 'sum')].tolist()
+    np.testing.assert_allclose(resultado['valor_total'], esperado[('valor_total', 'sum')])
+
+
+@pytest.mark.parametrize('selecao', SELECOES)
+def test_total_igual_a_soma_das_linhas(vendas, produtos, selecao):
+    cubo = Cubo(vendas, 'data_venda', 'loja_id', MEDIDAS, produtos)
+    linhas = _filtrar(vendas, produtos, **selecao)
+
+    total = cubo.somar(selecao.get('inicio'), selecao.get('fim'), produtos=selecao.get('produto_ids'),
+                       categorias=selecao.get('categorias'), chaves=selecao.get('lojas'))
+
+    assert total['linhas'] == len(linhas)
+    assert total['quantidade_vendida'] == linhas['quantidade_vendida'].sum()
+    assert total['valor_total'] == pytest.approx(linhas['valor_total'].sum())
+
+
+@pytest.mark.parametrize('freq', ['D', 'W', 'M'])
+def test_serie_igual_ao_groupby_por_periodo(vendas, produtos, freq):
+    cubo = Cubo(vendas, 'data_venda', 'loja_id', MEDIDAS, produtos)
+    linhas = _filtrar(vendas, produtos, inicio='2024-01-10', fim='2024-03-05', lojas=[1])
+    esperado = linhas.groupby(linhas['data_venda'].dt.to_period(freq).dt.start_time)['quantidade_vendida'].sum()
+
+    serie = cubo.serie('2024-01-10', '2024-03-05', chaves=[1], freq=freq)
+
+    assert serie.index.tolist() == esperado.index.tolist()
+    assert serie['quantidade_vendida'].tolist() == esperado.tolist()
+
+
+def test_valores_por_par_produto_loja(vendas, produtos):
+    cubo = Cubo(vendas, 'data_venda', 'loja_id', MEDIDAS, produtos)
+    linhas = _filtrar(vendas, produtos, inicio='2024-03-01')
+    esperado = linhas.groupby(['produto_id', 'loja_id'])['quantidade_vendida'].sum()
+
+    pares = [(1, 1), (7, 3), (13, 2), (99, 1)]
+    valores = cubo.valores('quantidade_vendida', [p for p, _ in pares], [l for _, l in pares], '2024-03-01')
+
+    assert valores.tolist() == [esperado.get(par, 0) for par in pares]
+
+
+@pytest.mark.parametrize('corte', [100, 1777, 2999])
+def test_estender_igual_a_construir_com_todas_as_linhas(vendas, produtos, corte):
+    # O corte cai no meio de um dia: as linhas novas tocam o último dia do cubo e os seguintes.
+    cubo = Cubo(vendas.iloc[:corte], 'data_venda', 'loja_id', MEDIDAS, produtos)
+
+    estendido = cubo.estender(vendas.iloc[corte:])
+    completo = Cubo(vendas, 'data_venda', 'loja_id', MEDIDAS, produtos)
+
+    assert estendido.dias == completo.dias
+    np.testing.assert_allclose(estendido.acumulado, completo.acumulado)
+    pd.testing.assert_frame_equal(estendido.somar(por='loja_id'), completo.somar(por='loja_id'))
+
+
+def test_estender_com_chave_nova_ou_dia_anterior_pede_outro_cubo(vendas, produtos):
+    cubo = Cubo(vendas[vendas['data_venda'] >= '2024-02-01'], 'data_venda', 'loja_id', MEDIDAS, produtos)
+
+    assert cubo.estender(vendas.tail(3).assign(loja_id=9)) is None
+    assert cubo.estender(vendas.head(3)) is None
+
+
+def test_estender_com_linhas_dias_depois_do_ultimo(vendas, produtos):
+    antigas = vendas[vendas['data_venda'] < '2024-02-01']
+    novas = vendas[vendas['data_venda'] >= '2024-02-20']
+
+    estendido = Cubo(antigas, 'data_venda', 'loja_id', MEDIDAS, produtos).estender(novas)
+    completo = Cubo(pd.concat([antigas, novas]), 'data_venda', 'loja_id', MEDIDAS, produtos)
+
+    np.testing.assert_allclose(estendido.acumulado, completo.acumulado)
@@ -0,0 +1,141 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dados
+
+
+pytestmark = pytest.mark.skipif(not dados.SNAPSHOT_DISPONIVEL, reason='snapshot exige pyarrow')
+
+CABECALHO_VENDAS = 'venda_id;data_venda;produto_id;loja_id;quantidade_vendida;valor_unitario;valor_total\n'
+
+
+def _linha_venda(venda_id, quantidade):
+    return f'{venda_id};01/01/2024;{venda_id % 7 + 1};1;{quantidade};10.0;{quantidade * 10}.0\n'
+
+
+def _escrever(caminho, texto, mtime_ns):
+    with open(caminho, 'w', encoding='utf-8', newline='') as f:
+        f.write(texto)
+    os.utime(caminho, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def vendas(tmp_path):
+    caminho = str(tmp_path / 'FCD_vendas.csv')
+    linhas = [_linha_venda(i, 5) for i in range(1, 8001)]
+    _escrever(caminho, CABECALHO_VENDAS + ''.join(linhas), 1_000_000_000_000_000_000)
+    return caminho, linhas, str(tmp_path / 'cache')
+
+
+def test_linha_do_meio_reescrita_com_mesmo_tamanho_refaz_o_snapshot(vendas):
+    caminho, linhas, cache = vendas
+    assert dados.carregar_tabela('vendas', caminho, cache)['quantidade_vendida'].sum() == 5 * 8000
+
+    linhas[4000] = _linha_venda(4001, 9)
+    _escrever(caminho, CABECALHO_VENDAS + ''.join(linhas), 1_000_000_000_000_000_001)
+
+    assert dados.carregar_tabela('vendas', caminho, cache)['quantidade_vendida'].sum() == 5 * 7999 + 9
+
+
+def test_linha_do_meio_reescrita_junto_com_linhas_novas_nao_e_anexada(vendas):
+    caminho, linhas, cache = vendas
+    dados.carregar_tabela('vendas', caminho, cache)
+
+    linhas[4000] = _linha_venda(4001, 9)
+    linhas.append(_linha_venda(8001, 5))
+    _escrever(caminho, CABECALHO_VENDAS + ''.join(linhas), 1_000_000_000_000_000_001)
+
+    assert dados.ler_linhas_novas('vendas', 8000, caminho, cache) is None
+    assert dados.carregar_tabela('vendas', caminho, cache)['quantidade_vendida'].sum() == 5 * 8000 + 9
+
+
+def test_linhas_novas_sao_anexadas_e_o_hash_acompanha(vendas):
+    caminho, linhas, cache = vendas
+    dados.carregar_tabela('vendas', caminho, cache)
+
+    linhas.append(_linha_venda(8001, 7))
+    _escrever(caminho, CABECALHO_VENDAS + ''.join(linhas), 1_000_000_000_000_000_001)
+    novas = dados.ler_linhas_novas('vendas', 8000, caminho, cache)
+    assert novas['venda_id'].tolist() == [8001]
+
+    manifesto = dados.ler_manifesto(os.path.join(cache, 'vendas.json'))
+    assert manifesto['hash'] == dados.hash_arquivo(caminho)
+    assert dados.carregar_tabela('vendas', caminho, cache)['quantidade_vendida'].sum() == 5 * 8000 + 7
+
+
+def _texto_estoque(quantidades, mais_recente):
+    """Contagens de um produto em 2024-01-01, exceto a linha `mais_recente`, de 2024-02-01."""
+    return ('estoque_id;data_referencia;produto_id;quantidade_estoque;estoque_minimo;localizacao\n'
+            + ''.join(f'{i};{"2024-02-01" if i == mais_recente else "2024-01-01"};1;{q};1;Loja 1\n'
+                      for i, q in enumerate(quantidades, 1)))
+
+
+def _escrever_base(pasta, texto_estoque, mtime_ns):
+    """Os quatro CSVs mínimos de uma `BaseDados`."""
+    _escrever(pasta / dados.ARQUIVOS['produtos'],
+              'produto_id;sku;produto_nome;categoria;preco_unitario\n1;SKU00001;Pneu;Pneus;10.0\n', mtime_ns)
+    _escrever(pasta / dados.ARQUIVOS['vendas'], CABECALHO_VENDAS + _linha_venda(1, 5), mtime_ns)
+    _escrever(pasta / dados.ARQUIVOS['compras'],
+              'compra_id;data_compra;produto_id;fornecedor;quantidade_comprada;valor_unitario;valor_total;'
+              'prazo_entrega_dias;status_compra\n1;01/01/2024;1;Pirelli;5;10.0;50.0;7;Entregue\n', mtime_ns)
+    _escrever(pasta / dados.ARQUIVOS['estoque'], texto_estoque, mtime_ns)
+
+
+def test_contagem_de_estoque_corrigida_no_lugar_chega_ao_estoque_atual(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # A contagem mais recente fica no meio do arquivo, longe do início e do fim.
+    quantidades = [1] * 10000
+    quantidades[4999] = 2
+    _escrever_base(tmp_path, _texto_estoque(quantidades, 5000), 1_000_000_000_000_000_000)
+    base = dados.BaseDados('cache', orcamento_mb=None, recorte=None)
+    base.atualizar()
+    assert base.estoque_atual['quantidade_estoque'].tolist() == [2]
+
+    # Corrige essa contagem sem mudar o tamanho do arquivo.
+    quantidades[4999] = 8
+    _escrever(tmp_path / dados.ARQUIVOS['estoque'], _texto_estoque(quantidades, 5000), 1_000_000_000_000_000_001)
+    assert base.proxima().estoque_atual['quantidade_estoque'].tolist() == [8]
+
+    # E numa nova instância, com o mesmo cache (snapshot e posições persistidas).
+    reiniciada = dados.BaseDados('cache', orcamento_mb=None, recorte=None)
+    reiniciada.atualizar()
+    assert reiniciada.estoque_atual['quantidade_estoque'].tolist() == [8]
+
+
+def _iguais_a_uma_carga_nova(base):
+    nova = dados.BaseDados('cache', orcamento_mb=None, recorte=None)
+    nova.atualizar()
+    for nome in dados.COLUNAS_DATA:
+        assert getattr(base, nome).reset_index(drop=True).equals(getattr(nova, nome).reset_index(drop=True))
+        assert base.filtros[nome].linhas(produto_id=[1]).tolist() == nova.filtros[nome].linhas(produto_id=[1]).tolist()
+        np.testing.assert_allclose(base.cubos[nome].acumulado, nova.cubos[nome].acumulado)
+    pd.testing.assert_frame_equal(base.fornecedores.baldes, nova.fornecedores.baldes)
+
+
+def test_linhas_anexadas_em_ordem_estendem_indices_cubos_e_fornecedores(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _escrever_base(tmp_path, _texto_estoque([1], 1), 1_000_000_000_000_000_000)
+    base = dados.BaseDados('cache', orcamento_mb=None, recorte=None)
+    base.atualizar()
+
+    # O mesmo dia da última venda e o seguinte, sem refazer nada.
+    _escrever(tmp_path / dados.ARQUIVOS['vendas'], CABECALHO_VENDAS + _linha_venda(1, 5) + _linha_venda(7, 3)
+              + _linha_venda(14, 2).replace('01/01/2024', '02/01/2024'), 1_000_000_000_000_000_001)
+    with open(tmp_path / dados.ARQUIVOS['compras'], 'a', encoding='utf-8') as f:
+        f.write('2;03/02/2024;1;Pirelli;2;11.0;22.0;12;Entregue\n')
+    with monkeypatch.context() as m:
+        m.setattr(dados, 'construir_filtros', None)
+        m.setattr(dados, 'EstatisticasFornecedores', None)
+        base = base.proxima()
+    assert base.vendas['quantidade_vendida'].tolist() == [5, 3, 2]
+    _iguais_a_uma_carga_nova(base)
+
+    # Uma venda com data anterior à última obriga a reordenar e refazer.
+    with open(tmp_path / dados.ARQUIVOS['vendas'], 'a', encoding='utf-8') as f:
+        f.write(_linha_venda(21, 4).replace('01/01/2024', '31/12/2023'))
+    base = base.proxima()
+    assert base.vendas['quantidade_vendida'].tolist() == [4, 5, 3, 2]
+    _iguais_a_uma_carga_nova(base)
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filtros import IndiceFiltros
+
+
+@pytest.fixture
+def vendas():
+    rng = np.random.default_rng(1)
+    n = 2000
+    df = pd.DataFrame({
+        'data_venda': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 60, n), unit='D'),
+        'produto_id': rng.integers(1, 30, n),
+        'loja_id': rng.integers(1, 4, n),
+    })
+    return df.sort_values('data_venda', kind='stable', ignore_index=True)
+
+
+def _mascara_isin(df, data_inicio=None, data_fim=None, **selecoes):
+    """Filtro como era feito antes dos índices: uma máscara `isin` por seleção sobre a tabela inteira."""
+    mascara = pd.Series(True, index=df.index)
+    if data_inicio is not None:
+        mascara &= df['data_venda'] >= pd.Timestamp(data_inicio)
+    if data_fim is not None:
+        mascara &= df['data_venda'] <= pd.Timestamp(data_fim)
+    for coluna, valores in selecoes.items():
+        if valores:
+            mascara &= df[coluna].isin(valores)
+    return np.flatnonzero(mascara.to_numpy())
+
+
+SELECOES = [
+    {},
+    {'data_inicio': '2024-01-20', 'data_fim': '2024-02-05'},
+    {'produto_id': [3, 7, 29], 'loja_id': [2]},
+    {'produto_id': [], 'loja_id': [1, 2, 3], 'data_fim': '2024-01-10'},
+    {'produto_id': [5, 999], 'data_inicio': '2024-02-01'},
+    {'produto_id': [999]},
+    {'data_inicio': '2024-02-10', 'data_fim': '2024-01-10'},
+]
+
+
+@pytest.mark.parametrize('selecao', SELECOES)
+def test_linhas_iguais_as_mascaras_isin(vendas, selecao):
+    indice = IndiceFiltros(vendas, 'data_venda', ('produto_id', 'loja_id'))
+
+    assert indice.linhas(**selecao).tolist() == _mascara_isin(vendas, **selecao).tolist()
+    pd.testing.assert_frame_equal(indice.filtrar(**selecao).reset_index(drop=True),
+                                  vendas.iloc[_mascara_isin(vendas, **selecao)].reset_index(drop=True))
+
+
+def test_tabela_fora_de_ordem_e_recusada(vendas):
+    with pytest.raises(ValueError):
+        IndiceFiltros(vendas.iloc[::-1], 'data_venda', ('produto_id',))
+
+
+@pytest.mark.parametrize('selecao', SELECOES)
+def test_estender_igual_a_indexar_a_tabela_inteira(vendas, selecao):
+    indice = IndiceFiltros(vendas.iloc[:1500], 'data_venda', ('produto_id', 'loja_id')).estender(vendas)
+
+    assert indice.linhas(**selecao).tolist() == _mascara_isin(vendas, **selecao).tolist()
+
+
+def test_estender_com_data_anterior_devolve_none(vendas):
+    indice = IndiceFiltros(vendas.iloc[:1500], 'data_venda', ('produto_id', 'loja_id'))
+
+    assert indice.estender(pd.concat([vendas.iloc[:1500], vendas.head(2)], ignore_index=True)) is None
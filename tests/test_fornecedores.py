@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import fornecedores
+
+
+@pytest.fixture
+def compras():
+    rng = np.random.default_rng(2)
+    n = 1500
+    prazo = rng.integers(1, 20, n)
+    preco = np.round(rng.uniform(10, 200, n), 2)
+    quantidade = rng.integers(1, 50, n)
+    df = pd.DataFrame({
+        'data_compra': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 200, n), unit='D'),
+        'produto_id': rng.integers(1, 10, n),
+        'fornecedor': rng.choice(['Bosch', 'Cofap', 'NGK'], n),
+        'status_compra': rng.choice(['Entregue', 'Pendente', 'Cancelada'], n, p=[0.8, 0.15, 0.05]),
+        'quantidade_comprada': quantidade,
+        'valor_unitario': preco,
+        'valor_total': np.round(preco * quantidade, 2),
+        'prazo_entrega_dias': prazo,
+    })
+    return df.sort_values('data_compra', kind='stable', ignore_index=True)
+
+
+def _somas_das_linhas(compras, inicio, fim, produtos, por):
+    linhas = fornecedores.derivar(compras[compras['status_compra'] == 'Entregue'])
+    if inicio is not None:
+        linhas = linhas[linhas['data_compra'] >= pd.Timestamp(inicio)]
+    if fim is not None:
+        linhas = linhas[linhas['data_compra'] <= pd.Timestamp(fim)]
+    if produtos is not None:
+        linhas = linhas[linhas['produto_id'].isin(produtos)]
+    linhas = linhas.assign(mes=linhas['data_compra'].dt.to_period('M').dt.start_time)
+    return linhas.groupby(list(por), sort=True)[fornecedores.MEDIDAS].sum().astype(float)
+
+
+PERIODOS = [
+    (None, None),
+    ('2024-02-01', '2024-04-30'),    # meses inteiros
+    ('2024-02-14', '2024-05-09'),    # começa e termina no meio do mês
+    ('2024-03-01', '2024-03-17'),    # termina no meio do mês
+    ('2024-03-12', '2024-06-30'),    # começa no meio do mês
+    ('2024-04-03', '2024-04-21'),    # dentro de um mês só
+    ('2024-01-31', '2024-02-01'),    # virada do mês
+    (None, '2024-03-10'),
+    ('2024-05-20', None),
+]
+
+
+@pytest.mark.parametrize('inicio, fim', PERIODOS)
+@pytest.mark.parametrize('por', [('fornecedor',), ('mes', 'fornecedor'), ('produto_id',)])
+def test_somas_dos_baldes_iguais_as_das_linhas(compras, inicio, fim, por):
+    estatisticas = fornecedores.EstatisticasFornecedores(compras)
+
+    resultado = estatisticas.somar(inicio, fim, por=por)
+
+    pd.testing.assert_frame_equal(resultado, _somas_das_linhas(compras, inicio, fim, None, por), check_index_type=False)
+
+
+def test_somas_de_uma_selecao_de_produtos(compras):
+    estatisticas = fornecedores.EstatisticasFornecedores(compras)
+
+    resultado = estatisticas.somar('2024-02-14', '2024-05-09', produtos=[2, 5])
+
+    pd.testing.assert_frame_equal(resultado, _somas_das_linhas(compras, '2024-02-14', '2024-05-09', [2, 5], ('fornecedor',)))
+
+
+def test_indicadores_iguais_aos_calculados_nas_linhas(compras):
+    estatisticas = fornecedores.EstatisticasFornecedores(compras)
+    linhas = compras[(compras['status_compra'] == 'Entregue') & (compras['data_compra'] >= '2024-02-14')
+                     & (compras['data_compra'] <= '2024-05-09')]
+
+    analise = fornecedores.indicadores(estatisticas.somar('2024-02-14', '2024-05-09', por=('mes', 'fornecedor')))
+    por_fornecedor = linhas.groupby('fornecedor')
+
+    analise = analise.set_index('Fornecedor').sort_index()
+    np.testing.assert_allclose(analise['Preço Médio'], por_fornecedor['valor_unitario'].mean())
+    np.testing.assert_allclose(analise['Desvio do Preço'], por_fornecedor['valor_unitario'].std())
+    np.testing.assert_allclose(analise['Prazo Médio (dias)'], por_fornecedor['prazo_entrega_dias'].mean())
+    np.testing.assert_allclose(analise['Entregas no Prazo (%)'],
+                               100 * por_fornecedor['prazo_entrega_dias'].apply(lambda p: (p <= fornecedores.PRAZO_COMBINADO).mean()))
+    np.testing.assert_allclose(analise['Gasto Total'], por_fornecedor['valor_total'].sum())
+
+
+@pytest.mark.parametrize('corte', [0, 700, 1499])
+def test_estender_igual_a_construir_com_todas_as_compras(compras, corte):
+    estendidas = fornecedores.EstatisticasFornecedores(compras.iloc[:corte]).estender(compras)
+    completas = fornecedores.EstatisticasFornecedores(compras)
+
+    pd.testing.assert_frame_equal(estendidas.baldes, completas.baldes)
+    pd.testing.assert_frame_equal(estendidas.somar('2024-02-14', '2024-05-09'), completas.somar('2024-02-14', '2024-05-09'))
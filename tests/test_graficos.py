@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import graficos
+
+
+@pytest.fixture
+def serie():
+    rng = np.random.default_rng(3)
+    x = pd.date_range('2020-01-01', periods=5000, freq='D').to_numpy()
+    y = rng.normal(100, 5, len(x))
+    y[1234] = 500    # pico que uma média por balde apagaria
+    y[4321] = -300   # vale
+    return x, y
+
+
+@pytest.mark.parametrize('pontos', [3, 10, 1500])
+def test_lttb_mantem_as_pontas_e_devolve_os_pontos_pedidos(serie, pontos):
+    x, y = serie
+
+    escolhidos = graficos.lttb(x, y, pontos)
+
+    assert len(escolhidos) == pontos
+    assert escolhidos[0] == 0 and escolhidos[-1] == len(y) - 1
+    assert (np.diff(escolhidos) > 0).all()
+
+
+def test_lttb_preserva_picos_e_vales(serie):
+    x, y = serie
+
+    escolhidos = graficos.lttb(x, y, 100)
+
+    assert 1234 in escolhidos and 4321 in escolhidos
+
+
+@pytest.mark.parametrize('pontos', [2, 5000, 6000])
+def test_lttb_sem_reducao_devolve_todos_os_pontos(serie, pontos):
+    x, y = serie
+
+    assert graficos.lttb(x, y, pontos).tolist() == list(range(len(y)))
+
+
+def test_reduzir_limita_as_linhas_da_tabela(serie):
+    x, y = serie
+    df = pd.DataFrame({'data': x, 'valor': y})
+
+    reduzida = graficos.reduzir(df, 'data', 'valor', pontos=200)
+
+    assert len(reduzida) == 200
+    assert reduzida['data'].is_monotonic_increasing
+    assert len(graficos.reduzir(df.head(50), 'data', 'valor', pontos=200)) == 50
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+import dados
+import filtros
+import particoes
+
+
+pytestmark = pytest.mark.skipif(not dados.SNAPSHOT_DISPONIVEL, reason='snapshot exige pyarrow')
+
+CABECALHO_VENDAS = 'venda_id;data_venda;produto_id;loja_id;quantidade_vendida;valor_unitario;valor_total\n'
+LOJA_1 = filtros.Recorte(lojas=(1,))
+
+
+def _linhas(ids, quantidade=1):
+    return ''.join(f'{i};{i % 28 + 1:02d}/0{i % 3 + 1}/2024;{i % 5 + 1};{i % 3 + 1};{quantidade};10.0;{quantidade * 10}.0\n'
+                   for i in ids)
+
+
+def _escrever(caminho, texto, modo='w'):
+    with open(caminho, modo, encoding='utf-8', newline='') as f:
+        f.write(texto)
+
+
+@pytest.fixture
+def vendas(tmp_path):
+    caminho = str(tmp_path / 'FCD_vendas.csv')
+    _escrever(caminho, CABECALHO_VENDAS + _linhas(range(1, 301)))
+    return caminho, str(tmp_path / 'cache')
+
+
+def _anexar_cauda(caminho, cache, ultimo_id, ids):
+    _escrever(caminho, _linhas(ids), 'a')
+    anterior = particoes.origem('vendas', cache)
+    linhas = dados.ler_linhas_novas('vendas', ultimo_id, caminho, cache)
+    particoes.anexar('vendas', linhas, anterior, cache)
+
+
+def _ids_loja_1(caminho):
+    df = dados.ler_csv('vendas', caminho)
+    return sorted(df.loc[df['loja_id'] == 1, 'venda_id'].tolist())
+
+
+def test_cauda_anexada_estende_as_particoes_sem_refazer(vendas):
+    caminho, cache = vendas
+    particoes.carregar('vendas', LOJA_1, cache, caminho)
+    geracao = dados.ler_manifesto(os.path.join(cache, 'particoes', 'vendas.json'))['geracao']
+
+    _anexar_cauda(caminho, cache, 300, range(301, 311))
+
+    manifesto = dados.ler_manifesto(os.path.join(cache, 'particoes', 'vendas.json'))
+    assert manifesto['geracao'] == geracao + 1
+    df, ultimo_id = particoes.carregar('vendas', LOJA_1, cache, caminho)
+    assert ultimo_id == 310
+    assert df['venda_id'].tolist() == _ids_loja_1(caminho)
+
+
+def test_particoes_de_um_csv_reescrito_sao_refeitas_mesmo_com_ids_maiores(vendas):
+    caminho, cache = vendas
+    particoes.carregar('vendas', LOJA_1, cache, caminho)
+
+    # O CSV é reescrito com outros ids e o snapshot é refeito sem passar pelas partições.
+    _escrever(caminho, CABECALHO_VENDAS + _linhas(range(1001, 1201), quantidade=2))
+    dados.carregar_tabela('vendas', caminho, cache)
+    _anexar_cauda(caminho, cache, 1200, range(1201, 1206))
+
+    assert dados.ler_manifesto(os.path.join(cache, 'particoes', 'vendas.json')) is None
+    df, ultimo_id = particoes.carregar('vendas', LOJA_1, cache, caminho)
+    assert ultimo_id == 1205
+    assert df['venda_id'].tolist() == _ids_loja_1(caminho)